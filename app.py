@@ -1,13 +1,22 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, get_jwt
 import os
+import json
+from functools import wraps
 from services.extraction_service import AndroidFileExtractor
+from services.device_registry import registro_dispositivos, DispositivoNoDisponible, DispositivoOcupado
+from services.host_scheduler import RepartoHost
+from services.job_runner import EjecutorTrabajos, ColaLlena
+from utils.extraction_scheduler import PlanificadorExtraccion
 from config import Config
 from database import init_db
 from services.evaluacion_service import EvaluacionService
 from services.archivo_service import ArchivoService
 from services.llamada_service import LlamadaService
+from services.proveedor_service import ProveedorService
+from services.flujo_extraccion_service import FlujoExtraccionService
+from services.almacen_service import almacen
 from services.auth_service import AuthService
 from services.user_service import UserService
 
@@ -24,6 +33,111 @@ with app.app_context():
     # Crear tablas si no existen (para desarrollo)
     db.create_all()
 
+# Extracciones en segundo plano (/api/extract, /api/extract-multiple, /api/extract-whatsapp-backups)
+ejecutor_trabajos = EjecutorTrabajos(Config.JOB_WORKERS, Config.JOB_QUEUE_LIMIT, contexto=app.app_context)
+
+def _validar_opciones_extraccion(data):
+    """
+    Verificar las opciones de /api/extract antes de encolar el trabajo, para
+    responder 400 en lugar de fallar a mitad de la extracción
+    
+    Raises:
+        ValueError: Si un proveedor, la prioridad o un presupuesto no son válidos
+    """
+    ProveedorService.validar_proveedores(data.get('proveedores') or [])
+    PlanificadorExtraccion.validar(
+        data.get('prioridad', 'listado'), data.get('presupuesto_bytes'), data.get('presupuesto_segundos')
+    )
+
+def _trabajo_con_dispositivo(serial, tipo, flujo, data):
+    """
+    Función de un trabajo que arrienda el dispositivo recién cuando empieza y
+    ejecuta el flujo con la sesión arrendada
+    
+    Args:
+        serial: Serial del dispositivo
+        tipo: Tipo de trabajo (se muestra en /api/devices mientras lo usa)
+        flujo: Función (sesion, data, progreso=...) que ejecuta la extracción
+        data: Opciones de la extracción
+    """
+    def ejecutar(progreso):
+        progreso.cambiar_etapa('esperando_dispositivo')
+        sesion = registro_dispositivos.arrendar(serial, tipo, Config.DEVICE_LEASE_TIMEOUT)
+        try:
+            return flujo(sesion, data, progreso=progreso)
+        finally:
+            sesion.liberar()
+    return ejecutar
+
+def _encolar_trabajo(tipo, flujo):
+    """
+    Encolar una extracción sobre el dispositivo pedido ("serial" en el cuerpo o
+    en la query). El dispositivo se arrienda recién cuando el trabajo empieza.
+    
+    Args:
+        tipo: Tipo de trabajo
+        flujo: Función (sesion, data, progreso=...) que ejecuta la extracción
+    
+    Returns:
+        Respuesta 202 con el trabajo encolado
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        serial = registro_dispositivos.sesion(data.get('serial') or request.args.get('serial')).serial
+    except DispositivoNoDisponible as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    
+    try:
+        trabajo = ejecutor_trabajos.enviar(tipo, _trabajo_con_dispositivo(serial, tipo, flujo, data), serial=serial)
+    except ColaLlena as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    return jsonify({
+        'success': True,
+        'data': {'trabajo': trabajo.to_dict()}
+    }), 202
+
+def con_dispositivo(descripcion, exclusivo=True):
+    """
+    Arrendar en forma exclusiva el dispositivo pedido ("serial" en el cuerpo o
+    en la query; sin serial, el único conectado) mientras dura la petición.
+    El endpoint recibe la sesión arrendada en el argumento `sesion`.
+    
+    Args:
+        descripcion: Quién usa el dispositivo (se muestra en /api/devices)
+        exclusivo: False = solo lectura (propiedades en caché, getprop): la sesión
+            se usa sin arrendarla, así no espera detrás de una extracción en curso
+    """
+    def decorador(f):
+        @wraps(f)
+        def envoltura(*args, **kwargs):
+            data = request.get_json(silent=True) or {}
+            serial = data.get('serial') or request.args.get('serial')
+            try:
+                if exclusivo:
+                    sesion = registro_dispositivos.arrendar(serial, descripcion, Config.DEVICE_LEASE_TIMEOUT)
+                else:
+                    sesion = registro_dispositivos.sesion(serial)
+            except DispositivoNoDisponible as e:
+                return jsonify({'success': False, 'error': str(e)}), 404
+            except DispositivoOcupado as e:
+                return jsonify({'success': False, 'error': str(e)}), 409
+            if not exclusivo:
+                return f(*args, sesion=sesion, **kwargs)
+            
+            liberar = True
+            try:
+                respuesta = f(*args, sesion=sesion, **kwargs)
+                # Las respuestas en stream conservan el dispositivo hasta terminar de enviarse
+                if isinstance(respuesta, Response) and respuesta.is_streamed:
+                    respuesta.call_on_close(sesion.liberar)
+                    liberar = False
+                return respuesta
+            finally:
+                if liberar:
+                    sesion.liberar()
+        return envoltura
+    return decorador
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -147,66 +261,82 @@ def delete_user(user_id):
 def extract_files():
     """
     Endpoint para extraer archivos y generar una evaluación.
+    
+    La extracción se ejecuta en segundo plano: responde 202 con el trabajo,
+    cuyo estado y progreso se consultan en /api/jobs/<id>.
     """
     try:
         data = request.get_json() if request.is_json else {}
+        try:
+            _validar_opciones_extraccion(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        return _encolar_trabajo('extraccion', FlujoExtraccionService.extraer_evaluacion)
         
-        rutas = data.get('rutas')
-        categorias = data.get('categorias')
-        carpeta_destino = data.get('carpeta_destino', Config.UPLOAD_FOLDER)
-        metadata_extra = data.get('metadata', {})
-        
-        # 1. Obtener info del dispositivo
-        extractor = AndroidFileExtractor(carpeta_destino=carpeta_destino)
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/extract-multiple', methods=['POST'])
+@jwt_required()
+def extract_multiple_devices():
+    """
+    Extraer varios dispositivos a la vez, cada uno con su propia evaluación.
+    Las conexiones USB y el procesamiento de metadatos del host se reparten
+    en forma justa entre ellos.
+    
+    Se encola un trabajo por dispositivo (responde 202 con sus ids); corren a
+    la vez tantos como JOB_WORKERS y cada uno se consulta o cancela por separado.
+    """
+    try:
+        data = request.get_json() if request.is_json else {}
+        seriales = data.get('seriales') or [
+            d['serial'] for d in registro_dispositivos.listar() if d['estado'] == 'device'
+        ]
+        seriales = list(dict.fromkeys(seriales))
+        if not seriales:
+            return jsonify({'success': False, 'error': 'No hay dispositivos Android conectados'}), 404
         try:
-            info_dispositivo = extractor.obtener_info_dispositivo()
-        except Exception as e:
-            return jsonify({'success': False, 'error': f"Error al conectar dispositivo: {str(e)}"}), 500
-            
-        # 2. Crear Evaluación en BD
-        evaluacion = EvaluacionService.crear_evaluacion(info_dispositivo, metadata_extra)
+            _validar_opciones_extraccion(data)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        try:
+            seriales = [registro_dispositivos.sesion(serial).serial for serial in seriales]
+        except DispositivoNoDisponible as e:
+            return jsonify({'success': False, 'error': str(e)}), 404
         
-        # 3. Ejecutar extracción física
-        resultado_extraccion = extractor.extraer_archivos(
-            rutas_personalizadas=rutas,
-            categorias_filtro=categorias
-        )
+        # Los trabajos comparten el reparto; cada dispositivo cuenta desde que su trabajo empieza
+        reparto = RepartoHost(Config.HOST_USB_CONNECTIONS, Config.HOST_METADATA_WORKERS)
         
-        # 4. Procesar archivos descargados para extraer metadatos y guardar en BD
-        archivos_procesados = []
-        if resultado_extraccion['archivos_descargados'] > 0:
-            # La carpeta destino tiene los archivos descargados
-            carpeta_final = resultado_extraccion['carpeta_destino']
-            for nombre_archivo in os.listdir(carpeta_final):
-                ruta_completa = os.path.join(carpeta_final, nombre_archivo)
-                if os.path.isfile(ruta_completa):
-                    # Verificar si este archivo fue parte de la extracción reciente
-                    # (Esto es una simplificación, idealmente el extractor retornaría las rutas exactas de los descargados)
-                    try:
-                        archivo_db = ArchivoService.procesar_archivo_descargado(ruta_completa, evaluacion.id)
-                        archivos_procesados.append(archivo_db.to_dict())
-                    except Exception as e:
-                        print(f"Error procesando metadatos de {nombre_archivo}: {e}")
-        
-        # 5. Extraer y guardar llamadas del dispositivo
-        llamadas_guardadas = []
+        def extraer(sesion, data, progreso=None):
+            reparto.registrar(sesion.serial)
+            try:
+                # Cada evaluación descarga en su propia carpeta
+                resultado = FlujoExtraccionService.extraer_evaluacion(sesion, data, reparto, progreso=progreso)
+            finally:
+                reparto.retirar(sesion.serial)
+            resultado['rendimiento'] = reparto.estadisticas()
+            return resultado
+        
+        trabajos = []
         try:
-            llamadas_extraidas = extractor.extraer_llamadas()
-            if llamadas_extraidas:
-                llamadas_db = LlamadaService.guardar_llamadas(llamadas_extraidas, evaluacion.id)
-                llamadas_guardadas = [l.to_dict() for l in llamadas_db]
-        except Exception as e:
-            print(f"Error extrayendo llamadas: {e}")
+            for serial in seriales:
+                trabajos.append(ejecutor_trabajos.enviar(
+                    'extraccion_multiple', _trabajo_con_dispositivo(serial, 'extraccion_multiple', extraer, data),
+                    serial=serial
+                ))
+        except ColaLlena as e:
+            # Todos o ninguno: los ya encolados se cancelan antes de empezar
+            for trabajo in trabajos:
+                ejecutor_trabajos.cancelar(trabajo.id)
+            return jsonify({'success': False, 'error': str(e)}), 503
         
         return jsonify({
             'success': True,
-            'data': {
-                'evaluacion': evaluacion.to_dict(),
-                'extraccion': resultado_extraccion,
-                'archivos_procesados': len(archivos_procesados),
-                'llamadas_extraidas': len(llamadas_guardadas)
-            }
-        }), 200
+            'data': {'trabajos': {trabajo.descripcion['serial']: trabajo.to_dict() for trabajo in trabajos}}
+        }), 202
         
     except Exception as e:
         return jsonify({
@@ -219,10 +349,9 @@ def extract_files():
 def listar_evaluaciones():
     """Listar todas las evaluaciones"""
     try:
-        evaluaciones = EvaluacionService.listar_evaluaciones()
         return jsonify({
             'success': True,
-            'data': [e.to_dict() for e in evaluaciones]
+            'data': EvaluacionService.resumen_evaluaciones()
         }), 200
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -247,6 +376,25 @@ def obtener_evaluacion(id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/evaluaciones/<int:id>/registros/<tabla>', methods=['GET'])
+@jwt_required()
+def listar_registros_evaluacion(id, tabla):
+    """Listar por páginas los mensajes, contactos o eventos de calendario de una evaluación"""
+    try:
+        desde = int(request.args.get('desde', 0))
+        limite = int(request.args.get('limite', 100))
+        registros, total = ProveedorService.listar(tabla, id, desde, limite)
+        return jsonify({
+            'success': True,
+            'data': {
+                'total': total,
+                'desde': desde,
+                'registros': [r.to_dict() for r in registros]
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/evaluaciones/<int:id>/pdf', methods=['GET'])
 @jwt_required()
 def descargar_pdf_evaluacion(id):
@@ -278,6 +426,17 @@ def serve_file(file_id):
         if not archivo:
             return jsonify({'success': False, 'error': 'Archivo no encontrado'}), 404
         
+        # Archivo de una extracción de triage: el original sigue en el dispositivo
+        triage = (archivo.metadata_archivo or {}).get('triage')
+        if triage and triage.get('estado') != 'original':
+            if request.args.get('vista') == 'previa':
+                if not triage.get('vista_previa') or not os.path.exists(triage['vista_previa']):
+                    return jsonify({'success': False, 'error': 'El archivo no tiene vista previa'}), 404
+                return send_file(triage['vista_previa'], mimetype='image/jpeg', as_attachment=False)
+            archivo, error = _descargar_original_triage(archivo, triage)
+            if error:
+                return error
+        
         # La ruta almacenada es relativa a la carpeta de descargas
         ruta_completa = archivo.ruta_almacenamiento
         
@@ -300,13 +459,63 @@ def serve_file(file_id):
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+def _descargar_original_triage(archivo, triage):
+    """
+    Descargar del dispositivo el original de un archivo de triage y
+    reemplazar con él la vista previa
+
+    Returns:
+        Tupla (archivo, respuesta de error o None)
+    """
+    try:
+        sesion = registro_dispositivos.arrendar(
+            triage.get('serial'), f"original {archivo.id}", Config.DEVICE_LEASE_TIMEOUT
+        )
+    except DispositivoNoDisponible as e:
+        return archivo, (jsonify({'success': False, 'error': f"Original no descargado: {e}"}), 404)
+    except DispositivoOcupado as e:
+        return archivo, (jsonify({'success': False, 'error': str(e)}), 409)
+    
+    try:
+        # Otra petición pudo haberlo descargado mientras se esperaba el dispositivo
+        db.session.refresh(archivo)
+        if archivo.metadata_archivo.get('triage', {}).get('estado') == 'original':
+            return archivo, None
+        
+        extractor = AndroidFileExtractor(
+            carpeta_destino=EvaluacionService.carpeta_archivos(archivo.evaluacion_id), sesion=sesion,
+            almacen=almacen
+        )
+        resultado = extractor.descargar_original(triage['ruta_dispositivo'])
+        if resultado['error']:
+            return archivo, (jsonify({'success': False, 'error': f"Original no descargado: {resultado['error']}"}), 502)
+        return ArchivoService.completar_original(archivo, resultado['destino'], resultado.get('huella')), None
+    finally:
+        sesion.liberar()
+
+@app.route('/api/devices', methods=['GET'])
+@jwt_required()
+def list_devices():
+    """Listar los dispositivos conectados, con su estado de arriendo y cola"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': registro_dispositivos.listar()
+        }), 200
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/device-info', methods=['GET'])
 @jwt_required()
-def device_info():
+@con_dispositivo('informacion', exclusivo=False)
+def device_info(sesion):
     """Obtener información del dispositivo conectado"""
     try:
-        extractor = AndroidFileExtractor()
-        info = extractor.obtener_info_dispositivo()
+        extractor = AndroidFileExtractor(sesion=sesion)
+        info = extractor.obtener_info_dispositivo(refrescar=request.args.get('refrescar') == '1')
         
         return jsonify({
             'success': True,
@@ -321,16 +530,18 @@ def device_info():
 
 @app.route('/api/extract-calls', methods=['POST'])
 @jwt_required()
-def extract_calls_only():
+@con_dispositivo('llamadas')
+def extract_calls_only(sesion):
     """
     Endpoint para extraer solo llamadas sin descargar archivos.
     """
     try:
         data = request.get_json() if request.is_json else {}
         metadata_extra = data.get('metadata', {})
+        llamadas_incrementales = bool(data.get('llamadas_incrementales', False))
         
         # 1. Obtener info del dispositivo
-        extractor = AndroidFileExtractor()
+        extractor = AndroidFileExtractor(sesion=sesion)
         try:
             info_dispositivo = extractor.obtener_info_dispositivo()
         except Exception as e:
@@ -342,7 +553,10 @@ def extract_calls_only():
         # 3. Extraer y guardar llamadas del dispositivo
         llamadas_guardadas = []
         try:
-            llamadas_extraidas = extractor.extraer_llamadas()
+            desde_ms = None
+            if llamadas_incrementales:
+                desde_ms = LlamadaService.ultima_fecha_llamada_ms(info_dispositivo.get('serial'))
+            llamadas_extraidas = extractor.extraer_llamadas(desde_ms=desde_ms)
             if llamadas_extraidas:
                 llamadas_db = LlamadaService.guardar_llamadas(llamadas_extraidas, evaluacion.id)
                 llamadas_guardadas = [l.to_dict() for l in llamadas_db]
@@ -365,53 +579,37 @@ def extract_calls_only():
             'error': str(e)
         }), 500
 
-@app.route('/api/extract-whatsapp-backups', methods=['POST'])
+@app.route('/api/extract-providers', methods=['POST'])
 @jwt_required()
-def extract_whatsapp_backups():
+@con_dispositivo('proveedores')
+def extract_providers(sesion):
     """
-    Endpoint para extraer backups de WhatsApp del dispositivo.
+    Endpoint para extraer registros de content providers (SMS/MMS, contactos,
+    calendario) sin descargar archivos.
     """
     try:
         data = request.get_json() if request.is_json else {}
         metadata_extra = data.get('metadata', {})
-        carpeta_destino = data.get('carpeta_destino', Config.UPLOAD_FOLDER)
+        proveedores = data.get('proveedores') or ['sms', 'mms', 'contactos', 'calendario']
         
         # 1. Obtener info del dispositivo
-        extractor = AndroidFileExtractor(carpeta_destino=carpeta_destino)
+        extractor = AndroidFileExtractor(sesion=sesion)
         try:
             info_dispositivo = extractor.obtener_info_dispositivo()
         except Exception as e:
             return jsonify({'success': False, 'error': f"Error al conectar dispositivo: {str(e)}"}), 500
-            
+        
         # 2. Crear Evaluación en BD
         evaluacion = EvaluacionService.crear_evaluacion(info_dispositivo, metadata_extra)
         
-        # 3. Extraer backups de WhatsApp
-        resultado_backups = extractor.extraer_backups_whatsapp()
-        
-        # 4. Procesar backups descargados para guardarlos en BD con metadata de WhatsApp
-        archivos_procesados = []
-        if resultado_backups['backups_descargados'] > 0 and resultado_backups['carpeta_destino']:
-            for backup in resultado_backups['backups_encontrados']:
-                if 'ruta_local' in backup:
-                    try:
-                        # Usar el nuevo método que guarda la metadata específica de WhatsApp
-                        archivo_db = ArchivoService.procesar_backup_whatsapp(
-                            ruta_archivo=backup['ruta_local'],
-                            id_evaluacion=evaluacion.id,
-                            backup_info=backup
-                        )
-                        archivos_procesados.append(archivo_db.to_dict())
-                        print(f"✅ Backup guardado en BD: {backup['nombre']}")
-                    except Exception as e:
-                        print(f"❌ Error procesando backup {backup['nombre']}: {e}")
+        # 3. Extraer y guardar por lotes los registros de cada proveedor
+        registros_proveedores = ProveedorService.extraer_y_guardar(extractor, proveedores, evaluacion.id)
         
         return jsonify({
             'success': True,
             'data': {
                 'evaluacion': evaluacion.to_dict(),
-                'backups': resultado_backups,
-                'archivos_procesados': len(archivos_procesados)
+                'proveedores': registros_proveedores
             }
         }), 200
         
@@ -421,20 +619,145 @@ def extract_whatsapp_backups():
             'error': str(e)
         }), 500
 
+@app.route('/api/extract-whatsapp-backups', methods=['POST'])
+@jwt_required()
+def extract_whatsapp_backups():
+    """
+    Endpoint para extraer backups de WhatsApp del dispositivo.
+    
+    La extracción se ejecuta en segundo plano: responde 202 con el trabajo,
+    cuyo estado y progreso se consultan en /api/jobs/<id>.
+    """
+    try:
+        return _encolar_trabajo('backups_whatsapp', FlujoExtraccionService.extraer_backups_whatsapp)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+@app.route('/api/jobs', methods=['GET'])
+@jwt_required()
+def list_jobs():
+    """Listar los trabajos en cola, en curso y terminados recientemente"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': [t.to_dict(incluir_resultado=False) for t in ejecutor_trabajos.listar()]
+        }), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/jobs/<id_trabajo>', methods=['GET'])
+@jwt_required()
+def get_job(id_trabajo):
+    """
+    Estado de un trabajo: etapa, contadores, bytes/s, tiempo restante estimado
+    y, al terminar, el resultado de la extracción.
+    """
+    try:
+        trabajo = ejecutor_trabajos.obtener(id_trabajo)
+        if not trabajo:
+            return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+        return jsonify({'success': True, 'data': trabajo.to_dict()}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/jobs/<id_trabajo>/events', methods=['GET'])
+@jwt_required()
+def job_events(id_trabajo):
+    """
+    Progreso en vivo de un trabajo como Server-Sent Events. Los cambios se
+    agrupan: como máximo un evento cada JOB_EVENTS_INTERVAL segundos.
+    """
+    try:
+        trabajo = ejecutor_trabajos.obtener(id_trabajo)
+        if not trabajo:
+            return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+        return Response(
+            _generar_eventos_trabajo(trabajo),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+def _generar_eventos_trabajo(trabajo):
+    """Serializar los eventos de progreso de un trabajo en formato SSE"""
+    for tipo, version, datos in trabajo.eventos(intervalo=Config.JOB_EVENTS_INTERVAL):
+        if tipo == 'latido':
+            yield ": latido\n\n"
+            continue
+        yield f"id: {version}\nevent: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+@app.route('/api/jobs/<id_trabajo>/cancel', methods=['POST'])
+@jwt_required()
+def cancel_job(id_trabajo):
+    """Cancelar un trabajo; las descargas en curso terminan y no se inician más"""
+    try:
+        trabajo = ejecutor_trabajos.cancelar(id_trabajo)
+        if not trabajo:
+            return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+        return jsonify({'success': True, 'data': trabajo.to_dict(incluir_resultado=False)}), 200
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/scan', methods=['POST'])
 @jwt_required()
-def scan_files():
-    """Escanear archivos sin descargarlos"""
+@con_dispositivo('escaneo')
+def scan_files(sesion):
+    """
+    Escanear archivos sin descargarlos.
+    
+    Con "formato": "ndjson" los archivos se envían como un stream de líneas JSON
+    (una por archivo, y una última línea con el resumen). Con "limite" se
+    devuelve solo la página [desde, desde + limite); el escaneo queda en caché
+    y las páginas siguientes no vuelven a recorrer el dispositivo.
+    """
     try:
         data = request.get_json() if request.is_json else {}
         rutas = data.get('rutas')
         categorias = data.get('categorias')
+        motor_escaneo = data.get('motor_escaneo', 'filesystem')
+        hilos_escaneo = data.get('hilos_escaneo', 1)
+        filtros = data.get('filtros')
+        formato = data.get('formato', 'json')
         
-        extractor = AndroidFileExtractor()
-        resultado = extractor.escanear_archivos(
-            rutas_personalizadas=rutas,
-            categorias_filtro=categorias
-        )
+        extractor = AndroidFileExtractor(sesion=sesion)
+        
+        if formato == 'ndjson':
+            archivos = extractor.iterar_archivos(
+                rutas_personalizadas=rutas,
+                categorias_filtro=categorias,
+                motor_escaneo=motor_escaneo,
+                hilos_escaneo=hilos_escaneo,
+                filtros=filtros
+            )
+            return Response(
+                stream_with_context(_generar_ndjson_escaneo(extractor, archivos)),
+                mimetype='application/x-ndjson'
+            )
+        
+        if data.get('limite') is not None:
+            resultado = extractor.escanear_pagina(
+                desde=int(data.get('desde', 0)),
+                limite=int(data['limite']),
+                rutas_personalizadas=rutas,
+                categorias_filtro=categorias,
+                motor_escaneo=motor_escaneo,
+                hilos_escaneo=hilos_escaneo,
+                filtros=filtros,
+                refrescar=bool(data.get('refrescar', False))
+            )
+        else:
+            resultado = extractor.escanear_archivos(
+                rutas_personalizadas=rutas,
+                categorias_filtro=categorias,
+                motor_escaneo=motor_escaneo,
+                hilos_escaneo=hilos_escaneo,
+                filtros=filtros
+            )
         
         return jsonify({
             'success': True,
@@ -447,6 +770,26 @@ def scan_files():
             'error': str(e)
         }), 500
 
+def _generar_ndjson_escaneo(extractor, archivos, lineas_por_bloque=500):
+    """Serializar los archivos escaneados como NDJSON, enviando varias líneas por bloque"""
+    bloque = []
+    try:
+        for archivo in archivos:
+            bloque.append(json.dumps(archivo.to_dict(), ensure_ascii=False))
+            if len(bloque) >= lineas_por_bloque:
+                yield "\n".join(bloque) + "\n"
+                bloque = []
+        bloque.append(json.dumps({
+            'resumen': {
+                'total_archivos': extractor.total_archivos,
+                'resumen_categorias': extractor.resumen_categorias,
+                'tiempos_por_ruta': extractor.tiempos_por_ruta
+            }
+        }))
+    except Exception as e:
+        bloque.append(json.dumps({'error': str(e)}))
+    yield "\n".join(bloque) + "\n"
+
 if __name__ == '__main__':
     # Crear carpeta de descargas si no existe
     os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
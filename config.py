@@ -18,6 +18,32 @@ class Config:
     # Upload Configuration
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'archivos_descargados')
     MAX_CONTENT_LENGTH = 100 * 1024 * 1024  # 100MB
+    
+    # Almacén por contenido de los archivos extraídos (una copia por SHA-256, en subcarpetas ab/cd/)
+    EVIDENCE_STORE_FOLDER = os.environ.get(
+        'EVIDENCE_STORE_FOLDER', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'almacen')
+    )
+    
+    # Manifiestos por serial de la extracción incremental
+    MANIFEST_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'manifiestos')
+    
+    # Segundos que una petición espera en la cola de un dispositivo ocupado
+    DEVICE_LEASE_TIMEOUT = float(os.environ.get('DEVICE_LEASE_TIMEOUT', 600))
+    
+    # Recursos del host repartidos entre extracciones simultáneas de varios dispositivos
+    HOST_USB_CONNECTIONS = int(os.environ.get('HOST_USB_CONNECTIONS', 8))
+    HOST_METADATA_WORKERS = int(os.environ.get('HOST_METADATA_WORKERS', 2))
+    
+    # Ingesta por etapas de /api/extract: hilos de metadatos, capacidad de cada cola y registros por transacción
+    INGEST_METADATA_WORKERS = int(os.environ.get('INGEST_METADATA_WORKERS', 2))
+    INGEST_QUEUE_SIZE = int(os.environ.get('INGEST_QUEUE_SIZE', 64))
+    INGEST_BATCH_SIZE = int(os.environ.get('INGEST_BATCH_SIZE', 50))
+    
+    # Extracciones en segundo plano: trabajos ejecutándose a la vez y máximo en espera
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_QUEUE_LIMIT = int(os.environ.get('JOB_QUEUE_LIMIT', 20))
+    # Segundos mínimos entre eventos de progreso de /api/jobs/<id>/events
+    JOB_EVENTS_INTERVAL = float(os.environ.get('JOB_EVENTS_INTERVAL', 0.5))
 
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'dev_secret_key_change_in_production')
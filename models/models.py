@@ -1,4 +1,5 @@
 from datetime import datetime
+from sqlalchemy import select, func
 from sqlalchemy.dialects.postgresql import JSONB
 from database import db
 
@@ -46,8 +47,50 @@ class Evaluacion(db.Model):
     
     # Relación con llamadas
     llamadas = db.relationship('Llamada', backref='evaluacion', lazy=True, cascade="all, delete-orphan")
+    
+    # Registros de otros proveedores del dispositivo (pueden ser cientos de miles:
+    # se consultan bajo demanda y los borra la base de datos en cascada)
+    mensajes = db.relationship('Mensaje', backref='evaluacion', lazy='dynamic',
+                               cascade="all, delete-orphan", passive_deletes=True)
+    contactos = db.relationship('Contacto', backref='evaluacion', lazy='dynamic',
+                                cascade="all, delete-orphan", passive_deletes=True)
+    eventos_calendario = db.relationship('EventoCalendario', backref='evaluacion', lazy='dynamic',
+                                         cascade="all, delete-orphan", passive_deletes=True)
 
-    def to_dict(self):
+    @staticmethod
+    def contar_registros(ids):
+        """
+        Cantidad de archivos, llamadas y registros de proveedores de varias
+        evaluaciones en una sola consulta (subconsultas COUNT correlacionadas)
+
+        Returns:
+            Diccionario id -> {'cantidad_archivos': ..., 'cantidad_llamadas': ..., ...}
+        """
+        if not ids:
+            return {}
+        relacionados = {
+            'cantidad_archivos': Archivo,
+            'cantidad_llamadas': Llamada,
+            'cantidad_mensajes': Mensaje,
+            'cantidad_contactos': Contacto,
+            'cantidad_eventos_calendario': EventoCalendario
+        }
+        columnas = [
+            select(func.count()).select_from(modelo).where(modelo.evaluacion_id == Evaluacion.id)
+            .correlate(Evaluacion).scalar_subquery().label(clave)
+            for clave, modelo in relacionados.items()
+        ]
+        filas = db.session.execute(select(Evaluacion.id, *columnas).where(Evaluacion.id.in_(ids)))
+        return {fila.id: {clave: getattr(fila, clave) for clave in relacionados} for fila in filas}
+
+    def to_dict(self, conteos=None):
+        """
+        Args:
+            conteos: Cantidades ya calculadas con contar_registros (al listar varias
+                evaluaciones); None = se consultan solo para esta
+        """
+        if conteos is None:
+            conteos = Evaluacion.contar_registros([self.id]).get(self.id, {})
         return {
             'id': self.id,
             'fecha_creacion': self.fecha_creacion.isoformat(),
@@ -58,8 +101,7 @@ class Evaluacion(db.Model):
                 'version_android': self.dispositivo_version_android
             },
             'metadata': self.metadata_evaluacion,
-            'cantidad_archivos': len(self.archivos),
-            'cantidad_llamadas': len(self.llamadas)
+            **conteos
         }
 
 class Archivo(db.Model):
@@ -88,6 +130,15 @@ class Archivo(db.Model):
             'ruta': self.ruta_almacenamiento
         }
 
+class Blob(db.Model):
+    """Archivo del almacén por contenido, con la cantidad de registros de Archivo que lo usan"""
+    __tablename__ = 'blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    tamano_bytes = db.Column(db.BigInteger)
+    referencias = db.Column(db.Integer, nullable=False, default=0)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.now)
+
 class Llamada(db.Model):
     __tablename__ = 'llamadas'
     
@@ -115,3 +166,98 @@ class Llamada(db.Model):
             'metadata': self.metadata_llamada,
             'fecha_extraccion': self.fecha_extraccion.isoformat()
         }
+
+class Mensaje(db.Model):
+    __tablename__ = 'mensajes'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    id_dispositivo = db.Column(db.BigInteger)
+    tipo_mensaje = db.Column(db.String(10))  # 'sms', 'mms'
+    hilo_id = db.Column(db.BigInteger)
+    direccion = db.Column(db.Text)
+    asunto = db.Column(db.Text)
+    cuerpo = db.Column(db.Text)
+    fecha = db.Column(db.DateTime)
+    tipo = db.Column(db.String(20))  # 'recibido', 'enviado', 'borrador', 'bandeja_salida', 'fallido', 'en_cola'
+    leido = db.Column(db.Boolean)
+    
+    # Columnas del proveedor sin campo propio
+    metadata_mensaje = db.Column(JSONB, default={})
+    
+    fecha_extraccion = db.Column(db.DateTime, default=datetime.now)
+    evaluacion_id = db.Column(db.Integer, db.ForeignKey('evaluaciones.id', ondelete='CASCADE'),
+                              nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo_mensaje': self.tipo_mensaje,
+            'hilo_id': self.hilo_id,
+            'direccion': self.direccion,
+            'asunto': self.asunto,
+            'cuerpo': self.cuerpo,
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'tipo': self.tipo,
+            'leido': self.leido,
+            'metadata': self.metadata_mensaje
+        }
+
+class Contacto(db.Model):
+    """Un dato de un contacto (teléfono, email, dirección...), tal como lo guarda el proveedor"""
+    __tablename__ = 'contactos'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    contacto_id = db.Column(db.BigInteger)
+    nombre = db.Column(db.Text)
+    tipo_dato = db.Column(db.String(255))  # 'telefono', 'email', 'direccion', 'organizacion', ...
+    valor = db.Column(db.Text)
+    
+    # Columnas del proveedor sin campo propio
+    metadata_contacto = db.Column(JSONB, default={})
+    
+    fecha_extraccion = db.Column(db.DateTime, default=datetime.now)
+    evaluacion_id = db.Column(db.Integer, db.ForeignKey('evaluaciones.id', ondelete='CASCADE'),
+                              nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'contacto_id': self.contacto_id,
+            'nombre': self.nombre,
+            'tipo_dato': self.tipo_dato,
+            'valor': self.valor,
+            'metadata': self.metadata_contacto
+        }
+
+class EventoCalendario(db.Model):
+    __tablename__ = 'eventos_calendario'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    id_dispositivo = db.Column(db.BigInteger)
+    titulo = db.Column(db.Text)
+    descripcion = db.Column(db.Text)
+    ubicacion = db.Column(db.Text)
+    inicio = db.Column(db.DateTime)
+    fin = db.Column(db.DateTime)
+    todo_el_dia = db.Column(db.Boolean)
+    organizador = db.Column(db.Text)
+    
+    # Columnas del proveedor sin campo propio
+    metadata_evento = db.Column(JSONB, default={})
+    
+    fecha_extraccion = db.Column(db.DateTime, default=datetime.now)
+    evaluacion_id = db.Column(db.Integer, db.ForeignKey('evaluaciones.id', ondelete='CASCADE'),
+                              nullable=False, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'titulo': self.titulo,
+            'descripcion': self.descripcion,
+            'ubicacion': self.ubicacion,
+            'inicio': self.inicio.isoformat() if self.inicio else None,
+            'fin': self.fin.isoformat() if self.fin else None,
+            'todo_el_dia': self.todo_el_dia,
+            'organizador': self.organizador,
+            'metadata': self.metadata_evento
+        }
@@ -0,0 +1,174 @@
+import os
+from collections import Counter
+from sqlalchemy import select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+from models.models import Blob
+from database import db
+from utils.content_store import AlmacenContenido
+from config import Config
+
+
+class AlmacenReferenciado(AlmacenContenido):
+    """
+    Almacén por contenido cuyo ingreso reserva el blob en la base de datos.
+
+    La reserva es una referencia más en Blob, confirmada antes de tocar el
+    disco: mientras dure, la eliminación de otra evaluación no puede borrar
+    el archivo aunque todavía no exista el registro de Archivo que lo usa.
+    Quien ingresa un archivo suelta su reserva con AlmacenService.soltar
+    después de confirmar (o descartar) sus registros.
+    """
+
+    def ingresar(self, ruta_archivo, sha256=None):
+        ya_en_almacen = self.contiene(ruta_archivo)
+        if ya_en_almacen:
+            sha256 = os.path.basename(ruta_archivo)
+        tamano = os.path.getsize(ruta_archivo)
+        sha256 = (sha256 or self.calcular_sha256(ruta_archivo)).lower()
+        self.ruta_blob(sha256)  # un hash no válido se rechaza antes de reservarlo
+        AlmacenService.reservar(sha256, tamano)
+        try:
+            # Pudo eliminarse entre la comprobación y la reserva
+            if ya_en_almacen and not os.path.exists(ruta_archivo):
+                raise FileNotFoundError(f"El archivo {ruta_archivo} ya no está en el almacén")
+            return super().ingresar(ruta_archivo, sha256)
+        except BaseException:
+            AlmacenService.soltar([sha256])
+            raise
+
+
+# Almacén por contenido de los archivos extraídos, compartido por todas las evaluaciones
+almacen = AlmacenReferenciado(Config.EVIDENCE_STORE_FOLDER)
+
+
+class AlmacenService:
+    @staticmethod
+    def ingresar(ruta_archivo, metadata, reservas):
+        """
+        Mueve al almacén un archivo cuyo SHA-256 ya está en sus metadatos
+
+        Args:
+            ruta_archivo: Archivo local
+            metadata: Metadatos del archivo (con hash_sha256)
+            reservas: Lista donde se agrega el hash reservado al ingresarlo; se suelta
+                con soltar después de confirmar el registro
+
+        Returns:
+            Ruta del archivo en el almacén (o la misma ruta si no tiene hash)
+        """
+        sha256 = (metadata or {}).get('hash_sha256')
+        if not sha256 or almacen.contiene(ruta_archivo):
+            # Un archivo que ya está en el almacén lo reservó quien lo ingresó
+            return ruta_archivo
+        ruta_blob, _ = almacen.ingresar(ruta_archivo, sha256)
+        reservas.append(os.path.basename(ruta_blob))
+        return ruta_blob
+
+    @staticmethod
+    def _blob_de(archivo):
+        """SHA-256 del blob al que apunta el archivo, o None si no está en el almacén"""
+        sha256 = (archivo.metadata_archivo or {}).get('hash_sha256')
+        if sha256 and almacen.contiene(archivo.ruta_almacenamiento):
+            return sha256
+        return None
+
+    @staticmethod
+    def _sumar_referencias(conteos):
+        """
+        INSERT ... ON CONFLICT que suma referencias a cada blob, así dos
+        extracciones simultáneas del mismo contenido no chocan al crearlo
+
+        Args:
+            conteos: Diccionario sha256 -> (referencias, tamaño en bytes)
+        """
+        sentencia = insert(Blob).values([
+            {'sha256': sha256, 'tamano_bytes': tamano, 'referencias': referencias}
+            for sha256, (referencias, tamano) in conteos.items()
+        ])
+        return sentencia.on_conflict_do_update(
+            index_elements=[Blob.sha256],
+            set_={'referencias': Blob.referencias + sentencia.excluded.referencias}
+        )
+
+    @staticmethod
+    def _restar_referencias(conexion, conteos):
+        """Resta referencias a cada blob y devuelve los que quedaron en cero"""
+        sin_referencias = []
+        for sha256, referencias in conteos.items():
+            resultado = conexion.execute(
+                update(Blob).where(Blob.sha256 == sha256)
+                .values(referencias=Blob.referencias - referencias)
+                .returning(Blob.referencias)
+            ).first()
+            if resultado is not None and resultado[0] <= 0:
+                sin_referencias.append(sha256)
+        return sin_referencias
+
+    @staticmethod
+    def reservar(sha256, tamano_bytes=None):
+        """Reserva un blob antes de ingresarlo (en su propia transacción, confirmada enseguida)"""
+        with db.engine.begin() as conexion:
+            conexion.execute(AlmacenService._sumar_referencias({sha256: (1, tamano_bytes)}))
+
+    @staticmethod
+    def soltar(hashes):
+        """
+        Suelta las reservas tomadas al ingresar y elimina los blobs que quedaron
+        sin referencias (el contenido de un registro que no llegó a confirmarse)
+
+        Returns:
+            Cantidad de archivos eliminados del almacén
+        """
+        if not hashes:
+            return 0
+        with db.engine.begin() as conexion:
+            sin_referencias = AlmacenService._restar_referencias(conexion, Counter(hashes))
+        return AlmacenService.eliminar_sin_referencias(sin_referencias)
+
+    @staticmethod
+    def referenciar(archivos):
+        """Suma una referencia por cada archivo a su blob (sin confirmar la transacción)"""
+        conteos = {}
+        for archivo in archivos:
+            sha256 = AlmacenService._blob_de(archivo)
+            if sha256:
+                referencias, _ = conteos.get(sha256, (0, None))
+                conteos[sha256] = (referencias + 1, archivo.tamano_bytes)
+        if conteos:
+            db.session.execute(AlmacenService._sumar_referencias(conteos))
+
+    @staticmethod
+    def liberar(archivos):
+        """
+        Resta la referencia de cada archivo a su blob (sin confirmar la transacción)
+
+        Returns:
+            Hashes de los blobs que quedaron sin referencias; sus archivos se
+            eliminan con eliminar_sin_referencias después de confirmar
+        """
+        conteos = Counter(filter(None, (AlmacenService._blob_de(archivo) for archivo in archivos)))
+        if not conteos:
+            return []
+        return AlmacenService._restar_referencias(db.session, conteos)
+
+    @staticmethod
+    def eliminar_sin_referencias(hashes):
+        """
+        Elimina del disco los blobs liberados que siguen sin referencias.
+
+        Cada blob se bloquea (SELECT ... FOR UPDATE) antes de revisarlo: una
+        reserva simultánea del mismo contenido espera a que termine y vuelve a
+        crear el blob, o se confirma antes y el archivo se conserva.
+        """
+        eliminados = 0
+        for sha256 in hashes:
+            with db.engine.begin() as conexion:
+                referencias = conexion.execute(
+                    select(Blob.referencias).where(Blob.sha256 == sha256).with_for_update()
+                ).scalar()
+                if referencias is None or referencias > 0:
+                    continue
+                if almacen.eliminar(sha256):
+                    eliminados += 1
+                conexion.execute(delete(Blob).where(Blob.sha256 == sha256))
+        return eliminados
@@ -1,31 +1,163 @@
 import os
 import shutil
+from datetime import datetime
 from models.models import Archivo
 from database import db
+from utils.file_classifier import ClasificadorArchivos
 from utils.metadata_extractor import MetadataExtractor
+from services.almacen_service import AlmacenService
 from config import Config
 
 class ArchivoService:
     @staticmethod
-    def procesar_archivo_descargado(ruta_archivo, id_evaluacion):
+    def procesar_archivo_descargado(ruta_archivo, id_evaluacion, huella=None):
         """
         Procesa un archivo ya descargado, extrae metadatos y lo guarda en BD
+        
+        Args:
+            ruta_archivo: Ruta local del archivo descargado
+            id_evaluacion: ID de la evaluación
+            huella: Hashes y bytes iniciales calculados durante la descarga (opcional)
         """
         if not os.path.exists(ruta_archivo):
             raise FileNotFoundError(f"El archivo {ruta_archivo} no existe")
             
         # Extraer metadatos
-        metadata = MetadataExtractor.get_file_metadata(ruta_archivo)
+        metadata = MetadataExtractor.get_file_metadata(ruta_archivo, huella)
         
         # Crear registro en BD
-        nuevo_archivo = Archivo(
-            nombre_original=os.path.basename(ruta_archivo),
-            ruta_almacenamiento=ruta_archivo,
+        reservas = []
+        try:
+            nuevo_archivo = ArchivoService._archivo_desde_metadata(ruta_archivo, id_evaluacion, metadata, reservas)
+            
+            db.session.add(nuevo_archivo)
+            AlmacenService.referenciar([nuevo_archivo])
+            db.session.commit()
+        finally:
+            AlmacenService.soltar(reservas)
+        
+        return nuevo_archivo
+
+    @staticmethod
+    def guardar_lote(registros, id_evaluacion):
+        """
+        Guarda en una sola transacción un lote de archivos con sus metadatos ya calculados
+        
+        Args:
+            registros: Lista de tuplas (ruta_archivo, metadata, reutilizado). Un archivo
+                reutilizado de una extracción anterior solo trae en metadata su
+                nombre_original y ruta_dispositivo: el resto se copia de su último
+                registro (o se calcula si no lo tiene)
+            id_evaluacion: ID de la evaluación
+        
+        Returns:
+            Lista de Archivo guardados
+        """
+        reutilizados = [ruta for ruta, _, reutilizado in registros if reutilizado]
+        anteriores = {}
+        if reutilizados:
+            consulta = Archivo.query.filter(Archivo.ruta_almacenamiento.in_(reutilizados))\
+                .order_by(Archivo.id.desc())
+            for archivo in consulta:
+                # El mismo contenido puede venir de varias rutas del dispositivo:
+                # se prefiere el registro de la misma ruta
+                ruta_dispositivo = (archivo.metadata_archivo or {}).get('ruta_dispositivo')
+                anteriores.setdefault((archivo.ruta_almacenamiento, ruta_dispositivo), archivo)
+                anteriores.setdefault((archivo.ruta_almacenamiento, None), archivo)
+        
+        nuevos = []
+        reservas = []
+        try:
+            for ruta_archivo, metadata, reutilizado in registros:
+                if reutilizado:
+                    anterior = anteriores.get((ruta_archivo, metadata.get('ruta_dispositivo'))) \
+                        or anteriores.get((ruta_archivo, None))
+                    if anterior is not None:
+                        nuevos.append(ArchivoService._copiar_archivo(anterior, id_evaluacion, metadata))
+                        continue
+                    metadata = {
+                        **MetadataExtractor.get_file_metadata(ruta_archivo, nombre=metadata.get('nombre_original')),
+                        **metadata
+                    }
+                nuevos.append(ArchivoService._archivo_desde_metadata(ruta_archivo, id_evaluacion, metadata, reservas))
+            
+            db.session.add_all(nuevos)
+            AlmacenService.referenciar(nuevos)
+            db.session.commit()
+        finally:
+            AlmacenService.soltar(reservas)
+        
+        return nuevos
+
+    @staticmethod
+    def _archivo_desde_metadata(ruta_archivo, id_evaluacion, metadata, reservas):
+        # El archivo queda en el almacén por contenido (una sola copia por hash);
+        # el nombre original se conserva en los metadatos
+        metadata.setdefault('nombre_original', os.path.basename(ruta_archivo))
+        return Archivo(
+            nombre_original=metadata['nombre_original'],
+            ruta_almacenamiento=AlmacenService.ingresar(ruta_archivo, metadata, reservas),
             tipo_mime=metadata.get('mime_type'),
             tamano_bytes=metadata.get('size_bytes'),
             metadata_archivo=metadata,
             evaluacion_id=id_evaluacion
         )
+
+    @staticmethod
+    def _copiar_archivo(anterior, id_evaluacion, origen=None):
+        """
+        Copia un registro de Archivo a otra evaluación. origen (nombre_original y
+        ruta_dispositivo) reemplaza los del registro anterior: un contenido
+        idéntico puede estar en otra ruta del dispositivo
+        """
+        metadata = {**(anterior.metadata_archivo or {}), **(origen or {})}
+        return Archivo(
+            nombre_original=metadata.get('nombre_original', anterior.nombre_original),
+            ruta_almacenamiento=anterior.ruta_almacenamiento,
+            tipo_mime=anterior.tipo_mime,
+            tamano_bytes=anterior.tamano_bytes,
+            metadata_archivo=metadata,
+            evaluacion_id=id_evaluacion
+        )
+
+    @staticmethod
+    def registrar_archivo_triage(datos_archivo, id_evaluacion, serial):
+        """
+        Registra un archivo cuyo original quedó en el dispositivo (extracción de
+        triage). Los metadatos salen del escaneo; el original se descarga la
+        primera vez que se pide con completar_original.
+        
+        Args:
+            datos_archivo: Diccionario del archivo escaneado (ArchivoEncontrado.to_dict),
+                con vista_previa y origen_vista si se obtuvo una
+            id_evaluacion: ID de la evaluación
+            serial: Serial del dispositivo donde está el original
+        """
+        clasificacion = ClasificadorArchivos.clasificar(datos_archivo['ruta'])
+        metadata = {
+            "size_bytes": datos_archivo.get('tamano', 0),
+            "extension": clasificacion["extension"],
+            "mime_type": clasificacion["mime_type"],
+            "categoria": clasificacion["categoria"],
+            "triage": {
+                "estado": "vista_previa" if datos_archivo.get('vista_previa') else "pendiente",
+                "serial": serial,
+                "ruta_dispositivo": datos_archivo['ruta'],
+                "vista_previa": datos_archivo.get('vista_previa'),
+                "origen_vista": datos_archivo.get('origen_vista')
+            }
+        }
+        if datos_archivo.get('mtime'):
+            metadata["modified_at"] = datetime.fromtimestamp(datos_archivo['mtime']).isoformat()
+        
+        nuevo_archivo = Archivo(
+            nombre_original=datos_archivo.get('nombre') or os.path.basename(datos_archivo['ruta']),
+            ruta_almacenamiento=datos_archivo.get('vista_previa') or '',
+            tipo_mime=clasificacion["mime_type"],
+            tamano_bytes=datos_archivo.get('tamano', 0),
+            metadata_archivo=metadata,
+            evaluacion_id=id_evaluacion
+        )
         
         db.session.add(nuevo_archivo)
         db.session.commit()
@@ -33,7 +165,33 @@ class ArchivoService:
         return nuevo_archivo
 
     @staticmethod
-    def procesar_backup_whatsapp(ruta_archivo, id_evaluacion, backup_info):
+    def completar_original(archivo, ruta_archivo, huella=None):
+        """
+        Reemplaza la vista previa de un archivo de triage por su original ya
+        descargado, recalculando los metadatos con el archivo completo
+        """
+        triage = dict((archivo.metadata_archivo or {}).get('triage') or {})
+        metadata = MetadataExtractor.get_file_metadata(ruta_archivo, huella, nombre=archivo.nombre_original)
+        triage["estado"] = "original"
+        triage["original_descargado_en"] = datetime.now().isoformat()
+        metadata["triage"] = triage
+        metadata["nombre_original"] = archivo.nombre_original
+        
+        reservas = []
+        try:
+            archivo.ruta_almacenamiento = AlmacenService.ingresar(ruta_archivo, metadata, reservas)
+            archivo.tipo_mime = metadata.get('mime_type')
+            archivo.tamano_bytes = metadata.get('size_bytes')
+            archivo.metadata_archivo = metadata
+            AlmacenService.referenciar([archivo])
+            db.session.commit()
+        finally:
+            AlmacenService.soltar(reservas)
+        
+        return archivo
+
+    @staticmethod
+    def procesar_backup_whatsapp(ruta_archivo, id_evaluacion, backup_info, huella=None):
         """
         Procesa un backup de WhatsApp con metadata específica
         
@@ -41,12 +199,13 @@ class ArchivoService:
             ruta_archivo: Ruta local del archivo descargado
             id_evaluacion: ID de la evaluación
             backup_info: Diccionario con información del backup (tipo_backup, app_origen, etc.)
+            huella: Hashes calculados durante la descarga (opcional)
         """
         if not os.path.exists(ruta_archivo):
             raise FileNotFoundError(f"El archivo {ruta_archivo} no existe")
             
         # Extraer metadatos básicos
-        metadata = MetadataExtractor.get_file_metadata(ruta_archivo)
+        metadata = MetadataExtractor.get_file_metadata(ruta_archivo, huella)
         
         # Añadir metadata específica de WhatsApp
         metadata['whatsapp'] = {
@@ -56,19 +215,27 @@ class ArchivoService:
             'ruta_original': backup_info.get('ruta', ''),
             'nombre_original': backup_info.get('nombre', os.path.basename(ruta_archivo))
         }
+        if backup_info.get('verificacion'):
+            metadata['whatsapp']['verificacion'] = backup_info['verificacion']
+        metadata['nombre_original'] = metadata['whatsapp']['nombre_original']
         
         # Crear registro en BD
-        nuevo_archivo = Archivo(
-            nombre_original=backup_info.get('nombre', os.path.basename(ruta_archivo)),
-            ruta_almacenamiento=ruta_archivo,
-            tipo_mime=metadata.get('mime_type', 'application/octet-stream'),
-            tamano_bytes=metadata.get('size_bytes', backup_info.get('tamano', 0)),
-            metadata_archivo=metadata,
-            evaluacion_id=id_evaluacion
-        )
-        
-        db.session.add(nuevo_archivo)
-        db.session.commit()
+        reservas = []
+        try:
+            nuevo_archivo = Archivo(
+                nombre_original=metadata['nombre_original'],
+                ruta_almacenamiento=AlmacenService.ingresar(ruta_archivo, metadata, reservas),
+                tipo_mime=metadata.get('mime_type', 'application/octet-stream'),
+                tamano_bytes=metadata.get('size_bytes', backup_info.get('tamano', 0)),
+                metadata_archivo=metadata,
+                evaluacion_id=id_evaluacion
+            )
+            
+            db.session.add(nuevo_archivo)
+            AlmacenService.referenciar([nuevo_archivo])
+            db.session.commit()
+        finally:
+            AlmacenService.soltar(reservas)
         
         return nuevo_archivo
 
@@ -76,11 +243,10 @@ class ArchivoService:
     def eliminar_archivo(id_archivo):
         archivo = Archivo.query.get(id_archivo)
         if archivo:
-            # Eliminar archivo físico (opcional, depende de requerimientos)
-            # if os.path.exists(archivo.ruta_almacenamiento):
-            #     os.remove(archivo.ruta_almacenamiento)
-            
+            # El archivo físico se elimina solo si ninguna otra evaluación lo referencia
+            sin_referencias = AlmacenService.liberar([archivo])
             db.session.delete(archivo)
             db.session.commit()
+            AlmacenService.eliminar_sin_referencias(sin_referencias)
             return True
         return False
@@ -0,0 +1,197 @@
+import threading
+import time
+from collections import deque
+import adbutils
+
+
+class DispositivoNoDisponible(Exception):
+    """No hay un dispositivo que cumpla lo pedido (no conectado, sin autorizar o serial ambiguo)"""
+
+
+class DispositivoOcupado(Exception):
+    """El dispositivo sigue arrendado por otra petición al vencer la espera"""
+
+
+class SesionDispositivo:
+    """
+    Conexión de un dispositivo conectado, con arriendo exclusivo.
+
+    Las peticiones que piden el mismo dispositivo esperan en una cola FIFO;
+    solo una a la vez puede usarlo.
+    """
+
+    def __init__(self, serial, estado):
+        self.serial = serial
+        self.estado = estado
+        self.device = adbutils.adb.device(serial=serial)
+        self.conectado_desde = time.time()
+        self.reconexiones = 0
+        # Datos del dispositivo que se reutilizan entre peticiones (propiedades,
+        # capacidades del shell); se descartan al reconectar
+        self.cache = {}
+        self.arrendado_por = None
+        self.arrendado_desde = None
+        self._cola = deque()
+        self._condicion = threading.Condition()
+
+    @property
+    def disponible(self):
+        return self.estado == "device"
+
+    def reconectar(self, estado):
+        """Renovar la conexión cuando el dispositivo vuelve a aparecer"""
+        with self._condicion:
+            self.estado = estado
+            self.device = adbutils.adb.device(serial=self.serial)
+            self.conectado_desde = time.time()
+            self.reconexiones += 1
+            self.cache = {}
+
+    def adquirir(self, descripcion, espera=None):
+        """
+        Esperar turno y tomar el dispositivo en forma exclusiva
+
+        Args:
+            descripcion: Quién lo usa (se muestra en el estado del registro)
+            espera: Segundos máximos de espera (None = sin límite, 0 = no esperar)
+
+        Raises:
+            DispositivoOcupado: Si vence la espera sin obtener el turno
+        """
+        turno = object()
+        limite = None if espera is None else time.monotonic() + espera
+        with self._condicion:
+            self._cola.append(turno)
+            while self._cola[0] is not turno or self.arrendado_por is not None:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    self._cola.remove(turno)
+                    self._condicion.notify_all()
+                    raise DispositivoOcupado(
+                        f"El dispositivo {self.serial} está en uso por {self.arrendado_por} "
+                        f"({len(self._cola)} peticiones en espera)"
+                    )
+                self._condicion.wait(restante)
+            self._cola.popleft()
+            self.arrendado_por = descripcion
+            self.arrendado_desde = time.time()
+
+    def liberar(self):
+        with self._condicion:
+            self.arrendado_por = None
+            self.arrendado_desde = None
+            self._condicion.notify_all()
+
+    def to_dict(self):
+        return {
+            "serial": self.serial,
+            "estado": self.estado,
+            "conectado_desde": self.conectado_desde,
+            "reconexiones": self.reconexiones,
+            "arrendado_por": self.arrendado_por,
+            "arrendado_desde": self.arrendado_desde,
+            "en_cola": len(self._cola)
+        }
+
+
+class RegistroDispositivos:
+    """
+    Registro de los dispositivos conectados, compartido por todo el proceso.
+
+    Un hilo sigue los cambios con track-devices y mantiene una sesión por
+    serial, así las peticiones no pagan la conexión al adb server ni eligen
+    un dispositivo al azar cuando hay varios conectados.
+    """
+
+    # Segundos antes de volver a conectarse al adb server si se pierde el seguimiento
+    REINTENTO_SEGUNDOS = 2
+
+    def __init__(self):
+        self._sesiones = {}
+        self._lock = threading.Lock()
+        self._hilo = None
+
+    def iniciar(self):
+        """Cargar los dispositivos actuales y empezar a seguir los cambios (una sola vez)"""
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(target=self._seguir_cambios, name="track-devices", daemon=True)
+        try:
+            for info in adbutils.adb.list():
+                self._actualizar(info.serial, info.state)
+        except Exception as e:
+            print(f"⚠️ No se pudo listar los dispositivos: {e}")
+        self._hilo.start()
+
+    def _seguir_cambios(self):
+        while True:
+            try:
+                for evento in adbutils.adb.track_devices():
+                    self._actualizar(evento.serial, evento.status if evento.present else "absent")
+            except Exception as e:
+                print(f"⚠️ Seguimiento de dispositivos interrumpido: {e}")
+            time.sleep(self.REINTENTO_SEGUNDOS)
+
+    def _actualizar(self, serial, estado):
+        with self._lock:
+            sesion = self._sesiones.get(serial)
+            if sesion is None:
+                if estado != "absent":
+                    self._sesiones[serial] = SesionDispositivo(serial, estado)
+                return
+        if estado == sesion.estado:
+            return
+        if estado == "device":
+            sesion.reconectar(estado)
+        else:
+            # Se conserva la sesión (y su cola) hasta que el dispositivo vuelva
+            sesion.estado = estado
+
+    def sesion(self, serial=None):
+        """
+        Sesión del dispositivo pedido
+
+        Args:
+            serial: Serial del dispositivo (None = el único dispositivo conectado)
+
+        Raises:
+            DispositivoNoDisponible
+        """
+        self.iniciar()
+        with self._lock:
+            if serial:
+                sesion = self._sesiones.get(serial)
+                if sesion is None or sesion.estado == "absent":
+                    raise DispositivoNoDisponible(f"El dispositivo {serial} no está conectado")
+                if not sesion.disponible:
+                    raise DispositivoNoDisponible(f"El dispositivo {serial} está en estado '{sesion.estado}'")
+                return sesion
+
+            disponibles = [s for s in self._sesiones.values() if s.disponible]
+        if not disponibles:
+            raise DispositivoNoDisponible("No hay dispositivos Android conectados")
+        if len(disponibles) > 1:
+            seriales = ", ".join(sorted(s.serial for s in disponibles))
+            raise DispositivoNoDisponible(f"Hay varios dispositivos conectados, indique el serial: {seriales}")
+        return disponibles[0]
+
+    def arrendar(self, serial=None, descripcion="", espera=None):
+        """
+        Tomar un dispositivo en forma exclusiva; se debe devolver con liberar()
+
+        Returns:
+            SesionDispositivo arrendada
+        """
+        sesion = self.sesion(serial)
+        sesion.adquirir(descripcion, espera)
+        return sesion
+
+    def listar(self):
+        self.iniciar()
+        with self._lock:
+            sesiones = list(self._sesiones.values())
+        return [s.to_dict() for s in sesiones if s.estado != "absent"]
+
+
+registro_dispositivos = RegistroDispositivos()
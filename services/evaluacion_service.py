@@ -1,7 +1,10 @@
 from models.models import Evaluacion, Archivo, Llamada
 from database import db
 from datetime import datetime
+from config import Config
+from services.almacen_service import AlmacenService
 import io
+import os
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -25,6 +28,17 @@ class EvaluacionService:
         db.session.commit()
         return nueva_evaluacion
 
+    @staticmethod
+    def carpeta_archivos(id_evaluacion, carpeta_base=None):
+        """
+        Carpeta propia de los archivos descargados en una evaluación
+        
+        Args:
+            id_evaluacion: ID de la evaluación
+            carpeta_base: Carpeta que contiene las de todas las evaluaciones (None = UPLOAD_FOLDER)
+        """
+        return os.path.join(carpeta_base or Config.UPLOAD_FOLDER, f"evaluacion_{id_evaluacion}")
+
     @staticmethod
     def obtener_evaluacion(id_evaluacion):
         return Evaluacion.query.get(id_evaluacion)
@@ -32,13 +46,26 @@ class EvaluacionService:
     @staticmethod
     def listar_evaluaciones():
         return Evaluacion.query.order_by(Evaluacion.fecha_creacion.desc()).all()
+
+    @staticmethod
+    def resumen_evaluaciones():
+        """
+        Todas las evaluaciones como diccionarios, con sus cantidades de registros
+        calculadas en una sola consulta para toda la lista
+        """
+        evaluaciones = EvaluacionService.listar_evaluaciones()
+        conteos = Evaluacion.contar_registros([e.id for e in evaluaciones])
+        return [e.to_dict(conteos.get(e.id)) for e in evaluaciones]
     
     @staticmethod
     def eliminar_evaluacion(id_evaluacion):
         evaluacion = Evaluacion.query.get(id_evaluacion)
         if evaluacion:
+            # Los archivos físicos compartidos con otras evaluaciones se conservan
+            sin_referencias = AlmacenService.liberar(evaluacion.archivos)
             db.session.delete(evaluacion)
             db.session.commit()
+            AlmacenService.eliminar_sin_referencias(sin_referencias)
             return True
         return False
 
@@ -1,5 +1,76 @@
 import adbutils
+import json
 import os
+import shlex
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from services.transfer_service import MotorDescarga, DescargaTar, DescargaPorBloques
+from utils.content_providers import ProveedoresContenido
+from utils.device_manifest import ManifiestoDispositivo
+from utils.exif_thumbnail import MiniaturaExif
+from utils.extraction_progress import ProgresoExtraccion, ExtraccionCancelada
+from utils.extraction_scheduler import PlanificadorExtraccion
+from utils.file_classifier import ClasificadorArchivos
+from utils.listing_parser import ListingParser
+from utils.scan_filters import FiltroEscaneo
+from utils.stream_digest import DigestoEnTransito
+
+
+class ArchivoEncontrado:
+    """
+    Registro compacto de un archivo encontrado durante el escaneo
+    """
+    __slots__ = ("ruta", "tamano", "mtime", "fecha", "mime_type", "bucket", "ruta_local", "error", "reutilizado",
+                 "huella", "vista_previa", "origen_vista", "diferido")
+    
+    def __init__(self, ruta, tamano=0, mtime=0, fecha="", mime_type=None, bucket=None):
+        self.ruta = ruta
+        self.tamano = tamano
+        self.mtime = mtime
+        self.fecha = fecha
+        self.mime_type = mime_type
+        self.bucket = bucket
+        # Resultado de la descarga (ruta local si se descargó, mensaje si falló)
+        self.ruta_local = None
+        self.error = None
+        # True si no se descargó porque ya estaba en el manifiesto sin cambios
+        self.reutilizado = False
+        # Hashes y bytes iniciales calculados durante la descarga
+        self.huella = None
+        # Vista previa descargada en modo triage (ruta local y de dónde se obtuvo)
+        self.vista_previa = None
+        self.origen_vista = None
+        # Motivo por el que no se descargó al agotarse un presupuesto de la extracción
+        self.diferido = None
+    
+    @property
+    def nombre(self):
+        return self.ruta.rsplit("/", 1)[-1]
+    
+    @property
+    def tipo(self):
+        return os.path.splitext(self.nombre)[1].lower()
+    
+    def to_dict(self):
+        datos = {
+            "ruta": self.ruta,
+            "nombre": self.nombre,
+            "tamano": self.tamano,
+            "fecha": self.fecha or ListingParser.formatear_fecha(self.mtime),
+            "tipo": self.tipo
+        }
+        if self.mtime:
+            datos["mtime"] = self.mtime
+        if self.mime_type:
+            datos["mime_type"] = self.mime_type
+        if self.bucket:
+            datos["bucket"] = self.bucket
+        if self.vista_previa:
+            datos["vista_previa"] = self.vista_previa
+            datos["origen_vista"] = self.origen_vista
+        return datos
+
 
 class AndroidFileExtractor:
     """
@@ -18,16 +89,22 @@ class AndroidFileExtractor:
         "/storage/emulated/0/Telegram/",
     ]
     
-    # Extensiones por categoría
-    EXTENSIONES = {
-        "imagenes": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".heic"],
-        "videos": [".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".3gp"],
-        "audio": [".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a", ".wma"],
-        "documentos": [".pdf", ".doc", ".docx", ".txt", ".xls", ".xlsx", ".ppt", ".pptx"],
-        "otros": [".zip", ".rar", ".apk", ".json", ".xml"],
-        "whatsapp_backup": [".db", ".crypt12", ".crypt14", ".crypt15", ".key"]
+    # Extensiones por categoría (definidas en el registro de clasificación)
+    EXTENSIONES = ClasificadorArchivos.EXTENSIONES
+    
+    # Tipo de backup de WhatsApp según la extensión
+    TIPOS_BACKUP_WHATSAPP = {
+        ".crypt15": "crypt15 (Android 12+)",
+        ".crypt14": "crypt14 (Android 10-11)",
+        ".crypt12": "crypt12 (legacy)",
+        ".key": "key (clave de encriptación)",
+        ".db": "database"
     }
     
+    # Los backups de WhatsApp mayores a este tamaño se descargan por bloques,
+    # en forma reanudable y verificada contra el hash del dispositivo
+    UMBRAL_DESCARGA_POR_BLOQUES = 32 * 1024 * 1024
+    
     # Rutas de backups de WhatsApp
     RUTAS_WHATSAPP_BACKUP = [
         # Ubicación legacy (Android 10 y anteriores)
@@ -41,16 +118,86 @@ class AndroidFileExtractor:
         "/storage/emulated/0/Android/media/com.whatsapp.w4b/WhatsApp Business/Databases/",
     ]
     
-    def __init__(self, carpeta_destino="archivos_descargados"):
+    # Índice de MediaStore (motor de escaneo alternativo al sistema de archivos)
+    MEDIASTORE_URI = "content://media/external/file"
+    MEDIASTORE_COLUMNAS = ["_data", "_size", "date_modified", "mime_type", "bucket_display_name"]
+    
+    MOTORES_ESCANEO = ["filesystem", "mediastore"]
+    
+    # Máximo de sesiones shell simultáneas al escanear varias rutas en paralelo
+    MAX_HILOS_ESCANEO = 4
+    
+    # Segundos que un escaneo paginado queda en la caché del dispositivo para
+    # servir las páginas siguientes sin volver a recorrerlo
+    VIGENCIA_ESCANEO_PAGINADO = 300
+    
+    # Máximo de conexiones sync simultáneas al descargar
+    MAX_CONEXIONES_DESCARGA = 4
+    
+    # "sync": un pull por archivo; "tar": los archivos pequeños viajan en un solo stream tar
+    MODOS_TRANSFERENCIA = ["sync", "tar"]
+    
+    # Tamaño máximo de un archivo para ir en el stream tar (los mayores van por sync)
+    UMBRAL_TAR = 4 * 1024 * 1024
+    
+    # Columnas del registro de llamadas que se guardan
+    COLUMNAS_LLAMADAS = ["_id", "number", "name", "date", "duration", "type", "geocoded_location", "presentation"]
+    
+    # Filas por consulta al paginar el registro de llamadas
+    TAMANO_PAGINA_LLAMADAS = 2000
+    
+    # Modo triage: los archivos de hasta este tamaño se descargan completos; del
+    # resto solo se descarga una vista previa y el original queda para después
+    UMBRAL_TRIAGE = 256 * 1024
+    
+    # Bytes iniciales de un JPEG que se leen para buscar su miniatura EXIF
+    BYTES_CABECERA_EXIF = 128 * 1024
+    
+    # Subcarpeta de carpeta_destino donde quedan las vistas previas
+    CARPETA_VISTAS_PREVIAS = ".vistas_previas"
+    
+    # Tablas de miniaturas de MediaStore: (URI, columna con el _id del medio)
+    MINIATURAS_MEDIASTORE = [
+        ("content://media/external/images/thumbnails", "image_id"),
+        ("content://media/external/video/thumbnails", "video_id")
+    ]
+    
+    # Puntos de montaje cuyo uso se informa en la información del dispositivo
+    MONTAJES_ALMACENAMIENTO = ["/data", "/storage/emulated/0"]
+    
+    # Separa la salida de getprop de la de df en la consulta de información
+    _SEPARADOR_INFO = "---df---"
+    
+    def __init__(self, carpeta_destino="archivos_descargados", carpeta_manifiestos=None, dispositivo=None,
+                 sesion=None, progreso=None, almacen=None):
         """
         Inicializar el extractor
         
         Args:
             carpeta_destino: Carpeta donde se guardarán los archivos descargados
+            carpeta_manifiestos: Carpeta de los manifiestos por serial usados en la
+                extracción incremental (None = carpeta_destino/.manifiestos)
+            dispositivo: Dispositivo adbutils ya seleccionado; None = conectarse al único dispositivo
+            sesion: SesionDispositivo arrendada en el registro. Aporta el dispositivo y
+                su caché (propiedades, capacidades), que se conserva entre peticiones
+                hasta que el dispositivo se reconecta.
+            progreso: ProgresoExtraccion donde se informa el avance y se consulta
+                si se pidió cancelar (None = uno propio)
+            almacen: AlmacenContenido donde se ingresa cada archivo descargado (una
+                sola copia por SHA-256); None = los archivos quedan en carpeta_destino
         """
         self.carpeta_destino = carpeta_destino
-        self.device = None
+        self.carpeta_manifiestos = carpeta_manifiestos or os.path.join(carpeta_destino, ".manifiestos")
+        self.device = sesion.device if sesion is not None else dispositivo
+        self.cache = sesion.cache if sesion is not None else {}
+        self.progreso = progreso or ProgresoExtraccion()
+        self.almacen = almacen
         self.archivos_encontrados = []
+        self.total_archivos = 0
+        self.resumen_categorias = {}
+        self.tiempos_por_ruta = {}
+        # Hashes calculados al descargar cada backup de WhatsApp, por ruta local
+        self.huellas_backups = {}
         
     def conectar_dispositivo(self):
         """Conectar al dispositivo Android"""
@@ -60,23 +207,44 @@ class AndroidFileExtractor:
         except Exception as e:
             raise Exception(f"No se pudo conectar al dispositivo: {str(e)}")
     
-    def obtener_info_dispositivo(self):
-        """Obtener información del dispositivo conectado"""
+    def obtener_info_dispositivo(self, refrescar=False):
+        """
+        Obtener información del dispositivo conectado
+        
+        Todas las propiedades (getprop) y el uso de almacenamiento (df) se leen
+        con un solo comando y quedan en la caché del dispositivo; las llamadas
+        siguientes no vuelven a consultarlo hasta que se reconecte.
+        
+        Args:
+            refrescar: Volver a leer la información aunque esté en caché
+        """
         if not self.device:
             self.conectar_dispositivo()
         
+        if not refrescar and "info" in self.cache:
+            return self.cache["info"]
+        
         try:
-            modelo = self.device.shell("getprop ro.product.model").strip()
-            marca = self.device.shell("getprop ro.product.brand").strip()
-            version = self.device.shell("getprop ro.build.version.release").strip()
-            serial = self.device.serial
+            montajes = " ".join(shlex.quote(m) for m in self.MONTAJES_ALMACENAMIENTO)
+            salida = self.device.shell(f"getprop; echo {self._SEPARADOR_INFO}; df -k {montajes} 2>/dev/null")
+            salida_getprop, _, salida_df = salida.partition(self._SEPARADOR_INFO)
+            propiedades = ListingParser.parsear_getprop(salida_getprop)
             
-            return {
-                "marca": marca,
-                "modelo": modelo,
-                "version_android": version,
-                "serial": serial
+            info = {
+                "marca": propiedades.get("ro.product.brand", ""),
+                "modelo": propiedades.get("ro.product.model", ""),
+                "version_android": propiedades.get("ro.build.version.release", ""),
+                "serial": self.device.serial,
+                "fabricante": propiedades.get("ro.product.manufacturer", ""),
+                "sdk": propiedades.get("ro.build.version.sdk", ""),
+                "parche_seguridad": propiedades.get("ro.build.version.security_patch", ""),
+                "huella_build": propiedades.get("ro.build.fingerprint", ""),
+                "almacenamiento": ListingParser.parsear_df(salida_df),
+                "capturado_en": time.time()
             }
+            self.cache["propiedades"] = propiedades
+            self.cache["info"] = info
+            return info
         except Exception as e:
             raise Exception(f"Error al obtener información del dispositivo: {str(e)}")
     
@@ -87,23 +255,130 @@ class AndroidFileExtractor:
         Args:
             categorias_filtro: Lista de categorías a incluir (None = todas)
         """
-        if categorias_filtro:
-            extensiones_filtradas = []
-            for categoria in categorias_filtro:
-                if categoria in self.EXTENSIONES:
-                    extensiones_filtradas.extend(self.EXTENSIONES[categoria])
-            return extensiones_filtradas
-        else:
-            # Todas las extensiones
-            return [ext for lista in self.EXTENSIONES.values() for ext in lista]
+        return ClasificadorArchivos.extensiones_de(categorias_filtro)
     
-    def _buscar_archivos_recursivo(self, ruta_base, extensiones_validas):
+    def _soporta_find_printf(self):
+        """Verificar (una sola vez por conexión) si el find del dispositivo soporta -printf"""
+        if "find_printf" not in self.cache:
+            try:
+                salida = self.device.shell("find / -maxdepth 0 -printf '%y' 2>/dev/null")
+                self.cache["find_printf"] = salida.strip() == "d"
+            except Exception:
+                self.cache["find_printf"] = False
+        return self.cache["find_printf"]
+
+    def _buscar_archivos(self, ruta_base, filtro):
+        """
+        Buscar archivos en una ruta usando el método más rápido disponible.
+        
+        Usa un único find en el dispositivo y, si no está disponible o falla
+        antes de devolver resultados, recurre al recorrido con ls (un comando
+        por directorio).
+        """
+        if self._soporta_find_printf():
+            encontrados = 0
+            try:
+                for archivo in self._buscar_archivos_find(ruta_base, filtro):
+                    encontrados += 1
+                    yield archivo
+                return
+            except Exception as e:
+                if encontrados:
+                    print(f"⚠️ Error en find para {ruta_base} tras {encontrados} archivos: {e}")
+                    return
+                print(f"⚠️ Error en find para {ruta_base}: {e}. Usando ls...")
+        yield from self._buscar_archivos_recursivo(ruta_base, filtro)
+
+    def _buscar_archivos_find(self, ruta_base, filtro):
+        """
+        Listar una ruta completa con un solo comando find en el dispositivo
+        
+        La salida (tamaño, mtime, tipo y ruta separados por NUL) se parsea
+        a medida que llega por el stream de adb.
+        
+        Args:
+            ruta_base: Ruta base para buscar
+            filtro: FiltroEscaneo con las extensiones y filtros a aplicar
+        """
+        cmd = (
+            f"find {shlex.quote(ruta_base)} -type f {filtro.argumentos_find()} "
+            f"-printf '{ListingParser.FORMATO_FIND}' 2>/dev/null"
+        )
+        conexion = self.device.shell(cmd, stream=True)
+        
+        for registro in ListingParser.iterar_registros(conexion):
+            entrada = ListingParser.parsear_registro_find(registro)
+            if not entrada:
+                continue
+            
+            ruta_completa, tamano_bytes, mtime, _ = entrada
+            if filtro.acepta(ruta_completa, tamano_bytes, mtime):
+                yield ArchivoEncontrado(ruta_completa, tamano_bytes, mtime=mtime)
+
+    def _buscar_archivos_mediastore(self, rutas, filtro, rutas_vistas):
+        """
+        Buscar archivos en varias rutas con una sola consulta al índice de MediaStore
+        
+        Args:
+            rutas: Rutas base para buscar
+            filtro: FiltroEscaneo con las extensiones y filtros a aplicar
+            rutas_vistas: Conjunto donde se registran las rutas entregadas
+        
+        Returns:
+            (valor de retorno del generador) Lista de rutas sin entradas que
+            cumplan el filtro en MediaStore, que deben recorrerse en el
+            sistema de archivos
+        """
+        raices = [ruta.rstrip("/") + "/" for ruta in rutas]
+        condiciones = "(" + " OR ".join(
+            "_data LIKE '{}%'".format(raiz.replace("'", "''")) for raiz in raices
+        ) + ")"
+        condicion_filtro = filtro.condicion_sql()
+        if condicion_filtro:
+            condiciones += " AND " + condicion_filtro
+        cmd = (
+            f"content query --uri {self.MEDIASTORE_URI} "
+            f"--projection {':'.join(self.MEDIASTORE_COLUMNAS)} "
+            f"--where {shlex.quote(condiciones)}"
+        )
+        
+        entradas_por_ruta = {ruta: 0 for ruta in rutas}
+        conexion = self.device.shell(cmd, stream=True)
+        
+        for fila in ListingParser.iterar_filas_content(conexion, self.MEDIASTORE_COLUMNAS):
+            if not fila["_data"]:
+                continue
+            
+            ruta_completa = fila["_data"]
+            ruta_base = next(
+                (ruta for ruta, raiz in zip(rutas, raices) if ruta_completa.startswith(raiz)),
+                None
+            )
+            if ruta_base is None:
+                continue
+            entradas_por_ruta[ruta_base] += 1
+            
+            tamano_bytes = self._safe_int(fila["_size"])
+            mtime = self._safe_int(fila["date_modified"])
+            if filtro.acepta(ruta_completa, tamano_bytes, mtime):
+                rutas_vistas.add(ruta_completa)
+                yield ArchivoEncontrado(
+                    ruta_completa,
+                    tamano_bytes,
+                    mtime=mtime,
+                    mime_type=fila["mime_type"],
+                    bucket=fila["bucket_display_name"]
+                )
+        
+        return [ruta for ruta, cantidad in entradas_por_ruta.items() if cantidad == 0]
+
+    def _buscar_archivos_recursivo(self, ruta_base, filtro):
         """
         Buscar archivos recursivamente en un directorio obteniendo detalles
         
         Args:
             ruta_base: Ruta base para buscar
-            extensiones_validas: Lista de extensiones a buscar
+            filtro: FiltroEscaneo con las extensiones y filtros a aplicar
         """
         try:
             # Intentar primero con ls -l para obtener detalles
@@ -121,7 +396,7 @@ class AndroidFileExtractor:
             
             if usar_ls_simple:
                 # Fallback a ls -p si ls -l no dio resultados útiles
-                self._buscar_archivos_simple(ruta_base, extensiones_validas)
+                yield from self._buscar_archivos_simple(ruta_base, filtro)
                 return
 
             for linea in contenido:
@@ -140,31 +415,28 @@ class AndroidFileExtractor:
                 
                 if permisos.startswith('d'):
                     if nombre not in ['.', '..']:
-                        self._buscar_archivos_recursivo(ruta_completa, extensiones_validas)
+                        yield from self._buscar_archivos_recursivo(ruta_completa, filtro)
                 
                 elif permisos.startswith('-'):
-                    if any(nombre.lower().endswith(ext) for ext in extensiones_validas):
+                    if filtro.acepta_nombre(nombre):
                         try:
                             tamano_bytes = int(tamano)
                         except:
-                            tamano_bytes = 0
-                            
-                        self.archivos_encontrados.append({
-                            "ruta": ruta_completa,
-                            "nombre": nombre,
-                            "tamano": tamano_bytes,
-                            "fecha": f"{fecha} {hora}",
-                            "tipo": os.path.splitext(nombre)[1].lower()
-                        })
+                            tamano_bytes = None
+                        
+                        mtime = ListingParser.fecha_a_epoch(f"{fecha} {hora}")
+                        if filtro.acepta(ruta_completa, tamano_bytes, mtime):
+                            yield ArchivoEncontrado(ruta_completa, tamano_bytes or 0, mtime=mtime,
+                                                    fecha=f"{fecha} {hora}")
                         
         except Exception as e:
             print(f"⚠️ Error en ls -l para {ruta_base}: {e}. Intentando fallback...")
             try:
-                self._buscar_archivos_simple(ruta_base, extensiones_validas)
+                yield from self._buscar_archivos_simple(ruta_base, filtro)
             except Exception as e2:
                 print(f"⚠️ Falló también el fallback para {ruta_base}: {e2}")
 
-    def _buscar_archivos_simple(self, ruta_base, extensiones_validas):
+    def _buscar_archivos_simple(self, ruta_base, filtro):
         """Método fallback usando ls -p (solo nombres)"""
         contenido = self.device.shell(f'ls -p "{ruta_base}"').splitlines()
         for linea in contenido:
@@ -172,87 +444,325 @@ class AndroidFileExtractor:
             for elemento in elementos:
                 ruta_completa = os.path.join(ruta_base, elemento).replace("\\", "/")
                 if elemento.endswith("/"):
-                    self._buscar_archivos_recursivo(ruta_completa, extensiones_validas)
-                elif any(elemento.lower().endswith(ext) for ext in extensiones_validas):
-                    # Crear objeto con metadatos dummy
-                    self.archivos_encontrados.append({
-                        "ruta": ruta_completa,
-                        "nombre": elemento,
-                        "tamano": 0,
-                        "fecha": "",
-                        "tipo": os.path.splitext(elemento)[1].lower()
-                    })
-    
-    def escanear_archivos(self, rutas_personalizadas=None, categorias_filtro=None):
+                    yield from self._buscar_archivos_recursivo(ruta_completa, filtro)
+                elif filtro.acepta(ruta_completa, None):
+                    # Sin metadatos disponibles en este modo: tamaño y fecha no filtran
+                    yield ArchivoEncontrado(ruta_completa)
+    
+    def iterar_archivos(self, rutas_personalizadas=None, categorias_filtro=None, motor_escaneo="filesystem",
+                        hilos_escaneo=1, filtros=None):
         """
-        Escanear archivos en el dispositivo sin descargarlos
+        Escanear archivos en el dispositivo entregándolos a medida que se encuentran
+        
+        El resumen por categoría se actualiza incrementalmente en
+        self.resumen_categorias y self.total_archivos, y el tiempo de escaneo
+        de cada ruta en self.tiempos_por_ruta.
         
         Args:
             rutas_personalizadas: Rutas personalizadas para buscar (None = usar rutas por defecto)
             categorias_filtro: Categorías a incluir en la búsqueda (None = todas)
+            motor_escaneo: "filesystem" (recorrer directorios) o "mediastore" (índice de Android)
+            hilos_escaneo: Sesiones shell simultáneas para recorrer rutas en paralelo (1 = en serie)
+            filtros: Filtros adicionales que se aplican en el dispositivo
+                (ver FiltroEscaneo.PARAMETROS)
         
-        Returns:
-            Diccionario con información de los archivos encontrados
+        Yields:
+            ArchivoEncontrado por cada archivo que cumple los filtros
         """
+        if motor_escaneo not in self.MOTORES_ESCANEO:
+            raise ValueError(f"Motor de escaneo no válido: {motor_escaneo}")
+        
         if not self.device:
             self.conectar_dispositivo()
         
-        # Resetear lista de archivos
-        self.archivos_encontrados = []
+        # Resetear resumen
+        self.total_archivos = 0
+        self.resumen_categorias = {}
+        self.tiempos_por_ruta = {}
         
         # Determinar rutas a escanear
         rutas = rutas_personalizadas if rutas_personalizadas else self.RUTAS_DEFECTO
         
-        # Obtener extensiones válidas
-        extensiones_validas = self._obtener_extensiones_filtradas(categorias_filtro)
+        # Construir filtro con las extensiones válidas y los filtros adicionales
+        filtro = FiltroEscaneo.desde_dict(self._obtener_extensiones_filtradas(categorias_filtro), filtros)
+        if filtro.tiene_fechas:
+            filtro.ahora_dispositivo = self._safe_int(self.device.shell("date +%s"))
         
         # Buscar archivos
         print("🔍 Escaneando archivos en el dispositivo...\n")
-        for ruta in rutas:
-            self._buscar_archivos_recursivo(ruta, extensiones_validas)
-        
-        # Crear resumen por categoría
-        resumen_categorias = {}
-        for categoria, exts in self.EXTENSIONES.items():
-            cantidad = 0
-            for archivo in self.archivos_encontrados:
-                # Manejar tanto formato antiguo (string) como nuevo (dict)
-                if isinstance(archivo, dict):
-                    nombre = archivo['nombre']
-                else:
-                    nombre = os.path.basename(archivo)
-                    
-                if any(nombre.lower().endswith(ext) for ext in exts):
-                    cantidad += 1
-            
-            if cantidad > 0:
-                resumen_categorias[categoria] = cantidad
+        rutas_vistas = set()
+        if motor_escaneo == "mediastore":
+            try:
+                rutas = yield from self._contar(self._medir_ruta(
+                    "mediastore",
+                    self._buscar_archivos_mediastore(rutas, filtro, rutas_vistas)
+                ))
+                rutas_vistas.clear()
+                if rutas:
+                    print(f"⚠️ Rutas sin indexar en MediaStore, recorriendo sistema de archivos: {rutas}")
+            except Exception as e:
+                print(f"⚠️ Error consultando MediaStore: {e}. Usando sistema de archivos...")
+        
+        for archivo in self._recorrer_rutas(rutas, filtro, hilos_escaneo):
+            # Si MediaStore falló a mitad de consulta, no repetir lo ya entregado
+            if archivo.ruta in rutas_vistas:
+                continue
+            self._registrar_en_resumen(archivo)
+            yield archivo
+
+    def _recorrer_rutas(self, rutas, filtro, hilos_escaneo=1):
+        """
+        Recorrer varias rutas en el sistema de archivos, en serie o en paralelo
+        
+        En paralelo cada ruta se recorre en su propia sesión shell (como máximo
+        MAX_HILOS_ESCANEO a la vez) y los resultados se entregan siempre en el
+        orden de las rutas, para que el listado sea estable.
+        """
+        hilos = max(1, min(int(hilos_escaneo or 1), self.MAX_HILOS_ESCANEO, len(rutas)))
+        
+        if hilos == 1:
+            for ruta in rutas:
+                yield from self._medir_ruta(ruta, self._buscar_archivos(ruta, filtro))
+            return
+        
+        # Resolver antes de lanzar los hilos para no repetir la verificación en cada uno
+        self._soporta_find_printf()
+        
+        def recorrer(ruta):
+            return list(self._medir_ruta(ruta, self._buscar_archivos(ruta, filtro)))
+        
+        pool = ThreadPoolExecutor(max_workers=hilos)
+        try:
+            futuros = [pool.submit(recorrer, ruta) for ruta in rutas]
+            for futuro in futuros:
+                yield from futuro.result()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _medir_ruta(self, ruta, archivos):
+        """
+        Reentregar los archivos de una ruta acumulando en self.tiempos_por_ruta
+        solo el tiempo de escaneo (sin contar el del consumidor)
+        
+        Returns:
+            El valor de retorno del generador original
+        """
+        iterador = iter(archivos)
+        transcurrido = 0.0
+        try:
+            while True:
+                inicio = time.perf_counter()
+                try:
+                    archivo = next(iterador)
+                except StopIteration as fin:
+                    return fin.value
+                finally:
+                    transcurrido += time.perf_counter() - inicio
+                yield archivo
+        finally:
+            self.tiempos_por_ruta[ruta] = round(transcurrido, 3)
+
+    def _registrar_en_resumen(self, archivo):
+        """Actualizar el resumen incremental con un archivo encontrado"""
+        self.total_archivos += 1
+        categoria = ClasificadorArchivos.categoria(archivo.nombre)
+        if categoria:
+            self.resumen_categorias[categoria] = self.resumen_categorias.get(categoria, 0) + 1
+
+    def _contar(self, archivos):
+        """
+        Reentregar los archivos de un generador registrándolos en el resumen
+        
+        Returns:
+            El valor de retorno del generador original
+        """
+        iterador = iter(archivos)
+        while True:
+            try:
+                archivo = next(iterador)
+            except StopIteration as fin:
+                return fin.value
+            self._registrar_en_resumen(archivo)
+            yield archivo
+
+    def escanear_archivos(self, rutas_personalizadas=None, categorias_filtro=None, motor_escaneo="filesystem",
+                          hilos_escaneo=1, filtros=None):
+        """
+        Escanear archivos en el dispositivo sin descargarlos
+        
+        Args:
+            rutas_personalizadas: Rutas personalizadas para buscar (None = usar rutas por defecto)
+            categorias_filtro: Categorías a incluir en la búsqueda (None = todas)
+            motor_escaneo: "filesystem" (recorrer directorios) o "mediastore" (índice de Android)
+            hilos_escaneo: Sesiones shell simultáneas para recorrer rutas en paralelo (1 = en serie)
+            filtros: Filtros adicionales (fecha, tamaño, rutas) aplicados en el dispositivo
+        
+        Returns:
+            Diccionario con información de los archivos encontrados
+        """
+        self.archivos_encontrados = list(
+            self.iterar_archivos(rutas_personalizadas, categorias_filtro, motor_escaneo, hilos_escaneo, filtros)
+        )
         
         return {
-            "total_archivos": len(self.archivos_encontrados),
-            "resumen_categorias": resumen_categorias,
-            "archivos": self.archivos_encontrados
+            "total_archivos": self.total_archivos,
+            "resumen_categorias": self.resumen_categorias,
+            "tiempos_por_ruta": self.tiempos_por_ruta,
+            "archivos": [archivo.to_dict() for archivo in self.archivos_encontrados]
+        }
+
+    def escanear_pagina(self, desde=0, limite=100, rutas_personalizadas=None, categorias_filtro=None,
+                        motor_escaneo="filesystem", hilos_escaneo=1, filtros=None, refrescar=False):
+        """
+        Devolver una página del escaneo del dispositivo
+        
+        La primera página escanea el dispositivo completo y el resultado queda en
+        su caché (uno por serial, VIGENCIA_ESCANEO_PAGINADO segundos); las páginas
+        siguientes con las mismas rutas, categorías, motor y filtros se sirven
+        desde ahí sin volver a recorrerlo. La caché se descarta al reconectar el
+        dispositivo. Si id_escaneo cambia entre páginas, el listado se volvió a
+        escanear y puede no coincidir con el de las páginas anteriores.
+        
+        Args:
+            desde: Índice del primer archivo a devolver
+            limite: Cantidad máxima de archivos a devolver
+            refrescar: Volver a escanear aunque haya un escaneo vigente en caché
+            (el resto, como en iterar_archivos)
+        
+        Returns:
+            Diccionario con el id del escaneo, el total, el resumen por categoría y la página pedida
+        """
+        clave = json.dumps(
+            [rutas_personalizadas or self.RUTAS_DEFECTO, categorias_filtro, motor_escaneo, filtros],
+            sort_keys=True, default=str
+        )
+        escaneo = self.cache.get("escaneo_paginado")
+        if refrescar or escaneo is None or escaneo["clave"] != clave \
+                or time.time() - escaneo["creado"] > self.VIGENCIA_ESCANEO_PAGINADO:
+            archivos = list(self.iterar_archivos(rutas_personalizadas, categorias_filtro, motor_escaneo,
+                                                 hilos_escaneo, filtros))
+            escaneo = {
+                "id": uuid.uuid4().hex,
+                "clave": clave,
+                "creado": time.time(),
+                "archivos": archivos,
+                "total_archivos": self.total_archivos,
+                "resumen_categorias": self.resumen_categorias,
+                "tiempos_por_ruta": self.tiempos_por_ruta
+            }
+            self.cache["escaneo_paginado"] = escaneo
+        
+        return {
+            "id_escaneo": escaneo["id"],
+            "total_archivos": escaneo["total_archivos"],
+            "resumen_categorias": escaneo["resumen_categorias"],
+            "tiempos_por_ruta": escaneo["tiempos_por_ruta"],
+            "desde": desde,
+            "limite": limite,
+            "archivos": [archivo.to_dict() for archivo in escaneo["archivos"][desde:desde + limite]]
         }
     
-    def extraer_archivos(self, rutas_personalizadas=None, categorias_filtro=None):
+    def _reservar_destino(self, carpeta, nombre_archivo, reservados):
+        """
+        Elegir una ruta local libre para un archivo, sin sobrescribir archivos
+        existentes ni destinos ya asignados a descargas en curso
+        """
+        destino = os.path.join(carpeta, nombre_archivo)
+        contador = 1
+        nombre_base, extension = os.path.splitext(destino)
+        while destino in reservados or os.path.exists(destino):
+            destino = f"{nombre_base}_{contador}{extension}"
+            contador += 1
+        reservados.add(destino)
+        return destino
+
+    def _destino_descarga(self, nombre_archivo, reservados):
+        """
+        Ruta local donde descargar un archivo: en carpeta_destino con su nombre
+        o, con almacén por contenido, una ruta temporal única (sin buscar
+        nombres libres) desde donde se ingresa al terminar
+        """
+        if self.almacen is not None:
+            return self.almacen.ruta_entrante()
+        return self._reservar_destino(self.carpeta_destino, nombre_archivo, reservados)
+
+    def extraer_archivos(self, rutas_personalizadas=None, categorias_filtro=None, motor_escaneo="filesystem",
+                         hilos_escaneo=1, filtros=None, conexiones_descarga=None,
+                         modo_transferencia="sync", comprimir_tar=False, incremental=True,
+                         hashes_adicionales=None, triage=False, prioridad="listado", orden_categorias=None,
+                         presupuesto_bytes=None, presupuesto_segundos=None, reparto=None, al_descargar=None):
         """
         Extraer archivos del dispositivo Android
         
         Args:
             rutas_personalizadas: Rutas personalizadas para buscar (None = usar rutas por defecto)
             categorias_filtro: Categorías a incluir (None = todas)
+            motor_escaneo: Motor usado para el escaneo previo ("filesystem" o "mediastore")
+            hilos_escaneo: Sesiones shell simultáneas para el escaneo previo (1 = en serie)
+            filtros: Filtros adicionales (fecha, tamaño, rutas) aplicados en el dispositivo
+            conexiones_descarga: Máximo de conexiones sync en paralelo
+                (None = MAX_CONEXIONES_DESCARGA); la concurrencia real se ajusta sola
+            modo_transferencia: "sync" o "tar". En modo tar los archivos de hasta
+                UMBRAL_TAR se descargan en un solo stream tar; los grandes, los que
+                el tar no entregó, o todos si el dispositivo no tiene tar, van por sync
+            comprimir_tar: Comprimir el stream tar con gzip en el dispositivo
+            incremental: No volver a descargar los archivos que ya figuran en el
+                manifiesto del dispositivo con el mismo tamaño y mtime. Cada descarga
+                se registra al terminar, así una extracción interrumpida se retoma
+                desde donde quedó.
+            hashes_adicionales: Hashes a calcular durante la descarga además de
+                SHA-256 ("md5", "sha1"); quedan en huella de cada archivo
+            triage: Descargar completos solo los archivos de hasta UMBRAL_TRIAGE; del
+                resto se descarga una vista previa (miniatura del dispositivo o EXIF)
+                en vista_previa y el original se obtiene después con descargar_original
+            prioridad: Orden de descarga (ver PlanificadorExtraccion.POLITICAS). En modo
+                tar los archivos pequeños viajan primero, en ese orden, y luego el resto
+            orden_categorias: Orden de la prioridad "categorias" (None = el por defecto)
+            presupuesto_bytes: Máximo de bytes a descargar; lo que no entra se difiere
+            presupuesto_segundos: Duración máxima de la extracción (escaneo incluido); si
+                vence durante el escaneo, el listado se corta (planificacion.escaneo_interrumpido)
+                y no se descarga nada; durante la descarga, las que están en curso
+                terminan y no se inician más
+            reparto: RepartoHost compartido con otras extracciones simultáneas; limita
+                las conexiones de este dispositivo a su parte y registra sus bytes
+            al_descargar: Función (item) llamada en el hilo de la extracción apenas un
+                archivo queda disponible localmente (descargado o reutilizado), para
+                procesarlo mientras siguen las descargas; si tarda, las descargas esperan
         
         Returns:
-            Diccionario con el resultado de la extracción
+            Diccionario con el resultado de la extracción. El resultado de cada
+            archivo queda en ruta_local / error de self.archivos_encontrados.
         """
+        if modo_transferencia not in self.MODOS_TRANSFERENCIA:
+            raise ValueError(f"Modo de transferencia no válido: {modo_transferencia}")
+        # Validar los algoritmos y el plan antes de escanear
+        DigestoEnTransito(hashes_adicionales)
+        planificador = PlanificadorExtraccion(
+            prioridad, orden_categorias, presupuesto_bytes, presupuesto_segundos,
+            cancelado=lambda: self.progreso.cancelado
+        )
+        planificador.iniciar()
+        
         # Primero escanear
-        resultado_scan = self.escanear_archivos(rutas_personalizadas, categorias_filtro)
+        self.progreso.cambiar_etapa("escaneo")
+        self.archivos_encontrados = []
+        for archivo in self.iterar_archivos(rutas_personalizadas, categorias_filtro, motor_escaneo,
+                                            hilos_escaneo, filtros):
+            self.archivos_encontrados.append(archivo)
+            self.progreso.sumar(archivos_escaneados=1)
+            self.progreso.verificar_cancelacion()
+            if planificador.agotado():
+                print("⏱️ Presupuesto de tiempo agotado durante el escaneo")
+                planificador.marcar_escaneo_interrumpido()
+                break
         
-        if resultado_scan["total_archivos"] == 0:
+        if self.total_archivos == 0:
             return {
                 "archivos_escaneados": 0,
                 "archivos_descargados": 0,
+                "archivos_reutilizados": 0,
                 "archivos_fallidos": 0,
+                "archivos": [],
                 "resumen_categorias": {},
                 "carpeta_destino": None
             }
@@ -260,39 +770,121 @@ class AndroidFileExtractor:
         # Crear carpeta destino
         os.makedirs(self.carpeta_destino, exist_ok=True)
         
+        # Separar los archivos que ya se descargaron antes y no cambiaron
+        manifiesto = None
+        pendientes = self.archivos_encontrados
+        if incremental:
+            manifiesto = ManifiestoDispositivo(self.carpeta_manifiestos, self.device.serial)
+            pendientes = []
+            for item in self.archivos_encontrados:
+                ruta_local = manifiesto.sin_cambios(item.ruta, item.tamano, item.mtime)
+                if ruta_local and self.almacen is not None and self.almacen.contiene(ruta_local):
+                    # Se reserva como un archivo descargado; si otra evaluación ya
+                    # lo eliminó del almacén se vuelve a descargar
+                    try:
+                        self.almacen.ingresar(ruta_local)
+                    except OSError:
+                        ruta_local = None
+                if ruta_local:
+                    item.ruta_local = ruta_local
+                    item.reutilizado = True
+                else:
+                    pendientes.append(item)
+            reutilizados = len(self.archivos_encontrados) - len(pendientes)
+            if reutilizados:
+                print(f"♻️ {reutilizados} archivos sin cambios desde la última extracción, se reutilizan")
+                if al_descargar is not None:
+                    for item in self.archivos_encontrados:
+                        if item.reutilizado:
+                            al_descargar(item)
+        
+        resumen_triage = None
+        if triage:
+            pendientes, resumen_triage = self._descargar_vistas_previas(pendientes)
+        
+        pendientes = planificador.seleccionar(pendientes)
+        self.progreso.fijar(archivos_planificados=len(pendientes), bytes_planificados=planificador.bytes_planificados)
+        self.progreso.cambiar_etapa("descarga")
+        
         # Descargar archivos
-        archivos_descargados = 0
-        archivos_fallidos = 0
+        total = len(pendientes)
+        completados = 0
+        errores = []
         
         print(f"\n{'='*50}")
         print("Iniciando descarga...")
         print(f"{'='*50}\n")
         
-        for i, item in enumerate(self.archivos_encontrados, 1):
-            try:
-                # Manejar tanto formato antiguo (string) como nuevo (dict)
-                if isinstance(item, dict):
-                    ruta_archivo = item['ruta']
-                else:
-                    ruta_archivo = item
-                    
-                nombre_archivo = os.path.basename(ruta_archivo)
-                destino = os.path.join(self.carpeta_destino, nombre_archivo)
-                
-                # Evitar sobrescribir archivos con el mismo nombre
-                contador = 1
-                nombre_base, extension = os.path.splitext(destino)
-                while os.path.exists(destino):
-                    destino = f"{nombre_base}_{contador}{extension}"
-                    contador += 1
-                
-                self.device.sync.pull(ruta_archivo, destino)
-                print(f"📥 [{i}/{len(self.archivos_encontrados)}] ✓ {nombre_archivo}")
-                archivos_descargados += 1
-                
-            except Exception as e:
-                print(f"❌ [{i}/{len(self.archivos_encontrados)}] Error: {os.path.basename(ruta_archivo)} - {e}")
-                archivos_fallidos += 1
+        reservados = set()
+        almacen = {"nuevos": 0, "duplicados": 0, "bytes_deduplicados": 0}
+        
+        def al_terminar(item, resultado):
+            nonlocal completados
+            completados += 1
+            if resultado["error"] is None:
+                item.ruta_local = resultado["destino"]
+                item.huella = resultado.get("huella")
+                if self.almacen is not None:
+                    # El contenido ya presente (de esta u otra extracción) no se guarda otra vez
+                    item.ruta_local, nuevo = self.almacen.ingresar(
+                        item.ruta_local, (item.huella or {}).get("hash_sha256")
+                    )
+                    almacen["nuevos" if nuevo else "duplicados"] += 1
+                    if not nuevo:
+                        almacen["bytes_deduplicados"] += resultado["bytes"]
+                if manifiesto is not None:
+                    manifiesto.registrar(item.ruta, item.tamano, item.mtime, item.ruta_local)
+                if reparto is not None:
+                    reparto.contabilizar(self.device.serial, resultado["bytes"])
+                self.progreso.sumar(archivos_descargados=1, bytes_descargados=resultado["bytes"])
+                print(f"📥 [{completados}/{total}] ✓ {item.nombre}")
+                if al_descargar is not None:
+                    al_descargar(item)
+            else:
+                item.error = resultado["error"]
+                errores.append({"ruta": item.ruta, "error": item.error})
+                self.progreso.registrar_error(item.ruta, item.error)
+                print(f"❌ [{completados}/{total}] Error: {item.nombre} - {item.error}")
+        
+        try:
+            por_sync = pendientes
+            estadisticas_tar = None
+            if modo_transferencia == "tar":
+                por_sync, estadisticas_tar = self._descargar_por_tar(
+                    pendientes, reservados, al_terminar, comprimir_tar, hashes_adicionales,
+                    planificador.debe_detenerse
+                )
+            
+            tareas = (
+                (item.ruta, self._destino_descarga(item.nombre, reservados), item)
+                for item in planificador.mientras_haya_tiempo(por_sync)
+            )
+            motor = MotorDescarga(
+                self.device,
+                max_conexiones=conexiones_descarga or self.MAX_CONEXIONES_DESCARGA,
+                hashes_adicionales=hashes_adicionales,
+                cupo=(lambda: reparto.cupo_conexiones(self.device.serial)) if reparto is not None else None
+            )
+            estadisticas = motor.descargar(tareas, al_terminar)
+        finally:
+            if manifiesto is not None:
+                manifiesto.cerrar()
+        
+        transferencia = {
+            clave: valor for clave, valor in estadisticas.items()
+            if clave not in ("archivos_descargados", "archivos_fallidos")
+        }
+        archivos_descargados = estadisticas["archivos_descargados"]
+        if estadisticas_tar is not None:
+            transferencia["tar"] = estadisticas_tar
+            archivos_descargados += estadisticas_tar["archivos_descargados"]
+        reutilizados = sum(1 for item in self.archivos_encontrados if item.reutilizado)
+        # Pares exactos dispositivo → local de esta extracción (descargados y reutilizados)
+        archivos = [
+            {"ruta_dispositivo": item.ruta, "ruta_local": os.path.abspath(item.ruta_local),
+             "reutilizado": item.reutilizado}
+            for item in self.archivos_encontrados if item.ruta_local
+        ]
         
         print(f"\n{'='*50}")
         print(f"🎉 Descarga completada!")
@@ -300,30 +892,184 @@ class AndroidFileExtractor:
         print(f"{'='*50}")
         
         return {
-            "archivos_escaneados": resultado_scan["total_archivos"],
+            "archivos_escaneados": self.total_archivos,
             "archivos_descargados": archivos_descargados,
-            "archivos_fallidos": archivos_fallidos,
-            "resumen_categorias": resultado_scan["resumen_categorias"],
+            "archivos_reutilizados": reutilizados,
+            "archivos_fallidos": estadisticas["archivos_fallidos"],
+            "archivos": archivos,
+            "errores": errores,
+            "archivos_diferidos": len(planificador.diferidos),
+            "triage": resumen_triage,
+            "planificacion": planificador.resumen(),
+            "resumen_categorias": self.resumen_categorias,
+            "tiempos_por_ruta": self.tiempos_por_ruta,
+            "transferencia": transferencia,
+            "almacen": almacen if self.almacen is not None else None,
             "carpeta_destino": os.path.abspath(self.carpeta_destino)
         }
 
-    def _run_adb_command(self, cmd):
-        """Ejecuta comando adb y devuelve stdout en UTF-8; lanza excepción si falla."""
-        import subprocess
+    def _descargar_por_tar(self, items, reservados, al_terminar, comprimir=False, hashes_adicionales=None,
+                           detener=None):
+        """
+        Descargar en un solo stream tar los archivos pequeños de la lista
+        
+        Args:
+            items: Archivos a descargar (ArchivoEncontrado)
+            reservados: Nombres de destino ya asignados en la carpeta destino
+            al_terminar: Función (item, resultado) llamada por cada archivo recibido
+            comprimir: Comprimir el stream con gzip en el dispositivo
+            hashes_adicionales: Hashes a calcular además de SHA-256
+            detener: Función sin argumentos; si devuelve True se corta el stream y lo
+                no recibido vuelve en la lista de sync
+        
+        Returns:
+            Tupla (items que deben descargarse por sync, estadísticas del tar o None)
+        """
+        if not DescargaTar.disponible(self.device):
+            print("⚠️ El dispositivo no tiene tar, se descarga archivo por archivo")
+            return items, None
+        
+        # Los tamaños desconocidos (0) y las rutas con salto de línea (no caben en tar -T) van por sync
+        pequenos = {
+            item.ruta: item for item in items
+            if 0 < item.tamano <= self.UMBRAL_TAR and "\n" not in item.ruta
+        }
+        if not pequenos:
+            return items, None
+        
+        print(f"📦 Descargando {len(pequenos)} archivos pequeños en un stream tar...")
+        descarga = DescargaTar(self.device, comprimir=comprimir, hashes_adicionales=hashes_adicionales)
+        estadisticas, no_recibidas = descarga.descargar(
+            list(pequenos),
+            lambda ruta: self._destino_descarga(pequenos[ruta].nombre, reservados),
+            lambda ruta, resultado: al_terminar(pequenos[ruta], resultado),
+            detener
+        )
+        
+        no_recibidas = set(no_recibidas)
+        por_sync = [
+            item for item in items
+            if item.ruta not in pequenos or item.ruta in no_recibidas
+        ]
+        return por_sync, estadisticas
+
+    def _descargar_vistas_previas(self, items):
+        """
+        Modo triage: descargar una vista previa de los archivos grandes
+        
+        La vista previa es la miniatura que MediaStore ya tiene generada en el
+        dispositivo o, en fotos JPEG sin ella, la miniatura EXIF leída de los
+        primeros BYTES_CABECERA_EXIF del archivo.
+        
+        Returns:
+            Tupla (items que se descargan completos, resumen del triage)
+        """
+        completos = [item for item in items if item.tamano <= self.UMBRAL_TRIAGE]
+        diferidos = [item for item in items if item.tamano > self.UMBRAL_TRIAGE]
+        resumen = {"descargados_completos": len(completos), "originales_diferidos": len(diferidos),
+                   "vistas_previas": 0, "origen_vistas": {}}
+        if not diferidos:
+            return completos, resumen
+        
+        carpeta = os.path.join(self.carpeta_destino, self.CARPETA_VISTAS_PREVIAS)
+        os.makedirs(carpeta, exist_ok=True)
+        print(f"🔎 Triage: {len(diferidos)} archivos grandes, se descargan solo vistas previas...")
+        
+        miniaturas = self._miniaturas_mediastore({item.ruta for item in diferidos})
+        reservados = set()
+        for item in diferidos:
+            datos, origen = None, None
+            if item.ruta in miniaturas:
+                try:
+                    datos = self._leer_inicio(miniaturas[item.ruta], self.UMBRAL_TRIAGE)
+                    # Una miniatura que llena el límite está truncada
+                    datos = datos if 0 < len(datos) < self.UMBRAL_TRIAGE else None
+                    origen = "mediastore"
+                except Exception:
+                    datos = None
+            if datos is None and item.tipo in (".jpg", ".jpeg"):
+                try:
+                    datos = MiniaturaExif.extraer(self._leer_inicio(item.ruta, self.BYTES_CABECERA_EXIF))
+                    origen = "exif"
+                except Exception:
+                    datos = None
+            if not datos:
+                continue
+            
+            nombre = os.path.splitext(item.nombre)[0] + ".jpg"
+            destino = self._reservar_destino(carpeta, nombre, reservados)
+            with open(destino, "wb") as f:
+                f.write(datos)
+            item.vista_previa = destino
+            item.origen_vista = origen
+            resumen["vistas_previas"] += 1
+            resumen["origen_vistas"][origen] = resumen["origen_vistas"].get(origen, 0) + 1
+        
+        return completos, resumen
+    
+    def _miniaturas_mediastore(self, rutas):
+        """
+        Miniaturas ya generadas por MediaStore para las rutas indicadas
+        
+        Returns:
+            Diccionario ruta del archivo -> ruta de su miniatura en el dispositivo
+        """
+        miniaturas = {}
         try:
-            proc = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                encoding="utf-8",
-                errors="replace",
-                check=True
-            )
-            return proc.stdout
-        except FileNotFoundError:
-            raise RuntimeError("No se encontró 'adb' en PATH. Instala adb o añade al PATH.")
-        except subprocess.CalledProcessError as e:
-            raise RuntimeError(f"Error ejecutando adb: {e.stderr.strip() or e.stdout.strip()}")
+            # _id de MediaStore de cada foto/video pedido (media_type 1 = imagen, 3 = video)
+            ids = {
+                fila["_id"]: fila["_data"]
+                for fila in self.consultar_proveedor(
+                    self.MEDIASTORE_URI, ["_id", "_data"], where="media_type=1 OR media_type=3"
+                )
+                if fila.get("_data") in rutas
+            }
+        except RuntimeError:
+            return miniaturas
+        if not ids:
+            return miniaturas
+        
+        for uri, columna_id in self.MINIATURAS_MEDIASTORE:
+            try:
+                for fila in self.consultar_proveedor(uri, [columna_id, "_data"]):
+                    ruta = ids.get(fila.get(columna_id))
+                    if ruta and fila.get("_data"):
+                        miniaturas.setdefault(ruta, fila["_data"])
+            except RuntimeError:
+                # Tabla no disponible en esta versión de Android
+                continue
+        return miniaturas
+    
+    def _leer_inicio(self, ruta_remota, max_bytes):
+        """Leer por sync solo los primeros max_bytes de un archivo del dispositivo"""
+        datos = bytearray()
+        contenido = self.device.sync.iter_content(ruta_remota)
+        try:
+            for bloque in contenido:
+                datos += bloque
+                if len(datos) >= max_bytes:
+                    break
+        finally:
+            contenido.close()
+        return bytes(datos[:max_bytes])
+    
+    def descargar_original(self, ruta_remota, hashes_adicionales=None):
+        """
+        Descargar un único archivo completo (por ejemplo, el original diferido
+        en una extracción de triage) a la carpeta destino
+        
+        Returns:
+            Resultado de MotorDescarga: destino, bytes, segundos, error y huella
+        """
+        if not self.device:
+            self.conectar_dispositivo()
+        os.makedirs(self.carpeta_destino, exist_ok=True)
+        destino = self._destino_descarga(ruta_remota.rsplit("/", 1)[-1], set())
+        resultados = []
+        MotorDescarga(self.device, max_conexiones=1, hashes_adicionales=hashes_adicionales).descargar(
+            [(ruta_remota, destino, None)], lambda _, resultado: resultados.append(resultado)
+        )
+        return resultados[0]
 
     def _safe_int(self, value):
         """Convierte un valor a int eliminando comas y espacios."""
@@ -334,56 +1080,66 @@ class AndroidFileExtractor:
         except (ValueError, TypeError):
             return 0
 
-    def _parse_content_query_output(self, output):
+    def consultar_proveedor(self, uri, columnas=None, where=None, orden=None):
         """
-        Parsea la salida de `adb shell content query` en forma robusta.
-        Estrategia: dividimos en tokens; cada token que contiene '=' inicia un par clave=valor.
-        Si un token no contiene '=', se concatena al valor anterior (gestiona espacios en valores).
+        Consultar un content provider del dispositivo con `content query`,
+        entregando cada fila a medida que llega
+        
+        La consulta corre como shell en stream sobre la conexión adbutils del
+        extractor, así queda ligada al dispositivo seleccionado (serial).
+        
+        Args:
+            uri: URI del proveedor (ej. content://call_log/calls)
+            columnas: Columnas a proyectar (None = todas)
+            where: Condición SQL opcional
+            orden: Orden SQL opcional (ej. "date DESC")
+        
+        Returns:
+            Generador de diccionarios columna -> valor (None para NULL)
         """
-        llamadas = []
-        for line in output.splitlines():
-            line = line.strip()
-            if not line or not line.startswith("Row:"):
-                continue
-            tokens = line.split()
-            # saltamos "Row:" y el número de fila si existe
-            tokens = tokens[2:] if len(tokens) >= 2 else tokens[1:]
-            fila = {}
-            current_key = None
-            for tok in tokens:
-                if '=' in tok:
-                    key, val = tok.split('=', 1)
-                    fila[key] = val
-                    current_key = key
-                else:
-                    # token sin '=': es parte del valor anterior (espacios dentro de valor)
-                    if current_key is not None:
-                        fila[current_key] = fila[current_key] + " " + tok
-                    else:
-                        continue
-            llamadas.append(fila)
-        return llamadas
+        if not self.device:
+            self.conectar_dispositivo()
+        
+        cmd = f"content query --uri {shlex.quote(uri)}"
+        if columnas:
+            cmd += f" --projection {shlex.quote(':'.join(columnas))}"
+        if where:
+            cmd += f" --where {shlex.quote(where)}"
+        if orden:
+            cmd += f" --sort {shlex.quote(orden)}"
+        
+        conexion = self.device.shell(cmd, stream=True)
+        return ListingParser.iterar_filas_content(conexion, columnas)
 
-    def _convert_dates(self, llamadas):
-        """Convierte 'date' en ms a datetime en TZ local (Bolivia UTC-4)."""
+    def _convert_dates(self, f):
+        """Convierte 'date' en ms de una fila a datetime en TZ local (Bolivia UTC-4)."""
         from datetime import datetime, timezone, timedelta
         TZ = timezone(timedelta(hours=-4))
         
-        for f in llamadas:
-            if 'date' in f:
-                try:
-                    ts_ms = self._safe_int(f['date'])
-                    dt = datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc).astimezone(TZ)
-                    f['date_datetime'] = dt.replace(tzinfo=None)  # datetime sin tz para BD
-                    f['date_readable'] = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except Exception:
-                    f['date_datetime'] = None
-                    f['date_readable'] = f.get('date')
-        return llamadas
+        if 'date' in f:
+            try:
+                ts_ms = self._safe_int(f['date'])
+                dt = datetime.fromtimestamp(ts_ms / 1000.0, tz=timezone.utc).astimezone(TZ)
+                f['date_datetime'] = dt.replace(tzinfo=None)  # datetime sin tz para BD
+                f['date_readable'] = dt.strftime("%Y-%m-%d %H:%M:%S")
+            except Exception:
+                f['date_datetime'] = None
+                f['date_readable'] = f.get('date')
+        return f
 
-    def extraer_llamadas(self):
+    def extraer_llamadas(self, desde_ms=None, tamano_pagina=None):
         """
-        Extrae el registro de llamadas del dispositivo Android usando subprocess.
+        Extrae el registro de llamadas del dispositivo Android, procesando
+        cada fila del proveedor a medida que llega.
+        
+        Solo se piden las columnas que se guardan (COLUMNAS_LLAMADAS) y el
+        registro se recorre por páginas ordenadas por fecha (parámetros limit y
+        offset del proveedor), así un registro muy grande no viaja en una sola consulta.
+        
+        Args:
+            desde_ms: Extraer solo las llamadas con fecha (epoch en ms) posterior a esta,
+                por ejemplo la última llamada ya extraída de este dispositivo
+            tamano_pagina: Filas por consulta (None = TAMANO_PAGINA_LLAMADAS)
         
         Returns:
             Lista de diccionarios con información formateada de cada llamada
@@ -398,30 +1154,54 @@ class AndroidFileExtractor:
             '6': 'bloqueada'
         }
         
+        tamano_pagina = tamano_pagina or self.TAMANO_PAGINA_LLAMADAS
+        where = f"date > {int(desde_ms)}" if desde_ms else None
+        columnas = self.COLUMNAS_LLAMADAS
+        
         try:
-            cmd = ["adb", "shell", "content", "query", "--uri", "content://call_log/calls"]
-            out = self._run_adb_command(cmd)
-            llamadas_raw = self._parse_content_query_output(out)
-            llamadas_raw = self._convert_dates(llamadas_raw)
-            
             # Formatear para el servicio
             llamadas_formateadas = []
-            for l in llamadas_raw:
-                llamada = {
-                    'numero': l.get('number'),
-                    'nombre_contacto': l.get('name') or l.get('cached_name') or l.get('display_name'),
-                    'fecha': l.get('date_datetime'),
-                    'duracion_segundos': self._safe_int(l.get('duration', 0)),
-                    'tipo': tipos_llamada.get(str(l.get('type', '')).replace(',', '').strip(), 'desconocido'),
-                    'metadata': {
-                        'date_readable': l.get('date_readable'),
-                        'raw_type': l.get('type'),
-                        'geocoded_location': l.get('geocoded_location'),
-                        'presentation': l.get('presentation')
+            vistos = set()
+            desplazamiento = 0
+            while True:
+                uri = f"content://call_log/calls?limit={tamano_pagina}&offset={desplazamiento}"
+                try:
+                    filas = list(self.consultar_proveedor(uri, columnas, where, "date ASC"))
+                except RuntimeError:
+                    if columnas is None:
+                        raise
+                    # Versiones sin alguna de las columnas proyectadas: pedir todas
+                    columnas = None
+                    continue
+                
+                nuevas = 0
+                for l in filas:
+                    if l.get('_id') in vistos:
+                        continue
+                    vistos.add(l.get('_id'))
+                    nuevas += 1
+                    l = self._convert_dates(l)
+                    llamada = {
+                        'numero': l.get('number'),
+                        'nombre_contacto': l.get('name'),
+                        'fecha': l.get('date_datetime'),
+                        'duracion_segundos': self._safe_int(l.get('duration', 0)),
+                        'tipo': tipos_llamada.get(str(l.get('type') or '').strip(), 'desconocido'),
+                        'metadata': {
+                            'date_readable': l.get('date_readable'),
+                            'date_ms': self._safe_int(l.get('date')),
+                            'raw_type': l.get('type'),
+                            'geocoded_location': l.get('geocoded_location'),
+                            'presentation': l.get('presentation')
+                        }
                     }
-                }
-                if llamada['numero'] or llamada['nombre_contacto']:
-                    llamadas_formateadas.append(llamada)
+                    if llamada['numero'] or llamada['nombre_contacto']:
+                        llamadas_formateadas.append(llamada)
+                
+                # Última página, o un proveedor que ignora limit/offset y ya entregó todo
+                if len(filas) < tamano_pagina or nuevas == 0:
+                    break
+                desplazamiento += len(filas)
             
             print(f"📞 Se encontraron {len(llamadas_formateadas)} llamadas")
             return llamadas_formateadas
@@ -430,7 +1210,56 @@ class AndroidFileExtractor:
             print(f"❌ Error al extraer llamadas: {e}")
             return []
 
-    def extraer_backups_whatsapp(self):
+    def iterar_proveedor(self, nombre):
+        """
+        Extraer en stream los registros de un proveedor declarado en
+        ProveedoresContenido (sms, mms, contactos, calendario)
+        
+        Args:
+            nombre: Nombre del proveedor
+        
+        Returns:
+            Generador de diccionarios con los campos de la tabla del proveedor
+        """
+        if nombre not in ProveedoresContenido.PROVEEDORES:
+            raise ValueError(f"Proveedor no válido: {nombre}")
+        definicion = ProveedoresContenido.PROVEEDORES[nombre]
+        columnas = ProveedoresContenido.columnas(nombre)
+        
+        try:
+            for fila in self.consultar_proveedor(definicion["uri"], columnas, orden=definicion["orden"]):
+                yield ProveedoresContenido.mapear(nombre, fila)
+        except RuntimeError as e:
+            # El error solo llega si no hubo filas: reintentar sin proyección por si
+            # esta versión de Android no tiene alguna de las columnas
+            print(f"⚠️ Consulta proyectada de {nombre} rechazada ({e}), se piden todas las columnas")
+            for fila in self.consultar_proveedor(definicion["uri"], orden=definicion["orden"]):
+                yield ProveedoresContenido.mapear(nombre, fila)
+
+    def _buscar_backups_whatsapp(self):
+        """
+        Listar los archivos de todas las RUTAS_WHATSAPP_BACKUP con un único
+        comando en el dispositivo (las rutas que no existen se ignoran allí
+        mismo). La salida usa FORMATO_FIND y se parsea con el mismo parser
+        que el escaneo.
+        """
+        rutas = " ".join(shlex.quote(ruta) for ruta in self.RUTAS_WHATSAPP_BACKUP)
+        if self._soporta_find_printf():
+            cmd = f"find {rutas} -maxdepth 1 -type f -printf '{ListingParser.FORMATO_FIND}' 2>/dev/null"
+        else:
+            # Sin find -printf: el mismo formato armado con stat y printf
+            cmd = (
+                f"for d in {rutas}; do for f in \"$d\"*; do [ -f \"$f\" ] && "
+                f"printf '%s\\t%s\\tf\\t%s\\0' $(stat -c '%s %Y' \"$f\") \"$f\"; done; done 2>/dev/null"
+            )
+        conexion = self.device.shell(cmd, stream=True)
+        for registro in ListingParser.iterar_registros(conexion):
+            entrada = ListingParser.parsear_registro_find(registro)
+            if entrada:
+                ruta, tamano, mtime, _ = entrada
+                yield ArchivoEncontrado(ruta, tamano, mtime=mtime)
+    
+    def extraer_backups_whatsapp(self, carpeta_parciales=None):
         """
         Extrae los archivos de backup de WhatsApp del dispositivo Android.
         
@@ -438,6 +1267,19 @@ class AndroidFileExtractor:
         normal como para WhatsApp Business, incluyendo las nuevas rutas de
         Android 11+.
         
+        Los backups mayores a UMBRAL_DESCARGA_POR_BLOQUES se descargan por bloques:
+        si la descarga se corta, la siguiente llamada la retoma desde el último
+        bloque completo, y al terminar se verifica contra el hash del dispositivo
+        (queda en "verificacion" de cada backup).
+        
+        Si se pide cancelar, no se inician más descargas y se devuelven los
+        backups descargados hasta ese momento.
+        
+        Args:
+            carpeta_parciales: Carpeta de las descargas por bloques en curso; para
+                retomarlas debe ser la misma entre llamadas aunque cambie
+                carpeta_destino (None = whatsapp_backups/.parciales)
+        
         Returns:
             Diccionario con:
                 - backups_encontrados: Lista de backups encontrados con metadata
@@ -448,86 +1290,28 @@ class AndroidFileExtractor:
         if not self.device:
             self.conectar_dispositivo()
         
-        # Extensiones de backup de WhatsApp
-        extensiones_backup = self.EXTENSIONES.get("whatsapp_backup", [".db", ".crypt12", ".crypt14", ".crypt15", ".key"])
-        
-        # Buscar archivos de backup
-        backups_encontrados = []
-        
+        # Buscar archivos de backup (un solo comando para todas las ubicaciones)
         print("🔍 Buscando backups de WhatsApp...")
-        
-        for ruta in self.RUTAS_WHATSAPP_BACKUP:
-            try:
-                # Verificar si la ruta existe
-                check_cmd = f'ls -la "{ruta}" 2>/dev/null'
-                resultado = self.device.shell(check_cmd)
-                
-                if "No such file" in resultado or not resultado.strip():
-                    continue
-                
-                print(f"📂 Escaneando: {ruta}")
-                
-                # Listar archivos con detalles
-                contenido = resultado.splitlines()
-                
-                for linea in contenido:
-                    partes = linea.split()
-                    if len(partes) < 8:
-                        continue
-                    
-                    permisos = partes[0]
-                    if not permisos.startswith('-'):
-                        continue  # Solo archivos, no directorios
-                    
-                    tamano = partes[4]
-                    fecha = partes[5]
-                    hora = partes[6]
-                    nombre = " ".join(partes[7:])
-                    
-                    # Verificar si es un archivo de backup
-                    es_backup = any(nombre.lower().endswith(ext) for ext in extensiones_backup)
-                    
-                    # También incluir msgstore (base de datos principal de mensajes)
-                    es_msgstore = "msgstore" in nombre.lower() or "wa.db" in nombre.lower()
-                    
-                    if es_backup or es_msgstore:
-                        ruta_completa = os.path.join(ruta, nombre).replace("\\", "/")
-                        
-                        try:
-                            tamano_bytes = int(tamano.replace(',', ''))
-                        except:
-                            tamano_bytes = 0
-                        
-                        # Determinar tipo de backup
-                        tipo_backup = "desconocido"
-                        if ".crypt15" in nombre.lower():
-                            tipo_backup = "crypt15 (Android 12+)"
-                        elif ".crypt14" in nombre.lower():
-                            tipo_backup = "crypt14 (Android 10-11)"
-                        elif ".crypt12" in nombre.lower():
-                            tipo_backup = "crypt12 (legacy)"
-                        elif ".key" in nombre.lower():
-                            tipo_backup = "key (clave de encriptación)"
-                        elif ".db" in nombre.lower():
-                            tipo_backup = "database"
-                        
-                        # Determinar app de origen
-                        app_origen = "WhatsApp"
-                        if "w4b" in ruta.lower() or "business" in ruta.lower():
-                            app_origen = "WhatsApp Business"
-                        
-                        backups_encontrados.append({
-                            "ruta": ruta_completa,
-                            "nombre": nombre,
-                            "tamano": tamano_bytes,
-                            "fecha": f"{fecha} {hora}",
-                            "tipo_backup": tipo_backup,
-                            "app_origen": app_origen
-                        })
-                        
-            except Exception as e:
-                print(f"⚠️ Error escaneando {ruta}: {e}")
+        self.progreso.cambiar_etapa("escaneo")
+        backups_encontrados = []
+        for archivo in self._buscar_backups_whatsapp():
+            extension = ClasificadorArchivos.extension(archivo.nombre)
+            # Además de las extensiones de backup, incluir msgstore y wa.db (bases de mensajes)
+            nombre = archivo.nombre.lower()
+            if ClasificadorArchivos.categoria(nombre) != "whatsapp_backup" \
+                    and "msgstore" not in nombre and "wa.db" not in nombre:
                 continue
+            
+            ruta = archivo.ruta.lower()
+            backups_encontrados.append({
+                "ruta": archivo.ruta,
+                "nombre": archivo.nombre,
+                "tamano": archivo.tamano,
+                "fecha": ListingParser.formatear_fecha(archivo.mtime),
+                "mtime": archivo.mtime,
+                "tipo_backup": self.TIPOS_BACKUP_WHATSAPP.get(extension, "desconocido"),
+                "app_origen": "WhatsApp Business" if "w4b" in ruta or "business" in ruta else "WhatsApp"
+            })
         
         if not backups_encontrados:
             print("❌ No se encontraron backups de WhatsApp")
@@ -539,6 +1323,12 @@ class AndroidFileExtractor:
             }
         
         print(f"\n✅ Se encontraron {len(backups_encontrados)} archivos de backup")
+        self.progreso.fijar(
+            backups_encontrados=len(backups_encontrados),
+            archivos_planificados=len(backups_encontrados),
+            bytes_planificados=sum(backup['tamano'] for backup in backups_encontrados)
+        )
+        self.progreso.cambiar_etapa("descarga")
         
         # Crear subcarpeta para backups de WhatsApp
         carpeta_whatsapp = os.path.join(self.carpeta_destino, "whatsapp_backups")
@@ -547,12 +1337,19 @@ class AndroidFileExtractor:
         # Descargar backups
         backups_descargados = 0
         backups_fallidos = 0
+        por_bloques = DescargaPorBloques(
+            self.device, carpeta_parciales or os.path.join(carpeta_whatsapp, ".parciales")
+        )
         
         print(f"\n{'='*50}")
         print("Descargando backups de WhatsApp...")
         print(f"{'='*50}\n")
         
         for i, backup in enumerate(backups_encontrados, 1):
+            if self.progreso.cancelado:
+                # Los backups ya descargados se devuelven para registrarlos
+                print("⏹️  Descarga de backups cancelada")
+                break
             try:
                 nombre_archivo = backup['nombre']
                 # Agregar prefijo según app de origen
@@ -566,14 +1363,25 @@ class AndroidFileExtractor:
                     destino = f"{nombre_base}_{contador}{extension}"
                     contador += 1
                 
-                self.device.sync.pull(backup['ruta'], destino)
+                if backup['tamano'] > self.UMBRAL_DESCARGA_POR_BLOQUES:
+                    resultado = por_bloques.descargar(backup['ruta'], destino)
+                    backup['verificacion'] = resultado['verificacion']
+                    if resultado['reanudado_desde']:
+                        backup['reanudado_desde'] = resultado['reanudado_desde']
+                    if resultado['error']:
+                        raise IOError(resultado['error'])
+                    self.huellas_backups[destino] = resultado['huella']
+                else:
+                    self.device.sync.pull(backup['ruta'], destino)
                 backup['ruta_local'] = destino
                 print(f"📥 [{i}/{len(backups_encontrados)}] ✓ {nombre_archivo} ({backup['tipo_backup']})")
                 backups_descargados += 1
+                self.progreso.sumar(archivos_descargados=1, bytes_descargados=backup['tamano'])
                 
             except Exception as e:
                 print(f"❌ [{i}/{len(backups_encontrados)}] Error: {backup['nombre']} - {e}")
                 backups_fallidos += 1
+                self.progreso.registrar_error(backup['ruta'], str(e))
         
         print(f"\n{'='*50}")
         print(f"🎉 Descarga de backups completada!")
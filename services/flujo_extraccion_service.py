@@ -0,0 +1,279 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from flask import current_app
+from config import Config
+from services.extraction_service import AndroidFileExtractor
+from services.ingestion_pipeline import TuberiaIngesta, IngestaInterrumpida
+from services.evaluacion_service import EvaluacionService
+from services.archivo_service import ArchivoService
+from services.llamada_service import LlamadaService
+from services.proveedor_service import ProveedorService
+from services.almacen_service import AlmacenService, almacen
+from utils.metadata_extractor import MetadataExtractor
+from utils.extraction_scheduler import PlanificadorExtraccion
+from utils.extraction_progress import ExtraccionCancelada
+
+
+class FlujoExtraccionService:
+    @staticmethod
+    def extraer_evaluacion(sesion, data, reparto=None, progreso=None):
+        """
+        Extracción completa de un dispositivo: crea la evaluación, descarga los
+        archivos, procesa sus metadatos y extrae llamadas y proveedores
+        
+        Args:
+            sesion: SesionDispositivo arrendada
+            data: Opciones de la extracción (el cuerpo de /api/extract)
+            reparto: RepartoHost si la extracción comparte el host con otras
+            progreso: ProgresoExtraccion para informar el avance y recibir la cancelación
+        
+        Returns:
+            Diccionario con la evaluación y los resultados de la extracción
+        """
+        rutas = data.get('rutas')
+        categorias = data.get('categorias')
+        motor_escaneo = data.get('motor_escaneo', 'filesystem')
+        hilos_escaneo = data.get('hilos_escaneo', 1)
+        filtros = data.get('filtros')
+        conexiones_descarga = data.get('conexiones_descarga')
+        modo_transferencia = data.get('modo_transferencia', 'sync')
+        comprimir_tar = bool(data.get('comprimir_tar', False))
+        incremental = bool(data.get('incremental', True))
+        hashes_adicionales = data.get('hashes_adicionales')
+        llamadas_incrementales = bool(data.get('llamadas_incrementales', False))
+        triage = bool(data.get('triage', False))
+        prioridad = data.get('prioridad', 'listado')
+        orden_categorias = data.get('orden_categorias')
+        presupuesto_bytes = data.get('presupuesto_bytes')
+        presupuesto_segundos = data.get('presupuesto_segundos')
+        proveedores = data.get('proveedores') or []
+        carpeta_destino = data.get('carpeta_destino', Config.UPLOAD_FOLDER)
+        metadata_extra = data.get('metadata', {})
+        ProveedorService.validar_proveedores(proveedores)
+        PlanificadorExtraccion.validar(prioridad, presupuesto_bytes, presupuesto_segundos)
+        turno_metadatos = (lambda: reparto.turno_metadatos(sesion.serial)) if reparto is not None else nullcontext
+        
+        # 1. Obtener info del dispositivo
+        extractor = AndroidFileExtractor(
+            carpeta_destino=carpeta_destino,
+            carpeta_manifiestos=Config.MANIFEST_FOLDER,
+            sesion=sesion,
+            progreso=progreso,
+            almacen=almacen
+        )
+        progreso = extractor.progreso
+        try:
+            info_dispositivo = extractor.obtener_info_dispositivo()
+        except Exception as e:
+            raise Exception(f"Error al conectar dispositivo: {str(e)}")
+            
+        # 2. Crear Evaluación en BD; sus archivos se descargan en una carpeta propia
+        evaluacion = EvaluacionService.crear_evaluacion(info_dispositivo, metadata_extra)
+        extractor.carpeta_destino = EvaluacionService.carpeta_archivos(evaluacion.id, carpeta_destino)
+        
+        # 3. Ejecutar extracción física. Cada archivo descargado pasa enseguida por
+        # la tubería de ingesta (metadatos en varios hilos, BD por lotes en este
+        # hilo), y el registro de llamadas se lee a la vez en otro hilo
+        def procesar(item):
+            ruta_local = os.path.abspath(item.ruta_local)
+            origen = {'nombre_original': item.nombre, 'ruta_dispositivo': item.ruta}
+            with turno_metadatos():
+                if item.reutilizado:
+                    # Sin cambios desde una extracción anterior: se copian sus metadatos
+                    return ruta_local, origen, True
+                # El hash calculado durante la descarga evita volver a leer el archivo;
+                # en el almacén el archivo se llama por su hash, el tipo sale del nombre original
+                metadata = MetadataExtractor.get_file_metadata(ruta_local, item.huella, nombre=item.nombre)
+                metadata.update(origen)
+                return ruta_local, metadata, False
+        
+        def guardar_lote(registros):
+            archivos = ArchivoService.guardar_lote(registros, evaluacion.id)
+            progreso.sumar(metadatos_procesados=len(archivos))
+            return archivos
+        
+        tuberia = TuberiaIngesta(
+            procesar, guardar_lote,
+            trabajadores=Config.INGEST_METADATA_WORKERS,
+            capacidad=Config.INGEST_QUEUE_SIZE,
+            tamano_lote=Config.INGEST_BATCH_SIZE
+        ).iniciar()
+        
+        # El almacén reserva cada archivo en la BD al ingresarlo, desde el hilo de la descarga
+        app = current_app._get_current_object()
+        
+        def extraer():
+            try:
+                with app.app_context():
+                    resultado = extractor.extraer_archivos(
+                        rutas_personalizadas=rutas,
+                        categorias_filtro=categorias,
+                        motor_escaneo=motor_escaneo,
+                        hilos_escaneo=hilos_escaneo,
+                        filtros=filtros,
+                        conexiones_descarga=conexiones_descarga,
+                        modo_transferencia=modo_transferencia,
+                        comprimir_tar=comprimir_tar,
+                        incremental=incremental,
+                        hashes_adicionales=hashes_adicionales,
+                        triage=triage,
+                        prioridad=prioridad,
+                        orden_categorias=orden_categorias,
+                        presupuesto_bytes=presupuesto_bytes,
+                        presupuesto_segundos=presupuesto_segundos,
+                        reparto=reparto,
+                        al_descargar=tuberia.entrada
+                    )
+                # Lo que sigue en las colas se termina de procesar
+                progreso.cambiar_etapa("metadatos")
+                return resultado
+            except BaseException:
+                tuberia.interrumpir()
+                raise
+            finally:
+                tuberia.cerrar()
+                # Las demás extracciones del host ya pueden usar sus conexiones USB
+                if reparto is not None:
+                    reparto.descarga_terminada(sesion.serial)
+        
+        desde_ms = None
+        if llamadas_incrementales:
+            desde_ms = LlamadaService.ultima_fecha_llamada_ms(info_dispositivo.get('serial'))
+        
+        try:
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                futuro_extraccion = pool.submit(extraer)
+                futuro_llamadas = pool.submit(extractor.extraer_llamadas, desde_ms=desde_ms)
+                
+                # 4. Procesar archivos descargados para extraer metadatos y guardar en BD
+                archivos_procesados = []
+                try:
+                    for lote in tuberia.escribir():
+                        archivos_procesados.extend(archivo.to_dict() for archivo in lote)
+                except IngestaInterrumpida:
+                    # La descarga falló: su excepción es la que se informa
+                    pass
+                try:
+                    resultado_extraccion = futuro_extraccion.result()
+                except ExtraccionCancelada:
+                    # Cancelada durante el escaneo: no llegó a descargarse nada
+                    resultado_extraccion = {}
+                
+                try:
+                    llamadas_extraidas = futuro_llamadas.result()
+                except Exception as e:
+                    llamadas_extraidas = []
+                    print(f"Error extrayendo llamadas: {e}")
+        finally:
+            # Los registros ya confirmados tienen su propia referencia: las reservas
+            # tomadas al ingresar se sueltan (y se borra lo que no llegó a guardarse)
+            AlmacenService.soltar([
+                os.path.basename(item.ruta_local) for item in extractor.archivos_encontrados
+                if item.ruta_local and almacen.contiene(item.ruta_local)
+            ])
+        resultado_extraccion['ingesta'] = tuberia.estadisticas()
+        
+        # Si se canceló, la evaluación y los archivos ya guardados se devuelven
+        # como resultado parcial (cancelado=True) y se omiten los pasos que faltan.
+        # En triage, los archivos cuyo original quedó en el dispositivo se registran
+        # igualmente (con su vista previa si la hay); el original se baja al pedirlo
+        if triage and not progreso.cancelado:
+            for item in extractor.archivos_encontrados:
+                if item.ruta_local or item.error:
+                    continue
+                try:
+                    archivo_db = ArchivoService.registrar_archivo_triage(
+                        item.to_dict(), evaluacion.id, info_dispositivo.get('serial')
+                    )
+                    archivos_procesados.append(archivo_db.to_dict())
+                except Exception as e:
+                    print(f"Error registrando {item.nombre}: {e}")
+        
+        # 5. Guardar las llamadas leídas durante la descarga
+        llamadas_guardadas = []
+        if not progreso.cancelado:
+            progreso.cambiar_etapa("llamadas")
+            try:
+                if llamadas_extraidas:
+                    llamadas_db = LlamadaService.guardar_llamadas(llamadas_extraidas, evaluacion.id)
+                    llamadas_guardadas = [l.to_dict() for l in llamadas_db]
+            except Exception as e:
+                print(f"Error extrayendo llamadas: {e}")
+        
+        # 6. Extraer otros proveedores pedidos (SMS, contactos, calendario)
+        registros_proveedores = {}
+        if not progreso.cancelado:
+            progreso.cambiar_etapa("proveedores")
+            registros_proveedores = ProveedorService.extraer_y_guardar(extractor, proveedores, evaluacion.id)
+        
+        return {
+            'evaluacion': evaluacion.to_dict(),
+            'extraccion': resultado_extraccion,
+            'archivos_procesados': len(archivos_procesados),
+            'llamadas_extraidas': len(llamadas_guardadas),
+            'proveedores': registros_proveedores,
+            'cancelado': progreso.cancelado
+        }
+
+    @staticmethod
+    def extraer_backups_whatsapp(sesion, data, progreso=None):
+        """
+        Extracción de los backups de WhatsApp de un dispositivo en una evaluación nueva
+        
+        Args:
+            sesion: SesionDispositivo arrendada
+            data: Opciones (el cuerpo de /api/extract-whatsapp-backups)
+            progreso: ProgresoExtraccion para informar el avance y recibir la cancelación
+        
+        Returns:
+            Diccionario con la evaluación y los backups extraídos
+        """
+        metadata_extra = data.get('metadata', {})
+        carpeta_destino = data.get('carpeta_destino', Config.UPLOAD_FOLDER)
+        
+        # 1. Obtener info del dispositivo
+        extractor = AndroidFileExtractor(carpeta_destino=carpeta_destino, sesion=sesion, progreso=progreso)
+        try:
+            info_dispositivo = extractor.obtener_info_dispositivo()
+        except Exception as e:
+            raise Exception(f"Error al conectar dispositivo: {str(e)}")
+            
+        # 2. Crear Evaluación en BD; sus archivos se descargan en una carpeta propia
+        evaluacion = EvaluacionService.crear_evaluacion(info_dispositivo, metadata_extra)
+        extractor.carpeta_destino = EvaluacionService.carpeta_archivos(evaluacion.id, carpeta_destino)
+        
+        # 3. Extraer backups de WhatsApp (las descargas por bloques interrumpidas se
+        # retoman desde una carpeta común a todas las evaluaciones)
+        resultado_backups = extractor.extraer_backups_whatsapp(
+            carpeta_parciales=os.path.join(carpeta_destino, "whatsapp_backups", ".parciales")
+        )
+        
+        # 4. Procesar backups descargados para guardarlos en BD con metadata de WhatsApp
+        # (si se canceló, los ya descargados se registran igual como resultado parcial)
+        progreso = extractor.progreso
+        progreso.cambiar_etapa("metadatos")
+        archivos_procesados = []
+        if resultado_backups['backups_descargados'] > 0 and resultado_backups['carpeta_destino']:
+            for backup in resultado_backups['backups_encontrados']:
+                if 'ruta_local' in backup:
+                    try:
+                        # Usar el nuevo método que guarda la metadata específica de WhatsApp
+                        archivo_db = ArchivoService.procesar_backup_whatsapp(
+                            ruta_archivo=backup['ruta_local'],
+                            id_evaluacion=evaluacion.id,
+                            backup_info=backup,
+                            huella=extractor.huellas_backups.get(backup['ruta_local'])
+                        )
+                        archivos_procesados.append(archivo_db.to_dict())
+                        progreso.sumar(metadatos_procesados=1)
+                        print(f"✅ Backup guardado en BD: {backup['nombre']}")
+                    except Exception as e:
+                        print(f"❌ Error procesando backup {backup['nombre']}: {e}")
+        
+        return {
+            'evaluacion': evaluacion.to_dict(),
+            'backups': resultado_backups,
+            'archivos_procesados': len(archivos_procesados),
+            'cancelado': progreso.cancelado
+        }
@@ -0,0 +1,127 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+
+class RepartoHost:
+    """
+    Reparto justo de los recursos del host entre varias extracciones simultáneas.
+
+    - Conexiones USB: el total de conexiones sync del host se divide en partes
+      iguales entre los dispositivos activos; cada MotorDescarga consulta su cupo
+      antes de abrir otra conexión, así un teléfono rápido no acapara el bus.
+      Un dispositivo deja de contar apenas termina su descarga (descarga_terminada),
+      aunque su extracción siga con metadatos, llamadas o proveedores.
+      Como cada conexión escribe un solo archivo, el cupo acota también las
+      escrituras a disco simultáneas de cada dispositivo.
+    - Procesamiento de metadatos: hay un número fijo de turnos; cuando se
+      libera uno, lo toma el dispositivo que menos turnos tiene en uso (y entre
+      iguales, el que espera hace más tiempo).
+    - Rendimiento: bytes descargados por dispositivo y agregados.
+    """
+
+    def __init__(self, conexiones_usb=8, trabajadores_metadatos=2):
+        """
+        Args:
+            conexiones_usb: Conexiones sync simultáneas en todo el host
+            trabajadores_metadatos: Archivos procesados (metadatos + BD) a la vez en todo el host
+        """
+        self.conexiones_usb = max(1, int(conexiones_usb))
+        self.trabajadores_metadatos = max(1, int(trabajadores_metadatos))
+        self._condicion = threading.Condition()
+        self._activos = {}
+        self._inicio = None
+        self._espera = []
+        self._tickets = itertools.count()
+
+    def registrar(self, serial):
+        with self._condicion:
+            if self._inicio is None:
+                self._inicio = time.perf_counter()
+            self._activos[serial] = {"bytes": 0, "archivos": 0, "metadatos_en_uso": 0,
+                                     "inicio": time.perf_counter(), "fin_descarga": None, "fin": None}
+
+    def descarga_terminada(self, serial):
+        """Marcar que el dispositivo ya no abre conexiones sync; su cupo se reparte entre los demás"""
+        with self._condicion:
+            estado = self._activos.get(serial)
+            if estado is not None and estado["fin_descarga"] is None:
+                estado["fin_descarga"] = time.perf_counter()
+
+    def retirar(self, serial):
+        """Marcar un dispositivo como terminado; su parte se reparte entre los demás"""
+        with self._condicion:
+            if serial in self._activos:
+                self._activos[serial]["fin"] = time.perf_counter()
+            self._condicion.notify_all()
+
+    def _en_curso(self):
+        return [serial for serial, estado in self._activos.items() if estado["fin"] is None]
+
+    def _descargando(self):
+        return [serial for serial, estado in self._activos.items()
+                if estado["fin"] is None and estado["fin_descarga"] is None]
+
+    def cupo_conexiones(self, serial):
+        """Conexiones sync que le corresponden ahora al dispositivo (al menos 1)"""
+        with self._condicion:
+            return max(1, self.conexiones_usb // max(1, len(self._descargando())))
+
+    def contabilizar(self, serial, bytes_descargados):
+        with self._condicion:
+            estado = self._activos.get(serial)
+            if estado is not None:
+                estado["bytes"] += bytes_descargados
+                estado["archivos"] += 1
+
+    @contextmanager
+    def turno_metadatos(self, serial):
+        """Esperar un turno de procesamiento de metadatos, repartidos en forma justa"""
+        with self._condicion:
+            estado = self._activos[serial]
+            turno = (next(self._tickets), serial)
+            self._espera.append(turno)
+            while not self._puede_tomar_turno(turno):
+                self._condicion.wait()
+            self._espera.remove(turno)
+            estado["metadatos_en_uso"] += 1
+        try:
+            yield
+        finally:
+            with self._condicion:
+                estado["metadatos_en_uso"] -= 1
+                self._condicion.notify_all()
+
+    def _puede_tomar_turno(self, turno):
+        en_uso = sum(estado["metadatos_en_uso"] for estado in self._activos.values())
+        if en_uso >= self.trabajadores_metadatos:
+            return False
+        siguiente = min(self._espera, key=lambda t: (self._activos[t[1]]["metadatos_en_uso"], t[0]))
+        return siguiente == turno
+
+    def estadisticas(self):
+        """Rendimiento agregado y por dispositivo"""
+        ahora = time.perf_counter()
+        with self._condicion:
+            por_dispositivo = {}
+            for serial, estado in self._activos.items():
+                segundos = max((estado["fin"] or ahora) - estado["inicio"], 1e-6)
+                por_dispositivo[serial] = {
+                    "bytes_descargados": estado["bytes"],
+                    "archivos_descargados": estado["archivos"],
+                    "segundos": round(segundos, 3),
+                    "bytes_por_segundo": round(estado["bytes"] / segundos),
+                    "en_curso": estado["fin"] is None,
+                    "descargando": estado["fin"] is None and estado["fin_descarga"] is None
+                }
+            segundos = max(ahora - self._inicio, 1e-6) if self._inicio is not None else 1e-6
+            total = sum(estado["bytes"] for estado in self._activos.values())
+            return {
+                "bytes_descargados": total,
+                "segundos": round(segundos, 3),
+                "bytes_por_segundo": round(total / segundos),
+                "dispositivos_en_curso": len(self._en_curso()),
+                "dispositivos_descargando": len(self._descargando()),
+                "por_dispositivo": por_dispositivo
+            }
@@ -0,0 +1,213 @@
+import queue
+import threading
+import time
+
+
+class IngestaInterrumpida(Exception):
+    """Una etapa de la ingesta falló y las demás dejaron de aceptar archivos"""
+
+
+class TuberiaIngesta:
+    """
+    Ingesta por etapas de los archivos de una extracción:
+    descarga → metadatos → base de datos.
+
+    Cada archivo descargado entra a una cola acotada; varios hilos calculan
+    sus metadatos y los pasan a otra cola acotada, que el hilo escritor vacía
+    en lotes (una transacción por lote). Así el USB, la CPU/disco y la base de
+    datos trabajan a la vez. Si una etapa se atrasa, su cola se llena y la
+    anterior espera (backpressure); el tiempo de espera y la ocupación de
+    cada etapa quedan en estadisticas().
+    """
+
+    _FIN = object()
+
+    # Segundos entre revisiones de interrupción mientras se espera una cola
+    _SONDEO = 0.2
+
+    def __init__(self, procesar, guardar_lote, trabajadores=2, capacidad=32, tamano_lote=50, espera_lote=1.0):
+        """
+        Args:
+            procesar: Función (item) -> registro, ejecutada en los hilos de metadatos;
+                si lanza una excepción el archivo se descarta y se cuenta como error
+            guardar_lote: Función (lista de registros) ejecutada en el hilo que llama a escribir()
+            trabajadores: Hilos de la etapa de metadatos
+            capacidad: Elementos máximos en cada cola
+            tamano_lote: Registros por transacción
+            espera_lote: Segundos máximos que un lote incompleto espera antes de guardarse
+        """
+        self.procesar = procesar
+        self.guardar_lote = guardar_lote
+        self.trabajadores = max(1, int(trabajadores))
+        self.tamano_lote = max(1, int(tamano_lote))
+        self.espera_lote = espera_lote
+        self._cola_metadatos = queue.Queue(maxsize=max(1, int(capacidad)))
+        self._cola_bd = queue.Queue(maxsize=max(1, int(capacidad)))
+        self._interrumpida = threading.Event()
+        self._lock = threading.Lock()
+        self._hilos = []
+        self._activos = 0
+        self._inicio = None
+        self._fin = None
+        self._etapas = {
+            "descarga": {"archivos": 0, "segundos_bloqueado": 0.0},
+            "metadatos": {"archivos": 0, "errores": 0, "segundos_ocupado": 0.0,
+                          "segundos_bloqueado": 0.0, "max_cola": 0},
+            "base_datos": {"registros": 0, "lotes": 0, "segundos_ocupado": 0.0, "max_cola": 0}
+        }
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self._activos = self.trabajadores
+        for i in range(self.trabajadores):
+            hilo = threading.Thread(target=self._trabajador, name=f"metadatos-{i}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        return self
+
+    def entrada(self, item):
+        """Entregar un archivo ya descargado; espera si la etapa de metadatos está llena"""
+        esperado = self._poner(self._cola_metadatos, item)
+        with self._lock:
+            etapa = self._etapas["descarga"]
+            etapa["archivos"] += 1
+            etapa["segundos_bloqueado"] += esperado
+            self._etapas["metadatos"]["max_cola"] = max(
+                self._etapas["metadatos"]["max_cola"], self._cola_metadatos.qsize()
+            )
+
+    def cerrar(self):
+        """Indicar que no entran más archivos"""
+        for _ in range(self.trabajadores):
+            try:
+                self._poner(self._cola_metadatos, self._FIN)
+            except IngestaInterrumpida:
+                return
+
+    def _poner(self, cola, elemento):
+        inicio = time.perf_counter()
+        while True:
+            if self._interrumpida.is_set():
+                raise IngestaInterrumpida("La ingesta de archivos se interrumpió")
+            try:
+                cola.put(elemento, timeout=self._SONDEO)
+                return time.perf_counter() - inicio
+            except queue.Full:
+                continue
+
+    def _tomar(self, cola, espera=None):
+        """Siguiente elemento de la cola, o None si venció la espera"""
+        limite = time.monotonic() + espera if espera is not None else None
+        while not self._interrumpida.is_set():
+            sondeo = self._SONDEO if limite is None else min(self._SONDEO, max(limite - time.monotonic(), 0))
+            try:
+                return cola.get(timeout=sondeo)
+            except queue.Empty:
+                if limite is not None and time.monotonic() >= limite:
+                    return None
+        raise IngestaInterrumpida("La ingesta de archivos se interrumpió")
+
+    def _trabajador(self):
+        try:
+            while True:
+                item = self._tomar(self._cola_metadatos)
+                if item is self._FIN:
+                    break
+                inicio = time.perf_counter()
+                try:
+                    registro = self.procesar(item)
+                except Exception as e:
+                    print(f"Error procesando metadatos de {getattr(item, 'nombre', item)}: {e}")
+                    with self._lock:
+                        self._etapas["metadatos"]["errores"] += 1
+                    continue
+                ocupado = time.perf_counter() - inicio
+                esperado = self._poner(self._cola_bd, registro)
+                with self._lock:
+                    etapa = self._etapas["metadatos"]
+                    etapa["archivos"] += 1
+                    etapa["segundos_ocupado"] += ocupado
+                    etapa["segundos_bloqueado"] += esperado
+                    self._etapas["base_datos"]["max_cola"] = max(
+                        self._etapas["base_datos"]["max_cola"], self._cola_bd.qsize()
+                    )
+        except IngestaInterrumpida:
+            return
+        with self._lock:
+            self._activos -= 1
+            ultimo = self._activos == 0
+        # El último hilo de metadatos avisa al escritor que no hay más registros
+        if ultimo:
+            try:
+                self._poner(self._cola_bd, self._FIN)
+            except IngestaInterrumpida:
+                pass
+
+    def escribir(self):
+        """
+        Guardar los registros por lotes hasta que todas las etapas terminen.
+        Se ejecuta en el hilo que tiene acceso a la base de datos.
+
+        Returns:
+            Lista con lo que devolvió guardar_lote para cada lote
+        """
+        resultados = []
+        lote = []
+        limite = None
+        try:
+            while True:
+                espera = max(limite - time.monotonic(), 0) if lote else None
+                registro = self._tomar(self._cola_bd, espera)
+                if registro is self._FIN:
+                    break
+                if registro is not None:
+                    if not lote:
+                        limite = time.monotonic() + self.espera_lote
+                    lote.append(registro)
+                if lote and (len(lote) >= self.tamano_lote or time.monotonic() >= limite):
+                    resultados.append(self._guardar(lote))
+                    lote = []
+            if lote:
+                resultados.append(self._guardar(lote))
+        except BaseException:
+            self._interrumpida.set()
+            raise
+        finally:
+            self._fin = time.perf_counter()
+        return resultados
+
+    def _guardar(self, lote):
+        inicio = time.perf_counter()
+        resultado = self.guardar_lote(lote)
+        with self._lock:
+            etapa = self._etapas["base_datos"]
+            etapa["registros"] += len(lote)
+            etapa["lotes"] += 1
+            etapa["segundos_ocupado"] += time.perf_counter() - inicio
+        return resultado
+
+    def interrumpir(self):
+        """Detener todas las etapas (p. ej. si la descarga falló)"""
+        self._interrumpida.set()
+
+    def estadisticas(self):
+        """Archivos, tiempo ocupado, espera por backpressure y ocupación de cada etapa"""
+        fin = self._fin or time.perf_counter()
+        duracion = max(fin - self._inicio, 1e-6) if self._inicio is not None else 1e-6
+        with self._lock:
+            etapas = {nombre: dict(valores) for nombre, valores in self._etapas.items()}
+        etapas["metadatos"]["trabajadores"] = self.trabajadores
+        etapas["metadatos"]["utilizacion"] = round(
+            etapas["metadatos"]["segundos_ocupado"] / (duracion * self.trabajadores), 3
+        )
+        etapas["base_datos"]["utilizacion"] = round(etapas["base_datos"]["segundos_ocupado"] / duracion, 3)
+        for valores in etapas.values():
+            for clave in ("segundos_ocupado", "segundos_bloqueado"):
+                if clave in valores:
+                    valores[clave] = round(valores[clave], 3)
+        return {
+            "segundos": round(duracion, 3),
+            "capacidad_colas": self._cola_metadatos.maxsize,
+            "tamano_lote": self.tamano_lote,
+            "etapas": etapas
+        }
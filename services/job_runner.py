@@ -0,0 +1,188 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from utils.extraction_progress import ProgresoExtraccion, ExtraccionCancelada
+
+
+class ColaLlena(Exception):
+    """Se alcanzó el máximo de trabajos esperando turno"""
+
+
+class Trabajo:
+    """Una extracción encolada, con su estado, su progreso y su resultado"""
+
+    ESTADOS_FINALES = ("completado", "error", "cancelado")
+
+    def __init__(self, tipo, descripcion=None):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.descripcion = descripcion or {}
+        self.estado = "en_cola"
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.resultado = None
+        self.error = None
+        self.progreso = ProgresoExtraccion()
+        self.futuro = None
+
+    @property
+    def finalizado(self):
+        return self.estado in self.ESTADOS_FINALES
+
+    def to_dict(self, incluir_resultado=True):
+        datos = {
+            "id": self.id,
+            "tipo": self.tipo,
+            "estado": self.estado,
+            "creado": self.creado,
+            "iniciado": self.iniciado,
+            "terminado": self.terminado,
+            "error": self.error,
+            "progreso": self.progreso.instantanea(),
+            **self.descripcion
+        }
+        if incluir_resultado:
+            datos["resultado"] = self.resultado
+        return datos
+
+    def eventos(self, intervalo=0.5, latido=15):
+        """
+        Eventos de progreso agrupados para un stream (Server-Sent Events).
+
+        Se envía como máximo un evento por intervalo con el estado más reciente:
+        los cambios ocurridos mientras tanto (miles de archivos) quedan
+        resumidos en él. Sin cambios, cada `latido` segundos se entrega un
+        latido para mantener viva la conexión.
+
+        Yields:
+            Tuplas (tipo, version, datos): tipo "progreso", "fin" (el último,
+            al terminar el trabajo) o "latido" (datos None)
+        """
+        version = None
+        ultimo_envio = None
+        while True:
+            if ultimo_envio is not None:
+                pausa = intervalo - (time.monotonic() - ultimo_envio)
+                if pausa > 0:
+                    time.sleep(pausa)
+            nueva = self.progreso.esperar_cambio(version, latido)
+            if nueva == version:
+                yield "latido", version, None
+                continue
+            # Leer el estado antes de la instantánea: si el trabajo termina
+            # después, el cambio de versión produce un evento más
+            finalizado = self.finalizado
+            version = nueva
+            ultimo_envio = time.monotonic()
+            yield ("fin" if finalizado else "progreso"), version, self.to_dict(incluir_resultado=False)
+            if finalizado:
+                return
+
+
+class EjecutorTrabajos:
+    """
+    Ejecución en segundo plano de extracciones largas.
+
+    La petición HTTP encola el trabajo y responde enseguida con su id; un
+    número fijo de hilos lo ejecuta y el cliente consulta su estado y
+    progreso (o lo cancela) en lugar de mantener la conexión abierta.
+    """
+
+    def __init__(self, max_trabajos=2, max_en_cola=20, max_guardados=200, contexto=None):
+        """
+        Args:
+            max_trabajos: Trabajos ejecutándose a la vez
+            max_en_cola: Trabajos esperando turno; más allá se rechaza con ColaLlena
+            max_guardados: Trabajos terminados que se conservan para consultar
+            contexto: Función que devuelve el context manager con que se ejecuta
+                cada trabajo (p. ej. app.app_context)
+        """
+        self.max_en_cola = max(0, int(max_en_cola))
+        self.max_guardados = max(1, int(max_guardados))
+        self.contexto = contexto or nullcontext
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(max_trabajos)), thread_name_prefix="trabajo")
+        self._lock = threading.Lock()
+        self._trabajos = {}
+
+    def enviar(self, tipo, funcion, **descripcion):
+        """
+        Encolar un trabajo
+
+        Args:
+            tipo: Tipo de trabajo ("extraccion", "backups_whatsapp", ...)
+            funcion: Función que recibe el ProgresoExtraccion del trabajo y devuelve su resultado
+            **descripcion: Datos que se muestran con el trabajo (p. ej. serial)
+
+        Returns:
+            Trabajo encolado
+
+        Raises:
+            ColaLlena
+        """
+        with self._lock:
+            en_cola = sum(1 for t in self._trabajos.values() if t.estado == "en_cola")
+            if en_cola >= self.max_en_cola:
+                raise ColaLlena(f"Hay {en_cola} trabajos en cola; intente más tarde")
+            trabajo = Trabajo(tipo, descripcion)
+            self._trabajos[trabajo.id] = trabajo
+            self._purgar()
+        trabajo.futuro = self._pool.submit(self._ejecutar, trabajo, funcion)
+        return trabajo
+
+    def _ejecutar(self, trabajo, funcion):
+        # Cancelado mientras esperaba turno
+        if trabajo.progreso.cancelado:
+            self._terminar(trabajo, "cancelado")
+            return
+        trabajo.estado = "ejecutando"
+        trabajo.iniciado = time.time()
+        try:
+            with self.contexto():
+                trabajo.resultado = funcion(trabajo.progreso)
+            # Si se canceló durante la descarga el resultado es parcial
+            self._terminar(trabajo, "cancelado" if trabajo.progreso.cancelado else "completado")
+        except ExtraccionCancelada:
+            self._terminar(trabajo, "cancelado")
+        except Exception as e:
+            trabajo.error = str(e)
+            self._terminar(trabajo, "error")
+
+    def _terminar(self, trabajo, estado):
+        trabajo.terminado = time.time()
+        trabajo.estado = estado
+        trabajo.progreso.cambiar_etapa(estado)
+
+    def _purgar(self):
+        terminados = sorted(
+            (t for t in self._trabajos.values() if t.finalizado), key=lambda t: t.terminado
+        )
+        for trabajo in terminados[:max(0, len(terminados) - self.max_guardados)]:
+            del self._trabajos[trabajo.id]
+
+    def obtener(self, id_trabajo):
+        with self._lock:
+            return self._trabajos.get(id_trabajo)
+
+    def listar(self):
+        with self._lock:
+            trabajos = list(self._trabajos.values())
+        return sorted(trabajos, key=lambda t: t.creado, reverse=True)
+
+    def cancelar(self, id_trabajo):
+        """
+        Pedir la cancelación de un trabajo. Si aún no empezó no se ejecuta; si
+        está en curso deja de iniciar descargas y termina como "cancelado".
+
+        Returns:
+            Trabajo o None si no existe
+        """
+        trabajo = self.obtener(id_trabajo)
+        if trabajo is None or trabajo.finalizado:
+            return trabajo
+        trabajo.progreso.cancelar()
+        if trabajo.futuro is not None and trabajo.futuro.cancel():
+            self._terminar(trabajo, "cancelado")
+        return trabajo
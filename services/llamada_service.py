@@ -1,6 +1,7 @@
-from models.models import Llamada
+from models.models import Llamada, Evaluacion
 from database import db
 from datetime import datetime
+from sqlalchemy import BigInteger, func
 
 
 class LlamadaService:
@@ -35,6 +36,23 @@ class LlamadaService:
         db.session.commit()
         return llamadas_guardadas
     
+    @staticmethod
+    def ultima_fecha_llamada_ms(serial):
+        """
+        Fecha (epoch en ms, tal como la guarda el dispositivo) de la llamada más
+        reciente ya extraída de un dispositivo en cualquier evaluación
+        
+        Returns:
+            Entero o None si no hay llamadas previas de ese serial
+        """
+        if not serial:
+            return None
+        fecha_ms = Llamada.metadata_llamada['date_ms'].astext.cast(BigInteger)
+        return db.session.query(func.max(fecha_ms))\
+            .join(Evaluacion, Llamada.evaluacion_id == Evaluacion.id)\
+            .filter(Evaluacion.dispositivo_serial == serial)\
+            .scalar()
+    
     @staticmethod
     def obtener_llamadas_por_evaluacion(evaluacion_id):
         """
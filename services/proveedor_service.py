@@ -0,0 +1,103 @@
+from sqlalchemy import insert
+from models.models import Mensaje, Contacto, EventoCalendario
+from database import db
+from utils.content_providers import ProveedoresContenido
+
+
+class ProveedorService:
+    # Tabla de cada proveedor declarado en ProveedoresContenido
+    MODELOS = {
+        "sms": Mensaje,
+        "mms": Mensaje,
+        "contactos": Contacto,
+        "calendario": EventoCalendario
+    }
+    
+    # Tablas consultables por evaluación
+    TABLAS = {
+        "mensajes": Mensaje,
+        "contactos": Contacto,
+        "eventos_calendario": EventoCalendario
+    }
+    
+    TAMANO_LOTE = 1000
+    
+    @staticmethod
+    def guardar_en_lotes(nombre, registros, evaluacion_id, tamano_lote=None):
+        """
+        Guarda los registros de un proveedor a medida que llegan, con un
+        INSERT por lote; en memoria nunca hay más de un lote
+        
+        Args:
+            nombre: Nombre del proveedor (sms, mms, contactos, calendario)
+            registros: Iterable de diccionarios (ver AndroidFileExtractor.iterar_proveedor)
+            evaluacion_id: ID de la evaluación asociada
+            tamano_lote: Registros por INSERT (None = TAMANO_LOTE)
+        
+        Returns:
+            Cantidad de registros guardados
+        """
+        modelo = ProveedorService.MODELOS[nombre]
+        tamano_lote = tamano_lote or ProveedorService.TAMANO_LOTE
+        total = 0
+        lote = []
+        
+        for registro in registros:
+            registro['evaluacion_id'] = evaluacion_id
+            lote.append(registro)
+            if len(lote) >= tamano_lote:
+                db.session.execute(insert(modelo), lote)
+                db.session.commit()
+                total += len(lote)
+                lote = []
+        
+        if lote:
+            db.session.execute(insert(modelo), lote)
+            db.session.commit()
+            total += len(lote)
+        
+        return total
+    
+    @staticmethod
+    def validar_proveedores(nombres):
+        """Verifica que todos los proveedores pedidos estén declarados"""
+        no_validos = [nombre for nombre in nombres if nombre not in ProveedoresContenido.PROVEEDORES]
+        if no_validos:
+            raise ValueError(f"Proveedores no válidos: {', '.join(no_validos)}")
+    
+    @staticmethod
+    def extraer_y_guardar(extractor, nombres, evaluacion_id):
+        """
+        Extrae varios proveedores del dispositivo y los guarda en la evaluación
+        
+        Returns:
+            Diccionario nombre -> cantidad guardada (o error si falló ese proveedor)
+        """
+        ProveedorService.validar_proveedores(nombres)
+        resultado = {}
+        for nombre in nombres:
+            try:
+                resultado[nombre] = ProveedorService.guardar_en_lotes(
+                    nombre, extractor.iterar_proveedor(nombre), evaluacion_id
+                )
+                print(f"🗂️ {nombre}: {resultado[nombre]} registros guardados")
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Error extrayendo {nombre}: {e}")
+                resultado[nombre] = {'error': str(e)}
+        return resultado
+    
+    @staticmethod
+    def listar(tabla, evaluacion_id, desde=0, limite=100):
+        """
+        Obtiene una página de los registros de una tabla de proveedores
+        
+        Returns:
+            Tupla (registros, total)
+        """
+        modelo = ProveedorService.TABLAS.get(tabla)
+        if modelo is None:
+            raise ValueError(f"Tabla no válida: {tabla}")
+        consulta = modelo.query.filter_by(evaluacion_id=evaluacion_id)
+        registros = consulta.order_by(modelo.id).offset(desde).limit(limite).all()
+        return registros, consulta.count()
@@ -0,0 +1,509 @@
+import hashlib
+import io
+import json
+import os
+import shlex
+import tarfile
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from utils.stream_digest import DigestoEnTransito
+
+
+class MotorDescarga:
+    """
+    Descarga archivos del dispositivo con varias conexiones sync en paralelo.
+
+    La cantidad de conexiones se ajusta sola (hill climbing): cada `ventana`
+    archivos se mide el rendimiento y se sigue subiendo o bajando la
+    concurrencia mientras mejore. Con archivos grandes se mide en bytes/s;
+    con archivos pequeños, donde domina la latencia por archivo, en archivos/s.
+    """
+
+    # Tamaño medio por debajo del cual se optimiza archivos/s en lugar de bytes/s
+    UMBRAL_ARCHIVO_PEQUENO = 256 * 1024
+
+    # Caída de rendimiento tolerada antes de invertir la dirección del ajuste
+    TOLERANCIA = 0.05
+
+    def __init__(self, device, max_conexiones=4, conexiones_iniciales=2, ventana=8, hashes_adicionales=None,
+                 cupo=None):
+        """
+        Args:
+            device: Dispositivo adbutils
+            max_conexiones: Máximo de conexiones sync simultáneas
+            conexiones_iniciales: Conexiones con las que se empieza
+            ventana: Archivos completados entre cada ajuste de concurrencia
+            hashes_adicionales: Hashes a calcular además de SHA-256 ("md5", "sha1")
+            cupo: Función sin argumentos que devuelve cuántas conexiones se pueden
+                usar ahora (por ejemplo la parte de este dispositivo en RepartoHost);
+                se consulta antes de abrir cada conexión
+        """
+        self.device = device
+        self.hashes_adicionales = hashes_adicionales
+        self.cupo = cupo
+        self.max_conexiones = max(1, int(max_conexiones))
+        self.conexiones = max(1, min(int(conexiones_iniciales), self.max_conexiones))
+        self.ventana = max(1, int(ventana))
+
+    def _descargar_uno(self, ruta_remota, destino):
+        """
+        Descargar un archivo calculando sus hashes en la misma pasada;
+        si falla se elimina el archivo parcial
+        """
+        inicio = time.perf_counter()
+        digesto = DigestoEnTransito(self.hashes_adicionales)
+        try:
+            with open(destino, "wb") as f:
+                for bloque in self.device.sync.iter_content(ruta_remota):
+                    f.write(bloque)
+                    digesto.actualizar(bloque)
+        except Exception as e:
+            if os.path.exists(destino):
+                os.remove(destino)
+            return {"destino": destino, "bytes": 0, "segundos": time.perf_counter() - inicio, "error": str(e)}
+        huella = digesto.resultado()
+        return {
+            "destino": destino,
+            "bytes": huella["bytes"],
+            "segundos": time.perf_counter() - inicio,
+            "error": None,
+            "huella": huella
+        }
+
+    def _conexiones_permitidas(self):
+        if self.cupo is None:
+            return self.conexiones
+        return max(1, min(self.conexiones, self.cupo()))
+
+    def _ajustar(self, direccion, tasa, tasa_anterior):
+        """
+        Un paso del ajuste de concurrencia: se sigue en la misma dirección salvo
+        que el rendimiento haya caído más que TOLERANCIA. En un límite (1 o
+        max_conexiones) se queda ahí mientras el rendimiento no caiga.
+
+        Args:
+            direccion: +1 (subir conexiones) o -1 (bajar)
+            tasa: Tupla (unidad, valor) medida en la última ventana
+            tasa_anterior: Tupla de la ventana anterior (None en la primera)
+
+        Returns:
+            Dirección para el próximo paso
+        """
+        if tasa_anterior and tasa_anterior[0] == tasa[0] \
+                and tasa[1] < tasa_anterior[1] * (1 - self.TOLERANCIA):
+            direccion = -direccion
+        self.conexiones = max(1, min(self.conexiones + direccion, self.max_conexiones))
+        return direccion
+
+    def descargar(self, tareas, al_terminar=None):
+        """
+        Descargar una secuencia de archivos
+
+        Args:
+            tareas: Iterable de tuplas (ruta_remota, destino, contexto). Se consume
+                de a poco, así los destinos se pueden reservar a medida que se envían.
+            al_terminar: Función llamada (en el hilo que invoca descargar) con
+                (contexto, resultado) al terminar cada archivo. resultado tiene
+                destino, bytes, segundos, error (None si se descargó bien) y, si se
+                descargó, huella (hashes y bytes iniciales, ver DigestoEnTransito).
+
+        Returns:
+            Diccionario con estadísticas de la transferencia
+        """
+        tareas = iter(tareas)
+        pendientes = {}
+        agotadas = False
+
+        bytes_totales = 0
+        archivos_ok = 0
+        archivos_error = 0
+        historial = []
+        direccion = 1
+        tasa_anterior = None
+        inicio = time.perf_counter()
+        inicio_ventana = inicio
+        bytes_ventana = 0
+        archivos_ventana = 0
+        conexiones_max_usadas = 0
+
+        pool = ThreadPoolExecutor(max_workers=self.max_conexiones)
+        try:
+            while True:
+                # Mantener en vuelo tantas descargas como conexiones objetivo
+                while not agotadas and len(pendientes) < self._conexiones_permitidas():
+                    try:
+                        ruta_remota, destino, contexto = next(tareas)
+                    except StopIteration:
+                        agotadas = True
+                        break
+                    futuro = pool.submit(self._descargar_uno, ruta_remota, destino)
+                    pendientes[futuro] = contexto
+                    conexiones_max_usadas = max(conexiones_max_usadas, len(pendientes))
+
+                if not pendientes:
+                    break
+
+                terminados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    contexto = pendientes.pop(futuro)
+                    resultado = futuro.result()
+                    if resultado["error"] is None:
+                        archivos_ok += 1
+                        bytes_totales += resultado["bytes"]
+                    else:
+                        archivos_error += 1
+                    bytes_ventana += resultado["bytes"]
+                    archivos_ventana += 1
+                    if al_terminar:
+                        al_terminar(contexto, resultado)
+
+                if archivos_ventana >= self.ventana and self.max_conexiones > 1:
+                    duracion = max(time.perf_counter() - inicio_ventana, 1e-6)
+                    if bytes_ventana / archivos_ventana >= self.UMBRAL_ARCHIVO_PEQUENO:
+                        tasa = ("bytes", bytes_ventana / duracion)
+                    else:
+                        tasa = ("archivos", archivos_ventana / duracion)
+
+                    # Con cupo, la tasa medida corresponde a las conexiones permitidas,
+                    # no al objetivo: el ajuste parte de ese valor
+                    self.conexiones = self._conexiones_permitidas()
+                    historial.append({
+                        "conexiones": self.conexiones,
+                        "bytes_por_segundo": round(bytes_ventana / duracion),
+                        "archivos_por_segundo": round(archivos_ventana / duracion, 2)
+                    })
+                    direccion = self._ajustar(direccion, tasa, tasa_anterior)
+
+                    tasa_anterior = tasa
+                    inicio_ventana = time.perf_counter()
+                    bytes_ventana = 0
+                    archivos_ventana = 0
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+        duracion_total = max(time.perf_counter() - inicio, 1e-6)
+        return {
+            "archivos_descargados": archivos_ok,
+            "archivos_fallidos": archivos_error,
+            "bytes_descargados": bytes_totales,
+            "segundos": round(duracion_total, 3),
+            "bytes_por_segundo": round(bytes_totales / duracion_total),
+            "conexiones_finales": self.conexiones,
+            "conexiones_max_usadas": conexiones_max_usadas,
+            "historial_concurrencia": historial[-20:]
+        }
+
+
+class DescargaTar:
+    """
+    Descarga muchos archivos pequeños en un único stream tar generado en el
+    dispositivo (exec-out), evitando el costo por archivo del protocolo sync.
+
+    El tar se lee y se desempaqueta a medida que llega; cada archivo se
+    escribe en el destino que asigna quien llama, y se informa con su ruta
+    original en el dispositivo.
+    """
+
+    # Lista temporal de archivos a empaquetar (tar -T) en el dispositivo
+    RUTA_LISTA = "/data/local/tmp/.extraccion_tar_lista.txt"
+
+    TAMANO_BLOQUE = 1024 * 1024
+
+    def __init__(self, device, comprimir=False, hashes_adicionales=None):
+        """
+        Args:
+            device: Dispositivo adbutils
+            comprimir: Generar el tar con gzip en el dispositivo (útil para documentos
+                y texto; los archivos multimedia ya vienen comprimidos)
+            hashes_adicionales: Hashes a calcular además de SHA-256 ("md5", "sha1")
+        """
+        self.device = device
+        self.comprimir = comprimir
+        self.hashes_adicionales = hashes_adicionales
+
+    @staticmethod
+    def disponible(device):
+        """Verificar si el dispositivo tiene tar"""
+        try:
+            return device.shell("tar --help >/dev/null 2>&1 && echo ok").strip() == "ok"
+        except Exception:
+            return False
+
+    def descargar(self, rutas, reservar_destino, al_terminar=None, detener=None):
+        """
+        Descargar una lista de archivos en un solo stream tar
+
+        Args:
+            rutas: Rutas absolutas de los archivos en el dispositivo
+            reservar_destino: Función (ruta_remota) -> ruta local donde escribir el archivo
+            al_terminar: Función (ruta_remota, resultado) llamada por cada archivo recibido;
+                resultado tiene destino, bytes, segundos, error y huella
+            detener: Función sin argumentos; si devuelve True se corta el stream
+                (presupuesto de tiempo agotado o extracción cancelada)
+
+        Returns:
+            Tupla (estadisticas, rutas_no_recibidas). Los archivos que el tar no
+            entregó (error de lectura, stream cortado) deben descargarse por otra vía.
+        """
+        pendientes = set(rutas)
+        lista = "".join(ruta.lstrip("/") + "\n" for ruta in rutas).encode("utf-8")
+        self.device.sync.push(io.BytesIO(lista), self.RUTA_LISTA)
+
+        opciones = "-czf" if self.comprimir else "-cf"
+        cmd = f"tar {opciones} - -C / -T {self.RUTA_LISTA} 2>/dev/null"
+
+        archivos_ok = 0
+        bytes_totales = 0
+        inicio = time.perf_counter()
+
+        conexion = self.device.open_transport()
+        try:
+            conexion.send_command("exec:" + cmd)
+            conexion.check_okay()
+            flujo = conexion.conn.makefile("rb")
+            with tarfile.open(fileobj=flujo, mode="r|gz" if self.comprimir else "r|") as tar:
+                for miembro in tar:
+                    if detener is not None and detener():
+                        print("⏹️ Extracción detenida, se corta el stream tar")
+                        break
+                    if not miembro.isfile():
+                        continue
+                    nombre = miembro.name[2:] if miembro.name.startswith("./") else miembro.name
+                    ruta = "/" + nombre.lstrip("/")
+                    if ruta not in pendientes:
+                        continue
+
+                    inicio_archivo = time.perf_counter()
+                    destino = reservar_destino(ruta)
+                    digesto = DigestoEnTransito(self.hashes_adicionales)
+                    try:
+                        origen = tar.extractfile(miembro)
+                        with open(destino, "wb") as f:
+                            for bloque in iter(lambda: origen.read(self.TAMANO_BLOQUE), b""):
+                                f.write(bloque)
+                                digesto.actualizar(bloque)
+                    except Exception:
+                        if os.path.exists(destino):
+                            os.remove(destino)
+                        raise
+
+                    pendientes.discard(ruta)
+                    archivos_ok += 1
+                    bytes_totales += miembro.size
+                    if al_terminar:
+                        al_terminar(ruta, {
+                            "destino": destino,
+                            "bytes": miembro.size,
+                            "segundos": time.perf_counter() - inicio_archivo,
+                            "error": None,
+                            "huella": digesto.resultado()
+                        })
+        except (tarfile.TarError, OSError, EOFError) as e:
+            print(f"⚠️ Stream tar interrumpido: {e}. {len(pendientes)} archivos quedan pendientes")
+        finally:
+            conexion.close()
+            try:
+                self.device.shell(f"rm -f {self.RUTA_LISTA}")
+            except Exception:
+                pass
+
+        duracion = max(time.perf_counter() - inicio, 1e-6)
+        estadisticas = {
+            "archivos_descargados": archivos_ok,
+            "bytes_descargados": bytes_totales,
+            "segundos": round(duracion, 3),
+            "bytes_por_segundo": round(bytes_totales / duracion),
+            "comprimido": self.comprimir
+        }
+        return estadisticas, [ruta for ruta in rutas if ruta in pendientes]
+
+
+class DescargaPorBloques:
+    """
+    Descarga reanudable de archivos grandes (por ejemplo los backups de WhatsApp)
+    en bloques direccionados por offset.
+
+    Cada bloque se lee en el dispositivo con dd y se agrega al archivo parcial;
+    tras cada bloque se guarda un registro de progreso, así un corte del USB
+    solo repite el bloque en curso y una nueva petición retoma desde el último
+    bloque completo. Al terminar se verifica el tamaño y el hash contra el
+    calculado en el propio dispositivo.
+    """
+
+    # Buffer de dd en el dispositivo (offset y largo de cada bloque van en bytes)
+    BLOQUE_DD = 1024 * 1024
+
+    TAMANO_BLOQUE = 8 * 1024 * 1024
+
+    # Intentos por bloque antes de abandonar (el progreso queda guardado)
+    REINTENTOS = 3
+
+    # Segundos de espera entre intentos de un mismo bloque
+    ESPERA_REINTENTO = 1
+
+    def __init__(self, device, carpeta_parciales, hashes_adicionales=None):
+        """
+        Args:
+            device: Dispositivo adbutils
+            carpeta_parciales: Carpeta donde quedan los archivos parciales y su progreso
+            hashes_adicionales: Hashes a calcular además de SHA-256 ("md5", "sha1")
+        """
+        self.device = device
+        self.carpeta_parciales = carpeta_parciales
+        self.hashes_adicionales = hashes_adicionales
+
+    def _ruta_parcial(self, ruta_remota):
+        nombre = "".join(c if c.isalnum() or c in "._-" else "_" for c in f"{self.device.serial}{ruta_remota}")
+        return os.path.join(self.carpeta_parciales, nombre + ".parcial")
+
+    def _estado_remoto(self, ruta_remota):
+        """Tamaño y mtime del archivo en el dispositivo"""
+        salida = self.device.shell(f"stat -c '%s %Y' {shlex.quote(ruta_remota)} 2>/dev/null").split()
+        if len(salida) != 2:
+            raise FileNotFoundError(f"No se pudo leer {ruta_remota} en el dispositivo")
+        return int(salida[0]), int(salida[1])
+
+    def _cargar_progreso(self, ruta_progreso, ruta_parcial, esperado):
+        """Bytes confirmados de una descarga anterior del mismo archivo (0 si no hay o cambió)"""
+        try:
+            with open(ruta_progreso, "r", encoding="utf-8") as f:
+                progreso = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if any(progreso.get(clave) != valor for clave, valor in esperado.items()):
+            return 0
+        confirmados = progreso.get("bytes_confirmados", 0)
+        if not os.path.exists(ruta_parcial) or os.path.getsize(ruta_parcial) < confirmados:
+            return 0
+        return confirmados
+
+    def _guardar_progreso(self, ruta_progreso, esperado, confirmados):
+        temporal = ruta_progreso + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(dict(esperado, bytes_confirmados=confirmados), f)
+        os.replace(temporal, ruta_progreso)
+
+    def _leer_bloque(self, ruta_remota, offset, largo):
+        """
+        Leer largo bytes desde offset con dd (exec-out, sin conversión de fin de línea)
+
+        skip y count van en bytes (iflag=skip_bytes,count_bytes): dd lee hasta
+        completar largo aunque alguna lectura devuelva menos de bs, así una
+        lectura corta no achica el bloque.
+        """
+        cmd = (
+            f"dd if={shlex.quote(ruta_remota)} bs={self.BLOQUE_DD} "
+            f"iflag=skip_bytes,count_bytes skip={offset} count={largo} 2>/dev/null"
+        )
+        datos = bytearray()
+        conexion = self.device.open_transport()
+        try:
+            conexion.send_command("exec:" + cmd)
+            conexion.check_okay()
+            while True:
+                bloque = conexion.recv(self.BLOQUE_DD)
+                if not bloque:
+                    break
+                datos += bloque
+        finally:
+            conexion.close()
+        if len(datos) != largo:
+            raise IOError(f"Bloque incompleto en offset {offset}: {len(datos)} de {largo} bytes")
+        return bytes(datos)
+
+    def _hash_dispositivo(self, ruta_remota):
+        """
+        Hash calculado en el dispositivo: SHA-256, o MD5 si no tiene sha256sum
+
+        Returns:
+            Tupla (algoritmo, hash) o (None, None) si no se pudo calcular
+        """
+        for algoritmo, comando in (("sha256", "sha256sum"), ("md5", "md5sum")):
+            salida = self.device.shell(f"{comando} {shlex.quote(ruta_remota)} 2>/dev/null").split()
+            if salida and len(salida[0]) == (64 if algoritmo == "sha256" else 32):
+                return algoritmo, salida[0].lower()
+        return None, None
+
+    def descargar(self, ruta_remota, destino):
+        """
+        Descargar un archivo, retomando una descarga anterior interrumpida
+
+        Args:
+            ruta_remota: Ruta del archivo en el dispositivo
+            destino: Ruta local final (el archivo se mueve ahí al verificarse)
+
+        Returns:
+            Diccionario con destino, bytes, segundos, error, huella (si se
+            descargó), reanudado_desde y verificacion
+        """
+        inicio = time.perf_counter()
+        os.makedirs(self.carpeta_parciales, exist_ok=True)
+        ruta_parcial = self._ruta_parcial(ruta_remota)
+        ruta_progreso = ruta_parcial + ".json"
+        resultado = {"destino": destino, "bytes": 0, "error": None, "reanudado_desde": 0, "verificacion": None}
+
+        try:
+            tamano, mtime = self._estado_remoto(ruta_remota)
+            esperado = {"ruta": ruta_remota, "tamano": tamano, "mtime": mtime, "tamano_bloque": self.TAMANO_BLOQUE}
+            confirmados = self._cargar_progreso(ruta_progreso, ruta_parcial, esperado)
+            resultado["reanudado_desde"] = confirmados
+
+            # El hash es de punta a punta: lo ya descargado se vuelve a leer localmente
+            digesto = DigestoEnTransito(self.hashes_adicionales)
+            with open(ruta_parcial, "r+b" if confirmados else "wb") as f:
+                while f.tell() < confirmados:
+                    digesto.actualizar(f.read(min(self.TAMANO_BLOQUE, confirmados - f.tell())))
+                # Descartar lo escrito después del último bloque confirmado
+                f.truncate()
+
+                while confirmados < tamano:
+                    largo = min(self.TAMANO_BLOQUE, tamano - confirmados)
+                    for intento in range(1, self.REINTENTOS + 1):
+                        try:
+                            datos = self._leer_bloque(ruta_remota, confirmados, largo)
+                            break
+                        except Exception as e:
+                            if intento == self.REINTENTOS:
+                                raise IOError(f"{e} (reanudable desde {confirmados} bytes)")
+                            print(f"⚠️ Reintentando bloque en offset {confirmados} ({intento}/{self.REINTENTOS}): {e}")
+                            time.sleep(self.ESPERA_REINTENTO)
+                    f.write(datos)
+                    f.flush()
+                    digesto.actualizar(datos)
+                    confirmados += largo
+                    self._guardar_progreso(ruta_progreso, esperado, confirmados)
+
+            huella = digesto.resultado()
+            algoritmo, hash_dispositivo = self._hash_dispositivo(ruta_remota)
+            verificacion = {"tamano_dispositivo": tamano, "tamano_local": os.path.getsize(ruta_parcial),
+                            "algoritmo": algoritmo, "hash_dispositivo": hash_dispositivo}
+            if algoritmo == "sha256":
+                verificacion["hash_local"] = huella["hash_sha256"]
+            elif algoritmo == "md5":
+                verificacion["hash_local"] = huella.get("hash_md5") or self._md5_local(ruta_parcial)
+            verificacion["coincide"] = (
+                verificacion["tamano_local"] == tamano
+                and (algoritmo is None or verificacion["hash_local"] == hash_dispositivo)
+            )
+            resultado["verificacion"] = verificacion
+            if not verificacion["coincide"]:
+                # Un parcial corrupto no sirve para reanudar: la próxima vez se descarga de cero
+                os.remove(ruta_parcial)
+                os.remove(ruta_progreso)
+                raise IOError("La verificación de tamaño/hash contra el dispositivo falló")
+
+            os.replace(ruta_parcial, destino)
+            os.remove(ruta_progreso)
+            resultado.update({"bytes": tamano, "huella": huella})
+        except Exception as e:
+            resultado["error"] = str(e)
+        resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+        return resultado
+
+    @staticmethod
+    def _md5_local(ruta):
+        md5 = hashlib.md5()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(bloque)
+        return md5.hexdigest()
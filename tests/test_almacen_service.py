@@ -0,0 +1,173 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Necesita una base de datos PostgreSQL desechable (las tablas se crean y se vacían)
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL no configurada")
+class TestAlmacenService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from flask import Flask
+        from database import db
+        import models.models  # noqa: F401 (registra las tablas)
+        cls.app = Flask(__name__)
+        cls.app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+        db.init_app(cls.app)
+        with cls.app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        from database import db
+        from models.models import Blob, Archivo, Evaluacion
+        from services import almacen_service
+        self.db = db
+        self.Blob = Blob
+        self.almacen = almacen_service.almacen
+        self.AlmacenService = almacen_service.AlmacenService
+        self.tmp = tempfile.mkdtemp()
+        self.carpeta_original = self.almacen.carpeta
+        self.almacen.carpeta = os.path.join(self.tmp, "almacen")
+        self.contexto = self.app.app_context()
+        self.contexto.push()
+        Archivo.query.delete()
+        Evaluacion.query.delete()
+        Blob.query.delete()
+        db.session.commit()
+        self.evaluacion = Evaluacion(dispositivo_serial="SERIAL")
+        db.session.add(self.evaluacion)
+        db.session.commit()
+
+    def tearDown(self):
+        self.db.session.rollback()
+        self.contexto.pop()
+        self.almacen.carpeta = self.carpeta_original
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def _entrante(self, contenido):
+        ruta = self.almacen.ruta_entrante()
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        return ruta
+
+    def _archivo(self, ruta_blob, nombre="a.jpg", ruta_dispositivo=None):
+        from models.models import Archivo
+        metadata = {"hash_sha256": os.path.basename(ruta_blob), "nombre_original": nombre}
+        if ruta_dispositivo:
+            metadata["ruta_dispositivo"] = ruta_dispositivo
+        return Archivo(nombre_original=nombre, ruta_almacenamiento=ruta_blob, tamano_bytes=4,
+                       metadata_archivo=metadata, evaluacion_id=self.evaluacion.id)
+
+    def _referencias(self, sha256):
+        self.db.session.expire_all()
+        blob = self.db.session.get(self.Blob, sha256)
+        return blob.referencias if blob is not None else None
+
+    def test_referenciar_cuenta_duplicados_del_lote(self):
+        ruta_blob, _ = self.almacen.ingresar(self._entrante(b"hola"))
+        sha256 = os.path.basename(ruta_blob)
+        archivos = [self._archivo(ruta_blob, "a.jpg"), self._archivo(ruta_blob, "b.jpg")]
+        self.db.session.add_all(archivos)
+        self.AlmacenService.referenciar(archivos)
+        self.db.session.commit()
+        self.AlmacenService.soltar([sha256])
+
+        self.assertEqual(self._referencias(sha256), 2)
+        self.assertTrue(os.path.exists(ruta_blob))
+
+    def test_liberar_y_eliminar_sin_referencias(self):
+        ruta_blob, _ = self.almacen.ingresar(self._entrante(b"hola"))
+        sha256 = os.path.basename(ruta_blob)
+        archivos = [self._archivo(ruta_blob, "a.jpg"), self._archivo(ruta_blob, "b.jpg")]
+        self.db.session.add_all(archivos)
+        self.AlmacenService.referenciar(archivos)
+        self.db.session.commit()
+        self.AlmacenService.soltar([sha256])
+
+        self.assertEqual(self.AlmacenService.liberar(archivos[:1]), [])
+        self.db.session.commit()
+        self.assertEqual(self._referencias(sha256), 1)
+
+        self.assertEqual(self.AlmacenService.liberar(archivos[1:]), [sha256])
+        self.db.session.commit()
+        self.assertEqual(self.AlmacenService.eliminar_sin_referencias([sha256]), 1)
+        self.assertFalse(os.path.exists(ruta_blob))
+        self.assertIsNone(self._referencias(sha256))
+
+    def test_reserva_entre_liberar_y_eliminar_conserva_el_blob(self):
+        ruta_blob, _ = self.almacen.ingresar(self._entrante(b"hola"))
+        sha256 = os.path.basename(ruta_blob)
+        archivo = self._archivo(ruta_blob)
+        self.db.session.add(archivo)
+        self.AlmacenService.referenciar([archivo])
+        self.db.session.commit()
+        self.AlmacenService.soltar([sha256])
+
+        sin_referencias = self.AlmacenService.liberar([archivo])
+        self.db.session.delete(archivo)
+        self.db.session.commit()
+        # Otra extracción descarga el mismo contenido antes de que se elimine
+        ruta_nueva, nuevo = self.almacen.ingresar(self._entrante(b"hola"))
+        self.assertFalse(nuevo)
+
+        self.assertEqual(self.AlmacenService.eliminar_sin_referencias(sin_referencias), 0)
+        self.assertTrue(os.path.exists(ruta_nueva))
+        self.assertEqual(self._referencias(sha256), 1)
+
+    def test_soltar_reserva_sin_registro_elimina_el_blob(self):
+        ruta_blob, nuevo = self.almacen.ingresar(self._entrante(b"hola"))
+        self.assertTrue(nuevo)
+        self.assertEqual(self._referencias(os.path.basename(ruta_blob)), 1)
+
+        self.assertEqual(self.AlmacenService.soltar([os.path.basename(ruta_blob)]), 1)
+        self.assertFalse(os.path.exists(ruta_blob))
+
+    def test_ingreso_fallido_suelta_la_reserva(self):
+        from utils.content_store import AlmacenContenido
+        entrante = self._entrante(b"hola")
+        sha256 = self.almacen.calcular_sha256(entrante)
+        with mock.patch.object(AlmacenContenido, "ingresar", side_effect=OSError("disco lleno")):
+            with self.assertRaises(OSError):
+                self.almacen.ingresar(entrante)
+        self.assertIsNone(self._referencias(sha256))
+
+    def test_guardar_lote_reutilizado_conserva_nombre_y_ruta(self):
+        from models.models import Evaluacion
+        from services.archivo_service import ArchivoService
+        # Dos rutas del dispositivo con el mismo contenido
+        ruta_a, _ = self.almacen.ingresar(self._entrante(b"igual"))
+        ruta_b, _ = self.almacen.ingresar(self._entrante(b"igual"))
+        sha256 = os.path.basename(ruta_a)
+        metadata = {"hash_sha256": sha256, "size_bytes": 5}
+        ArchivoService.guardar_lote([
+            (ruta_a, {**metadata, "nombre_original": "a.jpg", "ruta_dispositivo": "/sdcard/a.jpg"}, False),
+            (ruta_b, {**metadata, "nombre_original": "b.jpg", "ruta_dispositivo": "/sdcard/b.jpg"}, False)
+        ], self.evaluacion.id)
+        self.AlmacenService.soltar([sha256, sha256])
+
+        siguiente = Evaluacion(dispositivo_serial="SERIAL")
+        self.db.session.add(siguiente)
+        self.db.session.commit()
+        guardados = ArchivoService.guardar_lote([
+            (ruta_a, {"nombre_original": "a.jpg", "ruta_dispositivo": "/sdcard/a.jpg"}, True),
+            (ruta_b, {"nombre_original": "b.jpg", "ruta_dispositivo": "/sdcard/b.jpg"}, True)
+        ], siguiente.id)
+
+        self.assertEqual(
+            [(a.nombre_original, a.metadata_archivo["ruta_dispositivo"]) for a in guardados],
+            [("a.jpg", "/sdcard/a.jpg"), ("b.jpg", "/sdcard/b.jpg")]
+        )
+        self.assertEqual(self._referencias(sha256), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import hashlib
+import os
+import re
+import sys
+import tempfile
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.transfer_service import DescargaPorBloques
+
+
+class FakeTransport:
+    def __init__(self, device):
+        self.device = device
+        self.datos = b""
+
+    def send_command(self, cmd):
+        """Simular dd: sin count_bytes, cada una de las count lecturas trae como mucho lectura_maxima bytes"""
+        skip, count = map(int, re.search(r"skip=(\d+) count=(\d+)", cmd).groups())
+        bs = int(re.search(r"bs=(\d+)", cmd).group(1))
+        flags = re.search(r"iflag=(\S+)", cmd)
+        flags = flags.group(1).split(",") if flags else []
+        inicio = skip if "skip_bytes" in flags else skip * bs
+        if inicio in self.device.fallar_en:
+            self.device.fallar_en.remove(inicio)
+            raise OSError("USB desconectado")
+        if "count_bytes" in flags:
+            self.datos = self.device.contenido[inicio:inicio + count]
+            return
+        lectura = min(bs, self.device.lectura_maxima or bs)
+        self.datos = b"".join(
+            self.device.contenido[inicio + i * lectura:inicio + (i + 1) * lectura] for i in range(count)
+        )
+
+    def check_okay(self):
+        pass
+
+    def recv(self, n):
+        bloque, self.datos = self.datos[:n], self.datos[n:]
+        return bloque
+
+    def close(self):
+        pass
+
+
+class FakeDevice:
+    """Dispositivo con un único archivo, que puede fallar al leer ciertos bloques"""
+    serial = "SERIAL1"
+
+    def __init__(self, contenido, fallar_en=(), lectura_maxima=None):
+        self.contenido = contenido
+        # Offsets (en bytes) cuya lectura falla una vez por aparición
+        self.fallar_en = list(fallar_en)
+        # Bytes que devuelve como mucho cada read() en el dispositivo (lecturas cortas)
+        self.lectura_maxima = lectura_maxima
+        self.lecturas = 0
+
+    def open_transport(self):
+        self.lecturas += 1
+        return FakeTransport(self)
+
+    def shell(self, cmd):
+        if cmd.startswith("stat"):
+            return f"{len(self.contenido)} 1700000000"
+        if cmd.startswith("sha256sum"):
+            return hashlib.sha256(self.contenido).hexdigest() + "  /sdcard/msgstore.db.crypt15"
+        return ""
+
+
+class DescargaPequena(DescargaPorBloques):
+    BLOQUE_DD = 4
+    TAMANO_BLOQUE = 8
+    ESPERA_REINTENTO = 0
+
+
+class TestDescargaPorBloques(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.contenido = bytes(range(50))
+        self.destino = os.path.join(self.carpeta, "msgstore.db.crypt15")
+
+    def test_descarga_verificada(self):
+        descarga = DescargaPequena(FakeDevice(self.contenido, fallar_en=[8]), os.path.join(self.carpeta, ".p"))
+        resultado = descarga.descargar("/sdcard/msgstore.db.crypt15", self.destino)
+        self.assertIsNone(resultado["error"])
+        self.assertTrue(resultado["verificacion"]["coincide"])
+        self.assertEqual(resultado["huella"]["hash_sha256"], hashlib.sha256(self.contenido).hexdigest())
+        with open(self.destino, "rb") as f:
+            self.assertEqual(f.read(), self.contenido)
+
+    def test_reanudar_desde_ultimo_bloque(self):
+        # El bloque en offset 24 falla en todos los intentos
+        dispositivo = FakeDevice(self.contenido, fallar_en=[24] * DescargaPequena.REINTENTOS)
+        descarga = DescargaPequena(dispositivo, os.path.join(self.carpeta, ".p"))
+        resultado = descarga.descargar("/sdcard/msgstore.db.crypt15", self.destino)
+        self.assertIn("reanudable desde 24", resultado["error"])
+        self.assertFalse(os.path.exists(self.destino))
+
+        dispositivo.lecturas = 0
+        resultado = descarga.descargar("/sdcard/msgstore.db.crypt15", self.destino)
+        self.assertIsNone(resultado["error"])
+        self.assertEqual(resultado["reanudado_desde"], 24)
+        # Solo se leen los bloques que faltaban (24-32, 32-40, 40-48, 48-50)
+        self.assertEqual(dispositivo.lecturas, 4)
+        self.assertEqual(resultado["huella"]["hash_sha256"], hashlib.sha256(self.contenido).hexdigest())
+
+    def test_lecturas_cortas_no_achican_el_bloque(self):
+        dispositivo = FakeDevice(self.contenido, lectura_maxima=3)
+        descarga = DescargaPequena(dispositivo, os.path.join(self.carpeta, ".p"))
+        resultado = descarga.descargar("/sdcard/msgstore.db.crypt15", self.destino)
+        self.assertIsNone(resultado["error"])
+        self.assertTrue(resultado["verificacion"]["coincide"])
+        # Un dd por bloque de 8 bytes, sin reintentos
+        self.assertEqual(dispositivo.lecturas, 7)
+        with open(self.destino, "rb") as f:
+            self.assertEqual(f.read(), self.contenido)
+
+    def test_hash_distinto_descarta_parcial(self):
+        dispositivo = FakeDevice(self.contenido)
+        dispositivo.shell = lambda cmd: "50 1700000000" if cmd.startswith("stat") else "0" * 64
+        descarga = DescargaPequena(dispositivo, os.path.join(self.carpeta, ".p"))
+        resultado = descarga.descargar("/sdcard/msgstore.db.crypt15", self.destino)
+        self.assertIsNotNone(resultado["error"])
+        self.assertFalse(resultado["verificacion"]["coincide"])
+        self.assertEqual(os.listdir(os.path.join(self.carpeta, ".p")), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+from datetime import datetime
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.content_providers import ProveedoresContenido
+
+
+class TestProveedoresContenido(unittest.TestCase):
+    def test_columnas_proyectadas_sin_duplicados(self):
+        columnas = ProveedoresContenido.columnas("sms")
+        self.assertEqual(len(columnas), len(set(columnas)))
+        self.assertIn("body", columnas)
+        self.assertIn("date_sent", columnas)
+
+    def test_mapear_sms(self):
+        registro = ProveedoresContenido.mapear("sms", {
+            "_id": "7", "thread_id": "2", "address": "+59170000000", "subject": None,
+            "body": "hola,\nmundo", "date": "1700000000000", "type": "2", "read": "1",
+            "date_sent": "1699999999000", "status": "-1", "service_center": None
+        })
+        self.assertEqual(registro["tipo_mensaje"], "sms")
+        self.assertEqual(registro["id_dispositivo"], 7)
+        self.assertEqual(registro["cuerpo"], "hola,\nmundo")
+        self.assertEqual(registro["tipo"], "enviado")
+        self.assertTrue(registro["leido"])
+        self.assertEqual(registro["fecha"], datetime(2023, 11, 14, 18, 13, 20))
+        # Las columnas sin campo propio (y no nulas) van al JSONB
+        self.assertEqual(registro["metadata_mensaje"], {"date_sent": "1699999999000", "status": "-1"})
+
+    def test_mapear_contacto_con_tipo_desconocido(self):
+        registro = ProveedoresContenido.mapear("contactos", {
+            "contact_id": "3", "display_name": "Juan", "data1": "juan@example.com",
+            "mimetype": "vnd.android.cursor.item/vnd.com.whatsapp.profile"
+        })
+        self.assertEqual(registro["contacto_id"], 3)
+        self.assertEqual(registro["tipo_dato"], "vnd.android.cursor.item/vnd.com.whatsapp.profile")
+
+    def test_valores_invalidos_quedan_nulos(self):
+        registro = ProveedoresContenido.mapear("calendario", {"_id": "x", "dtstart": "", "allDay": "0"})
+        self.assertIsNone(registro["id_dispositivo"])
+        self.assertIsNone(registro["inicio"])
+        self.assertFalse(registro["todo_el_dia"])
+
+
+if __name__ == '__main__':
+    unittest.main()
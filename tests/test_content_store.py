@@ -0,0 +1,66 @@
+import unittest
+import hashlib
+import os
+import sys
+import tempfile
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.content_store import AlmacenContenido
+
+
+class TestAlmacenContenido(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.almacen = AlmacenContenido(os.path.join(self.carpeta, "almacen"))
+
+    def _archivo(self, contenido):
+        ruta = self.almacen.ruta_entrante()
+        with open(ruta, "wb") as f:
+            f.write(contenido)
+        return ruta
+
+    def test_ruta_por_hash_en_subcarpetas(self):
+        sha256 = hashlib.sha256(b"foto").hexdigest()
+        ruta = self.almacen.ruta_blob(sha256)
+        self.assertEqual(
+            ruta, os.path.join(self.almacen.carpeta, sha256[:2], sha256[2:4], sha256)
+        )
+        self.assertTrue(self.almacen.contiene(ruta))
+        self.assertFalse(self.almacen.contiene(os.path.join(self.carpeta, "foto.jpg")))
+        with self.assertRaises(ValueError):
+            self.almacen.ruta_blob("../../etc/passwd")
+
+    def test_ingresar_mueve_y_deduplica(self):
+        primero = self._archivo(b"mismo contenido")
+        ruta, nuevo = self.almacen.ingresar(primero)
+        self.assertTrue(nuevo)
+        self.assertFalse(os.path.exists(primero))
+        with open(ruta, "rb") as f:
+            self.assertEqual(f.read(), b"mismo contenido")
+
+        segundo = self._archivo(b"mismo contenido")
+        sha256 = hashlib.sha256(b"mismo contenido").hexdigest()
+        ruta_duplicado, nuevo = self.almacen.ingresar(segundo, sha256)
+        self.assertFalse(nuevo)
+        self.assertEqual(ruta_duplicado, ruta)
+        self.assertFalse(os.path.exists(segundo))
+
+        # Ingresar un archivo que ya está en el almacén no lo mueve
+        self.assertEqual(self.almacen.ingresar(ruta), (ruta, False))
+
+    def test_eliminar(self):
+        ruta, _ = self.almacen.ingresar(self._archivo(b"x"))
+        sha256 = os.path.basename(ruta)
+        self.assertTrue(self.almacen.eliminar(sha256))
+        self.assertFalse(os.path.exists(ruta))
+        self.assertFalse(self.almacen.eliminar(sha256))
+
+    def test_entrantes_unicos(self):
+        self.assertNotEqual(self.almacen.ruta_entrante(), self.almacen.ruta_entrante())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.device_manifest import ManifiestoDispositivo
+
+
+class TestManifiestoDispositivo(unittest.TestCase):
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.local = os.path.join(self.carpeta, "a.jpg")
+        with open(self.local, "wb") as f:
+            f.write(b"x" * 10)
+
+    def test_reutiliza_archivo_sin_cambios_entre_ejecuciones(self):
+        manifiesto = ManifiestoDispositivo(self.carpeta, "R58M:123")
+        manifiesto.registrar("/sdcard/a.jpg", 10, 1700000000, self.local)
+        manifiesto.cerrar()
+
+        manifiesto = ManifiestoDispositivo(self.carpeta, "R58M:123")
+        self.assertEqual(manifiesto.sin_cambios("/sdcard/a.jpg", 10, 1700000000), os.path.abspath(self.local))
+        self.assertIsNone(manifiesto.sin_cambios("/sdcard/a.jpg", 10, 1700000060))
+        self.assertIsNone(manifiesto.sin_cambios("/sdcard/a.jpg", 11, 1700000000))
+        # Sin mtime conocido no se puede asegurar que no cambió
+        self.assertIsNone(manifiesto.sin_cambios("/sdcard/a.jpg", 10, 0))
+
+    def test_copia_local_incompleta_se_vuelve_a_descargar(self):
+        manifiesto = ManifiestoDispositivo(self.carpeta, "serial")
+        manifiesto.registrar("/sdcard/a.jpg", 20, 1700000000, self.local)
+        self.assertIsNone(manifiesto.sin_cambios("/sdcard/a.jpg", 20, 1700000000))
+        manifiesto.cerrar()
+
+    def test_ignora_linea_truncada_de_ejecucion_interrumpida(self):
+        manifiesto = ManifiestoDispositivo(self.carpeta, "serial")
+        manifiesto.registrar("/sdcard/a.jpg", 10, 1700000000, self.local)
+        manifiesto.cerrar()
+        with open(manifiesto.ruta, "a", encoding="utf-8") as f:
+            f.write('{"ruta": "/sdcard/b.jp')
+
+        manifiesto = ManifiestoDispositivo(self.carpeta, "serial")
+        self.assertEqual(list(manifiesto.entradas), ["/sdcard/a.jpg"])
+        manifiesto.registrar("/sdcard/c.jpg", 10, 1700000000, self.local)
+        manifiesto.cerrar()
+        self.assertEqual(len(ManifiestoDispositivo(self.carpeta, "serial").entradas), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.device_registry import RegistroDispositivos, DispositivoNoDisponible, DispositivoOcupado
+
+
+class RegistroSinAdb(RegistroDispositivos):
+    """Registro alimentado a mano, sin seguir al adb server"""
+    def iniciar(self):
+        pass
+
+
+class TestRegistroDispositivos(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroSinAdb()
+
+    def test_sin_serial_exige_un_unico_dispositivo(self):
+        with self.assertRaises(DispositivoNoDisponible):
+            self.registro.sesion()
+        self.registro._actualizar("A1", "device")
+        self.assertEqual(self.registro.sesion().serial, "A1")
+        self.registro._actualizar("B2", "device")
+        with self.assertRaises(DispositivoNoDisponible):
+            self.registro.sesion()
+        self.assertEqual(self.registro.sesion("B2").serial, "B2")
+
+    def test_dispositivo_sin_autorizar_no_esta_disponible(self):
+        self.registro._actualizar("A1", "unauthorized")
+        with self.assertRaises(DispositivoNoDisponible):
+            self.registro.sesion("A1")
+
+    def test_reconexion_conserva_la_sesion(self):
+        self.registro._actualizar("A1", "device")
+        sesion = self.registro.sesion("A1")
+        self.registro._actualizar("A1", "absent")
+        self.registro._actualizar("A1", "device")
+        self.assertIs(self.registro.sesion("A1"), sesion)
+        self.assertEqual(sesion.reconexiones, 1)
+
+    def test_arriendo_exclusivo_en_orden_de_llegada(self):
+        self.registro._actualizar("A1", "device")
+        sesion = self.registro.arrendar("A1", "primera")
+        with self.assertRaises(DispositivoOcupado):
+            self.registro.arrendar("A1", "impaciente", espera=0)
+
+        orden = []
+
+        def esperar(nombre):
+            self.registro.arrendar("A1", nombre, espera=5)
+            orden.append(nombre)
+            sesion.liberar()
+
+        hilos = []
+        for nombre in ("segunda", "tercera"):
+            hilo = threading.Thread(target=esperar, args=(nombre,))
+            hilo.start()
+            hilos.append(hilo)
+            while len(sesion._cola) < len(hilos):
+                time.sleep(0.01)
+        self.assertEqual(sesion.to_dict()["en_cola"], 2)
+
+        sesion.liberar()
+        for hilo in hilos:
+            hilo.join(5)
+        self.assertEqual(orden, ["segunda", "tercera"])
+        self.assertIsNone(sesion.arrendado_por)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Necesita una base de datos PostgreSQL desechable (las tablas se crean y se vacían)
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL no configurada")
+class TestEvaluacionService(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from flask import Flask
+        from database import db
+        import models.models  # noqa: F401 (registra las tablas)
+        cls.app = Flask(__name__)
+        cls.app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+        db.init_app(cls.app)
+        with cls.app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        from database import db
+        from models.models import Archivo, Llamada, Evaluacion
+        self.db = db
+        self.contexto = self.app.app_context()
+        self.contexto.push()
+        Archivo.query.delete()
+        Llamada.query.delete()
+        Evaluacion.query.delete()
+        db.session.commit()
+
+    def tearDown(self):
+        self.db.session.rollback()
+        self.contexto.pop()
+
+    def test_resumen_cuenta_registros_en_una_consulta(self):
+        from sqlalchemy import event
+        from models.models import Archivo, Llamada, Evaluacion
+        from services.evaluacion_service import EvaluacionService
+
+        for cantidad in range(3):
+            evaluacion = Evaluacion(dispositivo_serial=f"SERIAL{cantidad}")
+            self.db.session.add(evaluacion)
+            self.db.session.flush()
+            self.db.session.add_all(
+                Archivo(nombre_original=f"{i}.jpg", ruta_almacenamiento=f"/tmp/{i}.jpg", evaluacion_id=evaluacion.id)
+                for i in range(cantidad)
+            )
+            self.db.session.add(Llamada(numero="70000000", evaluacion_id=evaluacion.id))
+        self.db.session.commit()
+
+        consultas = []
+        motor = self.db.engine
+        registrar = lambda *args: consultas.append(args[2])
+        event.listen(motor, "before_cursor_execute", registrar)
+        try:
+            resumen = EvaluacionService.resumen_evaluaciones()
+        finally:
+            event.remove(motor, "before_cursor_execute", registrar)
+
+        self.assertEqual(len(consultas), 2)
+        por_serial = {e['dispositivo']['serial']: e for e in resumen}
+        self.assertEqual([por_serial[f"SERIAL{i}"]['cantidad_archivos'] for i in range(3)], [0, 1, 2])
+        self.assertEqual(por_serial["SERIAL2"]['cantidad_llamadas'], 1)
+        self.assertEqual(por_serial["SERIAL2"]['cantidad_mensajes'], 0)
+        evaluacion = Evaluacion.query.filter_by(dispositivo_serial="SERIAL2").one()
+        self.assertEqual(evaluacion.to_dict(), por_serial["SERIAL2"])
+
+
+if __name__ == '__main__':
+    unittest.main()
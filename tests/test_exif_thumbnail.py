@@ -0,0 +1,56 @@
+import unittest
+import os
+import io
+import struct
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from PIL import Image
+from utils.exif_thumbnail import MiniaturaExif
+
+
+def jpeg_con_miniatura(miniatura, orden="<"):
+    """Arma un JPEG con un bloque EXIF cuyo IFD1 apunta a la miniatura"""
+    marca = b"II" if orden == "<" else b"MM"
+    # Cabecera TIFF (8) + IFD0 vacío (2 + 4) + IFD1 con 2 entradas (2 + 24 + 4)
+    ifd1 = 14
+    inicio_miniatura = ifd1 + 2 + 2 * 12 + 4
+    tiff = marca + struct.pack(orden + "HI", 42, 8)
+    tiff += struct.pack(orden + "HI", 0, ifd1)
+    tiff += struct.pack(orden + "H", 2)
+    tiff += struct.pack(orden + "HHII", 0x0201, 4, 1, inicio_miniatura)
+    tiff += struct.pack(orden + "HHII", 0x0202, 4, 1, len(miniatura))
+    tiff += struct.pack(orden + "I", 0)
+    tiff += miniatura
+    app1 = b"Exif\x00\x00" + tiff
+    return b"\xff\xd8" + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + b"\xff\xda" + b"\x00" * 64
+
+
+class TestMiniaturaExif(unittest.TestCase):
+
+    def setUp(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (16, 12), color="red").save(buffer, format="JPEG")
+        self.miniatura = buffer.getvalue()
+
+    def test_extraer_miniatura(self):
+        for orden in ("<", ">"):
+            datos = jpeg_con_miniatura(self.miniatura, orden)
+            self.assertEqual(MiniaturaExif.extraer(datos), self.miniatura)
+        with Image.open(io.BytesIO(MiniaturaExif.extraer(datos))) as imagen:
+            self.assertEqual(imagen.size, (16, 12))
+
+    def test_miniatura_truncada(self):
+        datos = jpeg_con_miniatura(self.miniatura)
+        self.assertIsNone(MiniaturaExif.extraer(datos[:len(datos) // 2]))
+
+    def test_sin_miniatura(self):
+        self.assertIsNone(MiniaturaExif.extraer(self.miniatura))
+        self.assertIsNone(MiniaturaExif.extraer(b"\x89PNG\r\n\x1a\n"))
+        self.assertIsNone(MiniaturaExif.extraer(b""))
+
+
+if __name__ == '__main__':
+    unittest.main()
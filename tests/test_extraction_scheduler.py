@@ -0,0 +1,78 @@
+import unittest
+import os
+import sys
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.extraction_service import ArchivoEncontrado
+from utils.extraction_scheduler import PlanificadorExtraccion
+
+
+class TestPlanificadorExtraccion(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            ArchivoEncontrado("/sdcard/DCIM/video.mp4", tamano=4000, mtime=300),
+            ArchivoEncontrado("/sdcard/DCIM/foto1.jpg", tamano=300, mtime=100),
+            ArchivoEncontrado("/sdcard/Documents/informe.pdf", tamano=500, mtime=200),
+            ArchivoEncontrado("/sdcard/DCIM/foto2.jpg", tamano=200, mtime=400),
+        ]
+
+    def rutas(self, items):
+        return [item.ruta.rsplit("/", 1)[-1] for item in items]
+
+    def test_politicas(self):
+        self.assertEqual(
+            self.rutas(PlanificadorExtraccion("menor_primero").ordenar(self.items)),
+            ["foto2.jpg", "foto1.jpg", "informe.pdf", "video.mp4"]
+        )
+        self.assertEqual(
+            self.rutas(PlanificadorExtraccion("reciente_primero").ordenar(self.items)),
+            ["foto2.jpg", "video.mp4", "informe.pdf", "foto1.jpg"]
+        )
+        self.assertEqual(
+            self.rutas(PlanificadorExtraccion("categorias", ["imagenes", "videos"]).ordenar(self.items)),
+            ["foto2.jpg", "foto1.jpg", "video.mp4", "informe.pdf"]
+        )
+        self.assertEqual(self.rutas(PlanificadorExtraccion().ordenar(self.items)), self.rutas(self.items))
+
+    def test_presupuesto_bytes_difiere_lo_que_no_entra(self):
+        planificador = PlanificadorExtraccion("reciente_primero", presupuesto_bytes=1000)
+        seleccionados = planificador.seleccionar(self.items)
+        # El video no entra, pero los archivos más pequeños que le siguen sí
+        self.assertEqual(self.rutas(seleccionados), ["foto2.jpg", "informe.pdf", "foto1.jpg"])
+        self.assertEqual(self.items[0].diferido, "presupuesto_bytes")
+        resumen = planificador.resumen()["diferidos"]
+        self.assertEqual(resumen["total"], 1)
+        self.assertEqual(resumen["bytes"], 4000)
+        self.assertEqual(resumen["por_categoria"], {"videos": 1})
+
+    def test_presupuesto_tiempo(self):
+        planificador = PlanificadorExtraccion(presupuesto_segundos=0.05)
+        planificador.iniciar()
+        entregados = []
+        for item in planificador.mientras_haya_tiempo(self.items):
+            entregados.append(item)
+            time.sleep(0.06)
+        self.assertEqual(len(entregados), 1)
+        self.assertTrue(planificador.agotado())
+        self.assertEqual(planificador.resumen()["diferidos"]["por_motivo"], {"presupuesto_tiempo": 3})
+
+    def test_politica_invalida(self):
+        with self.assertRaises(ValueError):
+            PlanificadorExtraccion("al_azar")
+
+    def test_presupuestos_invalidos(self):
+        for opciones in ({"presupuesto_bytes": "100"}, {"presupuesto_segundos": "60"},
+                         {"presupuesto_bytes": True}, {"presupuesto_bytes": -1},
+                         {"presupuesto_segundos": 0}, {"presupuesto_segundos": float("nan")}):
+            with self.subTest(opciones=opciones):
+                with self.assertRaises(ValueError):
+                    PlanificadorExtraccion.validar(**opciones)
+        PlanificadorExtraccion.validar(presupuesto_bytes=0, presupuesto_segundos=1.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import os
+import sys
+import tempfile
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.extraction_service import AndroidFileExtractor
+
+
+class FakeConnection:
+    def __init__(self, data):
+        self.data = data
+
+    def recv(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeConnectionLenta:
+    """Entrega un registro por lectura, esperando `espera` segundos antes de cada uno"""
+    def __init__(self, registros, espera):
+        self.registros = list(registros)
+        self.espera = espera
+
+    def recv(self, n):
+        if not self.registros:
+            return b""
+        time.sleep(self.espera)
+        return self.registros.pop(0)
+
+    def close(self):
+        pass
+
+
+class FakeDevice:
+    """Responde al find del escaneo con `rutas` y cuenta cuántos recorridos hubo"""
+    serial = "SERIAL"
+
+    def __init__(self, rutas, espera=0.0):
+        self.rutas = rutas
+        self.espera = espera
+        self.recorridos = 0
+
+    def shell(self, cmd, stream=False, **kwargs):
+        if cmd.startswith("find / -maxdepth 0"):
+            return "d"
+        if cmd.startswith("find "):
+            self.recorridos += 1
+            registros = [f"10\t1700000000.0\tf\t{ruta}\0".encode() for ruta in self.rutas]
+            if self.espera:
+                return FakeConnectionLenta(registros, self.espera)
+            salida = b"".join(registros)
+            return FakeConnection(salida) if stream else salida.decode()
+        return ""
+
+
+class FakeDeviceSinFind:
+    """Sin find -printf ni ls -l útil: solo ls -p con nombres"""
+    serial = "SERIAL"
+
+    def __init__(self, directorios):
+        self.directorios = directorios
+
+    def shell(self, cmd, stream=False, **kwargs):
+        if cmd.startswith("find "):
+            return ""
+        if cmd.startswith("ls -l "):
+            return "total 0"
+        if cmd.startswith("ls -p "):
+            return "\n".join(self.directorios.get(cmd[len("ls -p "):].strip('"'), []))
+        return ""
+
+
+class FakeSesion:
+    def __init__(self, device):
+        self.device = device
+        self.cache = {}
+
+
+class TestEscanearPagina(unittest.TestCase):
+
+    def setUp(self):
+        self.device = FakeDevice([f"/sdcard/DCIM/foto{i}.jpg" for i in range(25)])
+        self.sesion = FakeSesion(self.device)
+
+    def pagina(self, desde, **kwargs):
+        extractor = AndroidFileExtractor(sesion=self.sesion)
+        return extractor.escanear_pagina(desde=desde, limite=10, rutas_personalizadas=["/sdcard/DCIM/"], **kwargs)
+
+    def test_paginas_siguientes_usan_el_escaneo_en_cache(self):
+        paginas = [self.pagina(desde) for desde in (0, 10, 20)]
+
+        self.assertEqual(self.device.recorridos, 1)
+        self.assertEqual(len({pagina["id_escaneo"] for pagina in paginas}), 1)
+        self.assertEqual([len(pagina["archivos"]) for pagina in paginas], [10, 10, 5])
+        self.assertEqual(paginas[2]["archivos"][0]["nombre"], "foto20.jpg")
+        self.assertTrue(all(pagina["total_archivos"] == 25 for pagina in paginas))
+
+    def test_otros_filtros_o_refrescar_vuelven_a_escanear(self):
+        primera = self.pagina(0)
+        otra = self.pagina(0, filtros={"tamano_max": 100})
+        refrescada = self.pagina(0, filtros={"tamano_max": 100}, refrescar=True)
+
+        self.assertEqual(self.device.recorridos, 3)
+        self.assertEqual(len({primera["id_escaneo"], otra["id_escaneo"], refrescada["id_escaneo"]}), 3)
+
+    def test_reconectar_descarta_el_escaneo(self):
+        self.pagina(0)
+        # SesionDispositivo.reconectar reemplaza la caché
+        self.sesion.cache = {}
+        self.pagina(10)
+        self.assertEqual(self.device.recorridos, 2)
+
+
+class TestEscaneoSinFind(unittest.TestCase):
+
+    def test_ls_p_no_descarta_por_tamano_desconocido(self):
+        device = FakeDeviceSinFind({
+            "/sdcard/DCIM/": ["a.jpg", "b.png", "Camera/"],
+            "/sdcard/DCIM/Camera/": ["c.jpg"]
+        })
+        extractor = AndroidFileExtractor(dispositivo=device)
+        archivos = list(extractor.iterar_archivos(
+            rutas_personalizadas=["/sdcard/DCIM/"],
+            categorias_filtro=["imagenes"],
+            filtros={"tamano_min": 1024}
+        ))
+        self.assertEqual(sorted(a.ruta for a in archivos),
+                         ["/sdcard/DCIM/Camera/c.jpg", "/sdcard/DCIM/a.jpg", "/sdcard/DCIM/b.png"])
+
+
+class TestPresupuestoDeTiempo(unittest.TestCase):
+
+    def test_vencer_durante_el_escaneo_corta_el_listado(self):
+        rutas = [f"/sdcard/DCIM/foto{i}.jpg" for i in range(40)]
+        device = FakeDevice(rutas, espera=0.01)
+        carpeta = tempfile.mkdtemp()
+        extractor = AndroidFileExtractor(carpeta_destino=carpeta, dispositivo=device)
+
+        resultado = extractor.extraer_archivos(
+            rutas_personalizadas=["/sdcard/DCIM/"], incremental=False, presupuesto_segundos=0.05
+        )
+
+        planificacion = resultado["planificacion"]
+        self.assertTrue(planificacion["escaneo_interrumpido"])
+        self.assertLess(resultado["archivos_escaneados"], len(rutas))
+        self.assertEqual(resultado["archivos_descargados"], 0)
+        self.assertEqual(planificacion["diferidos"]["por_motivo"],
+                         {"presupuesto_tiempo": resultado["archivos_escaneados"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
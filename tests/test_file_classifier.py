@@ -0,0 +1,35 @@
+import unittest
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.file_classifier import ClasificadorArchivos
+
+
+class TestClasificadorArchivos(unittest.TestCase):
+    def test_categoria_por_extension(self):
+        self.assertEqual(ClasificadorArchivos.categoria("/sdcard/DCIM/IMG_001.JPG"), "imagenes")
+        self.assertEqual(ClasificadorArchivos.categoria("msgstore.db.crypt14"), "whatsapp_backup")
+        self.assertIsNone(ClasificadorArchivos.categoria("/sdcard/DCIM/.nomedia"))
+        self.assertIsNone(ClasificadorArchivos.categoria("/sdcard/v1.2/archivo"))
+
+    def test_contenido_corrige_extension_incorrecta(self):
+        clasificacion = ClasificadorArchivos.clasificar("foto.png", b"\xff\xd8\xff\xe0\x00\x10JFIF")
+        self.assertEqual(clasificacion["mime_type"], "image/jpeg")
+        self.assertEqual(clasificacion["detectado_por"], "contenido")
+
+    def test_contenedor_generico_no_corrige_extension_conocida(self):
+        clasificacion = ClasificadorArchivos.clasificar("informe.docx", b"PK\x03\x04")
+        self.assertEqual(clasificacion["categoria"], "documentos")
+        self.assertEqual(clasificacion["detectado_por"], "extension")
+
+    def test_contenido_clasifica_archivo_sin_extension(self):
+        clasificacion = ClasificadorArchivos.clasificar("archivo", b"%PDF-1.7")
+        self.assertEqual(clasificacion["categoria"], "documentos")
+        self.assertEqual(clasificacion["mime_type"], "application/pdf")
+
+
+if __name__ == '__main__':
+    unittest.main()
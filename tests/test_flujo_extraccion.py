@@ -0,0 +1,158 @@
+import unittest
+import os
+import sys
+import shutil
+import tempfile
+from unittest import mock
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Necesita una base de datos PostgreSQL desechable (las tablas se crean y se vacían)
+TEST_DATABASE_URL = os.environ.get('TEST_DATABASE_URL')
+
+
+class FakeConnection:
+    def __init__(self, data):
+        self.data = data
+
+    def recv(self, n):
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+    def close(self):
+        pass
+
+
+class FakeSync:
+    """Entrega archivos de 10 bytes; al descargar `cancelar_en` pide la cancelación"""
+    def __init__(self, progreso, cancelar_en):
+        self.progreso = progreso
+        self.cancelar_en = cancelar_en
+
+    def iter_content(self, ruta):
+        if ruta == self.cancelar_en:
+            self.progreso.cancelar()
+        yield ruta.encode().rjust(10, b"_")[-10:]
+
+    def pull(self, ruta, destino):
+        with open(destino, "wb") as f:
+            f.writelines(self.iter_content(ruta))
+
+
+class FakeDevice:
+    serial = "SERIAL"
+
+    def __init__(self, rutas):
+        self.rutas = rutas
+
+    def shell(self, cmd, stream=False, **kwargs):
+        if cmd.startswith("find / -maxdepth 0"):
+            return "d"
+        if cmd.startswith("find "):
+            salida = b"".join(f"10\t1700000000.0\tf\t{ruta}\0".encode() for ruta in self.rutas)
+            return FakeConnection(salida) if stream else salida.decode()
+        if cmd.startswith("content query"):
+            raise RuntimeError("sin proveedor")
+        return ""
+
+
+class FakeSesion:
+    def __init__(self, device):
+        self.device = device
+        self.cache = {}
+        self.serial = device.serial
+
+
+@unittest.skipUnless(TEST_DATABASE_URL, "TEST_DATABASE_URL no configurada")
+class TestFlujoExtraccion(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        from flask import Flask
+        from database import db
+        import models.models  # noqa: F401 (registra las tablas)
+        cls.app = Flask(__name__)
+        cls.app.config['SQLALCHEMY_DATABASE_URI'] = TEST_DATABASE_URL
+        db.init_app(cls.app)
+        with cls.app.app_context():
+            db.create_all()
+
+    def setUp(self):
+        from services import almacen_service
+        self.tmp = tempfile.mkdtemp()
+        self.almacen = almacen_service.almacen
+        self.carpeta_original = self.almacen.carpeta
+        self.almacen.carpeta = os.path.join(self.tmp, "almacen")
+        self.manifiestos = mock.patch("config.Config.MANIFEST_FOLDER", os.path.join(self.tmp, "manifiestos"))
+        self.manifiestos.start()
+
+    def tearDown(self):
+        self.manifiestos.stop()
+        self.almacen.carpeta = self.carpeta_original
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def test_cancelar_durante_la_descarga_devuelve_resultado_parcial(self):
+        from models.models import Archivo
+        from services.flujo_extraccion_service import FlujoExtraccionService
+        from services.job_runner import EjecutorTrabajos
+
+        rutas = [f"/sdcard/DCIM/foto{i}.jpg" for i in range(20)]
+        device = FakeDevice(rutas)
+
+        def flujo(progreso):
+            device.sync = FakeSync(progreso, cancelar_en=rutas[2])
+            return FlujoExtraccionService.extraer_evaluacion(
+                FakeSesion(device),
+                {"rutas": ["/sdcard/DCIM/"], "conexiones_descarga": 1, "carpeta_destino": self.tmp},
+                progreso=progreso
+            )
+
+        ejecutor = EjecutorTrabajos(max_trabajos=1, contexto=self.app.app_context)
+        trabajo = ejecutor.enviar("extraccion", flujo)
+        trabajo.futuro.result(timeout=30)
+
+        self.assertEqual(trabajo.estado, "cancelado")
+        resultado = trabajo.resultado
+        self.assertIsNotNone(resultado)
+        self.assertTrue(resultado["cancelado"])
+        self.assertEqual(resultado["proveedores"], {})
+        self.assertLess(resultado["archivos_procesados"], len(rutas))
+        with self.app.app_context():
+            guardados = Archivo.query.filter_by(evaluacion_id=resultado["evaluacion"]["id"]).count()
+        self.assertEqual(guardados, resultado["archivos_procesados"])
+        self.assertGreater(guardados, 0)
+
+    def test_cancelar_durante_los_backups_registra_los_descargados(self):
+        from models.models import Archivo
+        from services.flujo_extraccion_service import FlujoExtraccionService
+        from services.job_runner import EjecutorTrabajos
+
+        carpeta = "/storage/emulated/0/WhatsApp/Databases/"
+        rutas = [f"{carpeta}msgstore-2024-01-0{i}.1.db.crypt14" for i in range(1, 6)]
+        device = FakeDevice(rutas)
+
+        def flujo(progreso):
+            device.sync = FakeSync(progreso, cancelar_en=rutas[1])
+            return FlujoExtraccionService.extraer_backups_whatsapp(
+                FakeSesion(device), {"carpeta_destino": self.tmp}, progreso=progreso
+            )
+
+        ejecutor = EjecutorTrabajos(max_trabajos=1, contexto=self.app.app_context)
+        trabajo = ejecutor.enviar("whatsapp", flujo)
+        trabajo.futuro.result(timeout=30)
+
+        self.assertEqual(trabajo.estado, "cancelado")
+        resultado = trabajo.resultado
+        self.assertIsNotNone(resultado)
+        self.assertTrue(resultado["cancelado"])
+        # El backup en curso al cancelar termina; los siguientes no se inician
+        self.assertEqual(resultado["backups"]["backups_descargados"], 2)
+        self.assertEqual(resultado["archivos_procesados"], 2)
+        with self.app.app_context():
+            guardados = Archivo.query.filter_by(evaluacion_id=resultado["evaluacion"]["id"]).count()
+        self.assertEqual(guardados, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.host_scheduler import RepartoHost
+
+
+class TestRepartoHost(unittest.TestCase):
+
+    def test_cupo_de_conexiones(self):
+        reparto = RepartoHost(conexiones_usb=8)
+        reparto.registrar("A")
+        self.assertEqual(reparto.cupo_conexiones("A"), 8)
+        reparto.registrar("B")
+        reparto.registrar("C")
+        self.assertEqual(reparto.cupo_conexiones("A"), 2)
+        reparto.retirar("B")
+        reparto.retirar("C")
+        self.assertEqual(reparto.cupo_conexiones("A"), 8)
+
+    def test_cupo_solo_cuenta_los_que_descargan(self):
+        reparto = RepartoHost(conexiones_usb=8)
+        reparto.registrar("A")
+        reparto.registrar("B")
+        self.assertEqual(reparto.cupo_conexiones("A"), 4)
+        # B sigue con metadatos y proveedores, pero ya no usa el USB
+        reparto.descarga_terminada("B")
+        self.assertEqual(reparto.cupo_conexiones("A"), 8)
+        estadisticas = reparto.estadisticas()
+        self.assertEqual(estadisticas["dispositivos_en_curso"], 2)
+        self.assertEqual(estadisticas["dispositivos_descargando"], 1)
+        self.assertFalse(estadisticas["por_dispositivo"]["B"]["descargando"])
+
+    def test_turnos_de_metadatos_justos(self):
+        reparto = RepartoHost(trabajadores_metadatos=1)
+        reparto.registrar("A")
+        reparto.registrar("B")
+        orden = []
+
+        def procesar(serial, cantidad):
+            for _ in range(cantidad):
+                with reparto.turno_metadatos(serial):
+                    orden.append(serial)
+                    time.sleep(0.005)
+
+        # A empieza antes y tiene más archivos, pero B no debe esperar a que termine
+        hilo_a = threading.Thread(target=procesar, args=("A", 10))
+        hilo_a.start()
+        time.sleep(0.01)
+        hilo_b = threading.Thread(target=procesar, args=("B", 3))
+        hilo_b.start()
+        hilo_a.join()
+        hilo_b.join()
+        self.assertEqual(len(orden), 13)
+        self.assertLess(max(i for i, serial in enumerate(orden) if serial == "B"), 12)
+
+    def test_estadisticas(self):
+        reparto = RepartoHost()
+        reparto.registrar("A")
+        reparto.registrar("B")
+        reparto.contabilizar("A", 1000)
+        reparto.contabilizar("B", 500)
+        reparto.retirar("A")
+        estadisticas = reparto.estadisticas()
+        self.assertEqual(estadisticas["bytes_descargados"], 1500)
+        self.assertEqual(estadisticas["dispositivos_en_curso"], 1)
+        self.assertFalse(estadisticas["por_dispositivo"]["A"]["en_curso"])
+        self.assertEqual(estadisticas["por_dispositivo"]["B"]["archivos_descargados"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.ingestion_pipeline import TuberiaIngesta, IngestaInterrumpida
+
+
+class TestTuberiaIngesta(unittest.TestCase):
+
+    def _producir(self, tuberia, items, pausa=0):
+        def producir():
+            try:
+                for item in items:
+                    tuberia.entrada(item)
+                    if pausa:
+                        time.sleep(pausa)
+            finally:
+                tuberia.cerrar()
+        hilo = threading.Thread(target=producir)
+        hilo.start()
+        return hilo
+
+    def test_procesa_todo_en_lotes(self):
+        lotes = []
+        tuberia = TuberiaIngesta(
+            lambda item: item * 2, lambda lote: lotes.append(list(lote)) or len(lote),
+            trabajadores=3, capacidad=4, tamano_lote=10
+        ).iniciar()
+        hilo = self._producir(tuberia, range(95))
+        resultados = tuberia.escribir()
+        hilo.join()
+
+        self.assertEqual(sorted(x for lote in lotes for x in lote), [i * 2 for i in range(95)])
+        self.assertTrue(all(len(lote) <= 10 for lote in lotes))
+        self.assertEqual(sum(resultados), 95)
+        etapas = tuberia.estadisticas()["etapas"]
+        self.assertEqual(etapas["descarga"]["archivos"], 95)
+        self.assertEqual(etapas["metadatos"]["archivos"], 95)
+        self.assertEqual(etapas["base_datos"]["registros"], 95)
+        self.assertEqual(etapas["base_datos"]["lotes"], len(lotes))
+
+    def test_lote_incompleto_se_guarda_al_vencer_la_espera(self):
+        guardados = []
+        tuberia = TuberiaIngesta(
+            lambda item: item, guardados.append, trabajadores=1, tamano_lote=100, espera_lote=0.05
+        ).iniciar()
+        tuberia.entrada("a")
+        limite = time.monotonic() + 5
+
+        def cerrar_cuando_guarde():
+            while not guardados and time.monotonic() < limite:
+                time.sleep(0.01)
+            tuberia.cerrar()
+        threading.Thread(target=cerrar_cuando_guarde).start()
+        tuberia.escribir()
+        self.assertEqual(guardados[0], ["a"])
+
+    def test_backpressure_de_la_base_de_datos(self):
+        def guardar_lento(lote):
+            time.sleep(0.05)
+
+        tuberia = TuberiaIngesta(lambda item: item, guardar_lento, trabajadores=1, capacidad=1,
+                                 tamano_lote=1).iniciar()
+        hilo = self._producir(tuberia, range(10))
+        tuberia.escribir()
+        hilo.join()
+        etapas = tuberia.estadisticas()["etapas"]
+        self.assertGreater(etapas["descarga"]["segundos_bloqueado"], 0.1)
+        self.assertGreater(etapas["base_datos"]["utilizacion"], 0.5)
+
+    def test_errores_de_metadatos_no_detienen_la_ingesta(self):
+        def procesar(item):
+            if item == 3:
+                raise ValueError("archivo dañado")
+            return item
+
+        guardados = []
+        tuberia = TuberiaIngesta(procesar, guardados.extend, trabajadores=2).iniciar()
+        hilo = self._producir(tuberia, range(6))
+        tuberia.escribir()
+        hilo.join()
+        self.assertEqual(sorted(guardados), [0, 1, 2, 4, 5])
+        self.assertEqual(tuberia.estadisticas()["etapas"]["metadatos"]["errores"], 1)
+
+    def test_falla_de_la_base_de_datos_interrumpe_la_descarga(self):
+        def guardar(lote):
+            raise RuntimeError("sin conexión")
+
+        tuberia = TuberiaIngesta(lambda item: item, guardar, trabajadores=1, capacidad=1,
+                                 tamano_lote=1).iniciar()
+        errores = []
+
+        def producir():
+            try:
+                for item in range(100):
+                    tuberia.entrada(item)
+            except IngestaInterrumpida as e:
+                errores.append(e)
+            finally:
+                tuberia.cerrar()
+        hilo = threading.Thread(target=producir)
+        hilo.start()
+        with self.assertRaises(RuntimeError):
+            tuberia.escribir()
+        hilo.join(5)
+        self.assertFalse(hilo.is_alive())
+        self.assertEqual(len(errores), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.job_runner import EjecutorTrabajos, ColaLlena
+from utils.extraction_progress import ProgresoExtraccion, ExtraccionCancelada
+
+
+class TestProgresoExtraccion(unittest.TestCase):
+
+    def test_contadores_y_estimacion(self):
+        progreso = ProgresoExtraccion()
+        progreso.fijar(archivos_planificados=2, bytes_planificados=1000)
+        progreso.cambiar_etapa("descarga")
+        progreso.sumar(archivos_descargados=1, bytes_descargados=500)
+        progreso.registrar_error("/sdcard/b.jpg", "sin permiso")
+
+        datos = progreso.instantanea()
+        self.assertEqual(datos["etapa"], "descarga")
+        self.assertEqual(datos["bytes_descargados"], 500)
+        self.assertEqual(datos["archivos_fallidos"], 1)
+        self.assertEqual(datos["errores"], [{"ruta": "/sdcard/b.jpg", "error": "sin permiso"}])
+        self.assertGreater(datos["bytes_por_segundo"], 0)
+        self.assertIsNotNone(datos["eta_segundos"])
+
+    def test_cancelacion(self):
+        progreso = ProgresoExtraccion()
+        progreso.verificar_cancelacion()
+        progreso.cancelar()
+        with self.assertRaises(ExtraccionCancelada):
+            progreso.verificar_cancelacion()
+
+
+class TestEjecutorTrabajos(unittest.TestCase):
+
+    def test_trabajo_completado(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1)
+
+        def funcion(progreso):
+            progreso.sumar(archivos_escaneados=3)
+            return {"total": 3}
+
+        trabajo = ejecutor.enviar("extraccion", funcion, serial="A")
+        trabajo.futuro.result(timeout=5)
+        datos = ejecutor.obtener(trabajo.id).to_dict()
+        self.assertEqual(datos["estado"], "completado")
+        self.assertEqual(datos["resultado"], {"total": 3})
+        self.assertEqual(datos["serial"], "A")
+        self.assertEqual(datos["progreso"]["archivos_escaneados"], 3)
+
+    def test_error(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1)
+
+        def funcion(progreso):
+            raise IOError("dispositivo desconectado")
+
+        trabajo = ejecutor.enviar("extraccion", funcion)
+        trabajo.futuro.result(timeout=5)
+        self.assertEqual(trabajo.estado, "error")
+        self.assertEqual(trabajo.error, "dispositivo desconectado")
+
+    def test_cancelar_en_curso_y_en_cola(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1)
+        empezo = threading.Event()
+
+        def funcion(progreso):
+            empezo.set()
+            while not progreso.cancelado:
+                time.sleep(0.01)
+            progreso.verificar_cancelacion()
+
+        en_curso = ejecutor.enviar("extraccion", funcion)
+        en_cola = ejecutor.enviar("extraccion", funcion)
+        self.assertTrue(empezo.wait(5))
+        self.assertEqual(en_cola.estado, "en_cola")
+
+        ejecutor.cancelar(en_cola.id)
+        self.assertEqual(en_cola.estado, "cancelado")
+        ejecutor.cancelar(en_curso.id)
+        en_curso.futuro.result(timeout=5)
+        self.assertEqual(en_curso.estado, "cancelado")
+
+    def test_cola_llena(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1, max_en_cola=1)
+        liberar = threading.Event()
+        empezo = threading.Event()
+
+        def funcion(progreso):
+            empezo.set()
+            liberar.wait(5)
+
+        ejecutor.enviar("extraccion", funcion)
+        self.assertTrue(empezo.wait(5))
+        ejecutor.enviar("extraccion", funcion)
+        with self.assertRaises(ColaLlena):
+            ejecutor.enviar("extraccion", funcion)
+        liberar.set()
+
+    def test_eventos_agrupados(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1)
+
+        def funcion(progreso):
+            for _ in range(2000):
+                progreso.sumar(archivos_descargados=1, bytes_descargados=10)
+                if _ % 200 == 0:
+                    time.sleep(0.01)
+
+        trabajo = ejecutor.enviar("extraccion", funcion)
+        eventos = list(trabajo.eventos(intervalo=0.05, latido=5))
+
+        self.assertLess(len(eventos), 50)
+        tipo, _, datos = eventos[-1]
+        self.assertEqual(tipo, "fin")
+        self.assertEqual(datos["estado"], "completado")
+        self.assertEqual(datos["progreso"]["archivos_descargados"], 2000)
+        self.assertNotIn("resultado", datos)
+        versiones = [version for _, version, _ in eventos]
+        self.assertEqual(versiones, sorted(set(versiones)))
+
+    def test_latido_sin_cambios(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1)
+        liberar = threading.Event()
+        trabajo = ejecutor.enviar("extraccion", lambda progreso: liberar.wait(5))
+        eventos = trabajo.eventos(intervalo=0, latido=0.05)
+        tipos = [next(eventos)[0] for _ in range(3)]
+        liberar.set()
+        self.assertIn("latido", tipos)
+
+    def test_purga_de_terminados(self):
+        ejecutor = EjecutorTrabajos(max_trabajos=1, max_guardados=2)
+        for _ in range(4):
+            ejecutor.enviar("extraccion", lambda progreso: None).futuro.result(timeout=5)
+        ejecutor.enviar("extraccion", lambda progreso: None).futuro.result(timeout=5)
+        self.assertLessEqual(len(ejecutor.listar()), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
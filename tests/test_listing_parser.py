@@ -0,0 +1,134 @@
+import unittest
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.listing_parser import ListingParser
+
+
+class FakeConnection:
+    """Simula un AdbConnection entregando la salida en bloques arbitrarios"""
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.chunk_size = chunk_size
+        self.closed = False
+
+    def recv(self, n):
+        chunk, self.data = self.data[:self.chunk_size], self.data[self.chunk_size:]
+        return chunk
+
+    def close(self):
+        self.closed = True
+
+
+class TestListingParser(unittest.TestCase):
+    def test_iterar_registros_split_across_chunks(self):
+        data = b"10\t1700000000.5\tf\t/sdcard/DCIM/a.jpg\0" \
+               b"20\t1700000001.0\tf\t/sdcard/DCIM/con\ttab.png\0"
+        conexion = FakeConnection(data, chunk_size=7)
+
+        registros = list(ListingParser.iterar_registros(conexion))
+
+        self.assertEqual(len(registros), 2)
+        self.assertTrue(conexion.closed)
+
+    def test_parsear_registro_find(self):
+        entrada = ListingParser.parsear_registro_find(
+            "20\t1700000001.75\tf\t/sdcard/DCIM//con\ttab.png"
+        )
+        self.assertEqual(entrada, ("/sdcard/DCIM/con\ttab.png", 20, 1700000001, "f"))
+
+    def test_parsear_registro_find_invalido(self):
+        self.assertIsNone(ListingParser.parsear_registro_find("find: Unknown option"))
+
+    def test_parsear_fila_content_valores_con_comas(self):
+        columnas = ["_data", "_size", "mime_type"]
+        fila = ListingParser.parsear_fila_content(
+            "Row: 3 _data=/sdcard/DCIM/foto, editada.jpg, _size=2048, mime_type=NULL",
+            columnas
+        )
+        self.assertEqual(fila, {
+            "_data": "/sdcard/DCIM/foto, editada.jpg",
+            "_size": "2048",
+            "mime_type": None
+        })
+
+    def test_parsear_fila_content_sin_filas(self):
+        self.assertIsNone(ListingParser.parsear_fila_content("No result found.", ["_data"]))
+
+    def test_parsear_fila_content_sin_proyeccion(self):
+        fila = ListingParser.parsear_fila_content(
+            "Row: 3 number=+591 70000000, name=Perez, Juan, type=1, geocoded_location=NULL"
+        )
+        self.assertEqual(fila, {
+            "number": "+591 70000000",
+            "name": "Perez, Juan",
+            "type": "1",
+            "geocoded_location": None
+        })
+
+    def test_iterar_filas_content_valores_multilinea(self):
+        data = b"Row: 0 address=123, body=hola\nsegunda linea, date=1\n" \
+               b"Row: 1 address=456, body=chau, date=2\n"
+        conexion = FakeConnection(data, chunk_size=5)
+        filas = list(ListingParser.iterar_filas_content(conexion, ["address", "body", "date"]))
+        self.assertEqual([f["body"] for f in filas], ["hola\nsegunda linea", "chau"])
+        self.assertTrue(conexion.closed)
+
+    def test_iterar_filas_content_conserva_lineas_en_blanco(self):
+        data = b"Row: 0 address=123, body=hola\n\nchau\n, date=1\n" \
+               b"Row: 1 address=456, body=x, date=2\n"
+        conexion = FakeConnection(data, chunk_size=5)
+        filas = list(ListingParser.iterar_filas_content(conexion, ["address", "body", "date"]))
+        self.assertEqual([f["body"] for f in filas], ["hola\n\nchau\n", "x"])
+        self.assertEqual(filas[0]["date"], "1")
+
+    def test_parsear_fila_content_valor_con_columna_siguiente(self):
+        fila = ListingParser.parsear_fila_content(
+            "Row: 0 address=123, body=nos vemos, date=mañana, date=1700000000000, type=1",
+            ["address", "body", "date", "type"]
+        )
+        self.assertEqual(fila, {
+            "address": "123",
+            "body": "nos vemos, date=mañana",
+            "date": "1700000000000",
+            "type": "1"
+        })
+
+    def test_iterar_filas_content_error_del_proveedor(self):
+        sin_filas = FakeConnection(b"No result found.\n", chunk_size=64)
+        self.assertEqual(list(ListingParser.iterar_filas_content(sin_filas)), [])
+        error = FakeConnection(b"Error while accessing provider:call_log\n", chunk_size=64)
+        with self.assertRaises(RuntimeError):
+            list(ListingParser.iterar_filas_content(error))
+
+    def test_parsear_getprop(self):
+        salida = (
+            "[ro.product.brand]: [samsung]\n"
+            "[ro.product.model]: [SM-G991B]\n"
+            "[ro.build.fingerprint]: [samsung/o1s/o1s:13/TP1A: user]\n"
+            "[persist.sys.vacio]: []\n"
+            "linea invalida\n"
+        )
+        propiedades = ListingParser.parsear_getprop(salida)
+        self.assertEqual(propiedades["ro.product.brand"], "samsung")
+        self.assertEqual(propiedades["ro.build.fingerprint"], "samsung/o1s/o1s:13/TP1A: user")
+        self.assertEqual(propiedades["persist.sys.vacio"], "")
+        self.assertEqual(len(propiedades), 4)
+
+    def test_parsear_df(self):
+        salida = (
+            "Filesystem     1K-blocks     Used Available Use% Mounted on\n"
+            "/dev/block/dm-8 115000000 60000000  55000000  53% /data\n"
+            "/dev/fuse      115000000 60000000  55000000  53% /storage/emulated\n"
+        )
+        volumenes = ListingParser.parsear_df(salida)
+        self.assertEqual([v["montaje"] for v in volumenes], ["/data", "/storage/emulated"])
+        self.assertEqual(volumenes[0]["total_bytes"], 115000000 * 1024)
+        self.assertEqual(volumenes[0]["disponible_bytes"], 55000000 * 1024)
+
+
+if __name__ == '__main__':
+    unittest.main()
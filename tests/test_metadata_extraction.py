@@ -9,6 +9,7 @@ from PIL.ExifTags import TAGS
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from utils.metadata_extractor import MetadataExtractor
+from utils.stream_digest import DigestoEnTransito
 
 class TestMetadataExtractor(unittest.TestCase):
     def setUp(self):
@@ -44,6 +45,19 @@ class TestMetadataExtractor(unittest.TestCase):
         self.assertEqual(metadata["hash_sha256"], expected_hash)
         print(f"Hash Verified: {metadata['hash_sha256']}")
 
+    def test_hash_from_transfer(self):
+        print("\nTesting Hash Computed During Transfer...")
+        digesto = DigestoEnTransito(["md5"])
+        digesto.actualizar(self.txt_content[:5])
+        digesto.actualizar(self.txt_content[5:])
+        huella = digesto.resultado()
+        
+        metadata = MetadataExtractor.get_file_metadata(self.txt_file, huella)
+        self.assertEqual(metadata["hash_sha256"], MetadataExtractor._calculate_hash(self.txt_file))
+        self.assertEqual(metadata["hash_md5"], hashlib.md5(self.txt_content).hexdigest())
+        self.assertNotIn("cabecera", metadata)
+        self.assertEqual(huella["cabecera"], self.txt_content)
+
     def test_image_metadata_structure(self):
         print("\nTesting Image Metadata Structure...")
         metadata = MetadataExtractor.get_file_metadata(self.img_file)
@@ -0,0 +1,51 @@
+import unittest
+import os
+import sys
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from utils.scan_filters import FiltroEscaneo
+
+
+class TestFiltroEscaneo(unittest.TestCase):
+    def test_acepta_aplica_todos_los_filtros(self):
+        filtro = FiltroEscaneo(
+            [".jpg"],
+            modificado_desde=1000,
+            tamano_max=500,
+            excluir_rutas=["*/.thumbnails/*"]
+        )
+        self.assertTrue(filtro.acepta("/sdcard/DCIM/a.JPG", 100, 2000))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/a.png", 100, 2000))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/a.jpg", 501, 2000))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/a.jpg", 100, 999))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/.thumbnails/a.jpg", 100, 2000))
+        # Sin fecha conocida no se descarta por fecha
+        self.assertTrue(filtro.acepta("/sdcard/DCIM/a.jpg", 100, 0))
+
+    def test_acepta_sin_tamano_conocido(self):
+        filtro = FiltroEscaneo([".jpg"], tamano_min=1024, tamano_max=2048)
+        self.assertTrue(filtro.acepta("/sdcard/DCIM/a.jpg", None))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/a.png", None))
+        self.assertFalse(filtro.acepta("/sdcard/DCIM/a.jpg", 0))
+
+    def test_argumentos_find_redondean_hacia_afuera(self):
+        filtro = FiltroEscaneo(tamano_min=10, tamano_max=20, modificado_desde=1000)
+        filtro.ahora_dispositivo = 1000 + 90
+        argumentos = filtro.argumentos_find()
+        self.assertIn("-size +9c", argumentos)
+        self.assertIn("-size -21c", argumentos)
+        self.assertIn("-mmin -3", argumentos)
+
+    def test_condicion_sql(self):
+        filtro = FiltroEscaneo(tamano_min=10, incluir_rutas=["*/O'Brien/*"])
+        self.assertEqual(filtro.condicion_sql(), "_size >= 10 AND (_data GLOB '*/O''Brien/*')")
+
+    def test_desde_dict_rechaza_filtros_desconocidos(self):
+        with self.assertRaises(ValueError):
+            FiltroEscaneo.desde_dict(None, {"tamano": 10})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,216 @@
+import unittest
+import hashlib
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import threading
+import time
+
+# Add backend directory to path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.transfer_service import MotorDescarga, DescargaTar
+
+
+class FakeSync:
+    """Entrega el contenido de cada ruta y registra cuántas lecturas hubo a la vez"""
+    def __init__(self, archivos, fallar_en=(), espera=0.0):
+        self.archivos = archivos
+        self.fallar_en = set(fallar_en)
+        self.espera = espera
+        self.lock = threading.Lock()
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self.subidos = {}
+
+    def iter_content(self, ruta):
+        with self.lock:
+            self.simultaneas += 1
+            self.max_simultaneas = max(self.max_simultaneas, self.simultaneas)
+        try:
+            time.sleep(self.espera)
+            contenido = self.archivos[ruta]
+            yield contenido[:3]
+            if ruta in self.fallar_en:
+                raise OSError("USB desconectado")
+            yield contenido[3:]
+        finally:
+            with self.lock:
+                self.simultaneas -= 1
+
+    def push(self, origen, ruta):
+        self.subidos[ruta] = origen.read()
+
+
+class FakeConn:
+    def __init__(self, datos):
+        self.datos = datos
+
+    def makefile(self, modo):
+        return io.BytesIO(self.datos)
+
+
+class FakeTransport:
+    def __init__(self, datos):
+        self.conn = FakeConn(datos)
+        self.comando = None
+
+    def send_command(self, cmd):
+        self.comando = cmd
+
+    def check_okay(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeDevice:
+    """Dispositivo con archivos en memoria; exec-out tar devuelve `tar` tal cual"""
+    serial = "SERIAL1"
+
+    def __init__(self, archivos, fallar_en=(), espera=0.0, tar=b""):
+        self.sync = FakeSync(archivos, fallar_en, espera)
+        self.tar = tar
+        self.comandos = []
+
+    def open_transport(self):
+        return FakeTransport(self.tar)
+
+    def shell(self, cmd):
+        self.comandos.append(cmd)
+        return ""
+
+
+def generar_tar(archivos):
+    salida = io.BytesIO()
+    with tarfile.open(fileobj=salida, mode="w") as tar:
+        for ruta, contenido in archivos.items():
+            miembro = tarfile.TarInfo(ruta.lstrip("/"))
+            miembro.size = len(contenido)
+            tar.addfile(miembro, io.BytesIO(contenido))
+    return salida.getvalue()
+
+
+class TestMotorDescarga(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.archivos = {f"/sdcard/DCIM/foto{i}.jpg": bytes([i]) * (10 + i) for i in range(12)}
+
+    def tareas(self):
+        return [(ruta, os.path.join(self.carpeta, os.path.basename(ruta)), ruta) for ruta in self.archivos]
+
+    def test_descarga_y_errores(self):
+        fallida = "/sdcard/DCIM/foto3.jpg"
+        motor = MotorDescarga(FakeDevice(self.archivos, fallar_en=[fallida]), max_conexiones=3)
+        terminados = {}
+        estadisticas = motor.descargar(self.tareas(), lambda ruta, resultado: terminados.update({ruta: resultado}))
+
+        self.assertEqual(estadisticas["archivos_descargados"], 11)
+        self.assertEqual(estadisticas["archivos_fallidos"], 1)
+        self.assertEqual(
+            estadisticas["bytes_descargados"],
+            sum(len(c) for ruta, c in self.archivos.items() if ruta != fallida)
+        )
+        self.assertEqual(terminados[fallida]["error"], "USB desconectado")
+        self.assertFalse(os.path.exists(terminados[fallida]["destino"]))
+        correcto = terminados["/sdcard/DCIM/foto5.jpg"]
+        self.assertIsNone(correcto["error"])
+        self.assertEqual(correcto["huella"]["hash_sha256"],
+                         hashlib.sha256(self.archivos["/sdcard/DCIM/foto5.jpg"]).hexdigest())
+
+    def test_cupo_limita_las_conexiones(self):
+        device = FakeDevice(self.archivos, espera=0.01)
+        motor = MotorDescarga(device, max_conexiones=4, conexiones_iniciales=4, cupo=lambda: 1)
+        motor.descargar(self.tareas())
+        self.assertEqual(device.sync.max_simultaneas, 1)
+
+    def test_ajuste_sube_mientras_mejora(self):
+        motor = MotorDescarga(FakeDevice({}), max_conexiones=4, conexiones_iniciales=2)
+        direccion = motor._ajustar(1, ("bytes", 100), None)
+        self.assertEqual(motor.conexiones, 3)
+        direccion = motor._ajustar(direccion, ("bytes", 120), ("bytes", 100))
+        self.assertEqual(motor.conexiones, 4)
+        # Una caída mayor a la tolerancia invierte la dirección
+        direccion = motor._ajustar(direccion, ("bytes", 80), ("bytes", 120))
+        self.assertEqual((motor.conexiones, direccion), (3, -1))
+
+    def test_ajuste_se_queda_en_el_limite_mientras_no_caiga(self):
+        motor = MotorDescarga(FakeDevice({}), max_conexiones=4, conexiones_iniciales=4)
+        direccion = 1
+        tasa_anterior = ("archivos", 50)
+        for tasa in (52, 55, 54, 58):
+            direccion = motor._ajustar(direccion, ("archivos", tasa), tasa_anterior)
+            tasa_anterior = ("archivos", tasa)
+            self.assertEqual(motor.conexiones, 4)
+        motor._ajustar(direccion, ("archivos", 40), tasa_anterior)
+        self.assertEqual(motor.conexiones, 3)
+
+    def test_historial_registra_las_conexiones_permitidas(self):
+        motor = MotorDescarga(FakeDevice(self.archivos), max_conexiones=4, conexiones_iniciales=4,
+                              ventana=2, cupo=lambda: 2)
+        estadisticas = motor.descargar(self.tareas())
+        self.assertTrue(estadisticas["historial_concurrencia"])
+        self.assertTrue(all(h["conexiones"] <= 2 for h in estadisticas["historial_concurrencia"]))
+        self.assertEqual(estadisticas["conexiones_max_usadas"], 2)
+
+    def test_historial_por_ventana(self):
+        motor = MotorDescarga(FakeDevice(self.archivos), max_conexiones=4, ventana=4)
+        estadisticas = motor.descargar(self.tareas())
+        # Una entrada por ventana de al menos 4 archivos
+        self.assertIn(len(estadisticas["historial_concurrencia"]), (1, 2, 3))
+        self.assertLessEqual(estadisticas["conexiones_max_usadas"], 4)
+
+
+class TestDescargaTar(unittest.TestCase):
+
+    def setUp(self):
+        self.carpeta = tempfile.mkdtemp()
+        self.archivos = {
+            "/sdcard/Documents/a.txt": b"primero",
+            "/sdcard/Documents/b.txt": b"segundo archivo",
+        }
+
+    def reservar(self, ruta):
+        return os.path.join(self.carpeta, os.path.basename(ruta))
+
+    def test_desempaqueta_y_reporta_faltantes(self):
+        device = FakeDevice({}, tar=generar_tar(self.archivos))
+        faltante = "/sdcard/Documents/sin_permiso.txt"
+        recibidos = {}
+
+        estadisticas, no_recibidas = DescargaTar(device).descargar(
+            list(self.archivos) + [faltante], self.reservar,
+            lambda ruta, resultado: recibidos.update({ruta: resultado})
+        )
+
+        self.assertEqual(estadisticas["archivos_descargados"], 2)
+        self.assertEqual(no_recibidas, [faltante])
+        for ruta, contenido in self.archivos.items():
+            with open(recibidos[ruta]["destino"], "rb") as f:
+                self.assertEqual(f.read(), contenido)
+            self.assertEqual(recibidos[ruta]["huella"]["hash_sha256"], hashlib.sha256(contenido).hexdigest())
+        self.assertIn(b"sdcard/Documents/a.txt\n", device.sync.subidos[DescargaTar.RUTA_LISTA])
+        self.assertTrue(any(cmd.startswith("rm -f") for cmd in device.comandos))
+
+    def test_detener_corta_el_stream(self):
+        device = FakeDevice({}, tar=generar_tar(self.archivos))
+        estadisticas, no_recibidas = DescargaTar(device).descargar(
+            list(self.archivos), self.reservar, detener=lambda: True
+        )
+        self.assertEqual(estadisticas["archivos_descargados"], 0)
+        self.assertEqual(no_recibidas, list(self.archivos))
+
+    def test_stream_truncado(self):
+        tar = generar_tar(self.archivos)
+        device = FakeDevice({}, tar=tar[:700])
+        estadisticas, no_recibidas = DescargaTar(device).descargar(list(self.archivos), self.reservar)
+        self.assertEqual(estadisticas["archivos_descargados"], 1)
+        self.assertEqual(no_recibidas, ["/sdcard/Documents/b.txt"])
+
+
+if __name__ == '__main__':
+    unittest.main()
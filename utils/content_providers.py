@@ -0,0 +1,153 @@
+from datetime import datetime, timezone, timedelta
+
+
+class ProveedoresContenido:
+    """
+    Definición declarativa de los content providers que se extraen.
+
+    Cada proveedor indica su URI, el orden de la consulta y cómo se mapean
+    sus columnas a los campos de su tabla: `campos` asocia cada campo a
+    (columna del proveedor, conversión), donde la conversión es el nombre de
+    un conversor o un diccionario de valores. Las columnas listadas en
+    `extra` se proyectan también y, junto con cualquier otra columna sin
+    campo propio, van al JSONB `columna_metadata`.
+    """
+
+    # Zona horaria en la que se guardan las fechas (la misma que el registro de llamadas)
+    ZONA_HORARIA = timezone(timedelta(hours=-4))
+
+    TIPOS_SMS = {
+        '1': 'recibido', '2': 'enviado', '3': 'borrador',
+        '4': 'bandeja_salida', '5': 'fallido', '6': 'en_cola'
+    }
+
+    TIPOS_MMS = {'1': 'recibido', '2': 'enviado', '3': 'borrador', '4': 'bandeja_salida'}
+
+    TIPOS_DATO_CONTACTO = {
+        'vnd.android.cursor.item/phone_v2': 'telefono',
+        'vnd.android.cursor.item/email_v2': 'email',
+        'vnd.android.cursor.item/postal-address_v2': 'direccion',
+        'vnd.android.cursor.item/organization': 'organizacion',
+        'vnd.android.cursor.item/name': 'nombre',
+        'vnd.android.cursor.item/nickname': 'apodo',
+        'vnd.android.cursor.item/note': 'nota',
+        'vnd.android.cursor.item/im': 'mensajeria',
+        'vnd.android.cursor.item/website': 'sitio_web',
+        'vnd.android.cursor.item/contact_event': 'evento',
+        'vnd.android.cursor.item/group_membership': 'grupo'
+    }
+
+    PROVEEDORES = {
+        "sms": {
+            "uri": "content://sms",
+            "orden": "date ASC",
+            "campos": {
+                "id_dispositivo": ("_id", "entero"),
+                "hilo_id": ("thread_id", "entero"),
+                "direccion": ("address", "texto"),
+                "asunto": ("subject", "texto"),
+                "cuerpo": ("body", "texto"),
+                "fecha": ("date", "fecha_ms"),
+                "tipo": ("type", TIPOS_SMS),
+                "leido": ("read", "booleano")
+            },
+            "fijos": {"tipo_mensaje": "sms"},
+            "extra": ["date_sent", "status", "seen", "service_center", "person"],
+            "columna_metadata": "metadata_mensaje"
+        },
+        "mms": {
+            "uri": "content://mms",
+            "orden": "date ASC",
+            "campos": {
+                "id_dispositivo": ("_id", "entero"),
+                "hilo_id": ("thread_id", "entero"),
+                "asunto": ("sub", "texto"),
+                "fecha": ("date", "fecha_s"),
+                "tipo": ("msg_box", TIPOS_MMS),
+                "leido": ("read", "booleano")
+            },
+            "fijos": {"tipo_mensaje": "mms"},
+            "extra": ["date_sent", "m_type", "ct_t", "seen"],
+            "columna_metadata": "metadata_mensaje"
+        },
+        "contactos": {
+            "uri": "content://com.android.contacts/data",
+            "orden": "contact_id ASC",
+            "campos": {
+                "contacto_id": ("contact_id", "entero"),
+                "nombre": ("display_name", "texto"),
+                "tipo_dato": ("mimetype", TIPOS_DATO_CONTACTO),
+                "valor": ("data1", "texto")
+            },
+            "extra": ["raw_contact_id", "data2", "data3", "account_type", "account_name"],
+            "columna_metadata": "metadata_contacto"
+        },
+        "calendario": {
+            "uri": "content://com.android.calendar/events",
+            "orden": "dtstart ASC",
+            "campos": {
+                "id_dispositivo": ("_id", "entero"),
+                "titulo": ("title", "texto"),
+                "descripcion": ("description", "texto"),
+                "ubicacion": ("eventLocation", "texto"),
+                "inicio": ("dtstart", "fecha_ms"),
+                "fin": ("dtend", "fecha_ms"),
+                "todo_el_dia": ("allDay", "booleano"),
+                "organizador": ("organizer", "texto")
+            },
+            "extra": ["calendar_id", "rrule", "duration", "eventTimezone", "deleted"],
+            "columna_metadata": "metadata_evento"
+        }
+    }
+
+    @classmethod
+    def columnas(cls, nombre):
+        """Columnas a proyectar en la consulta del proveedor"""
+        definicion = cls.PROVEEDORES[nombre]
+        columnas = [columna for columna, _ in definicion["campos"].values()]
+        return list(dict.fromkeys(columnas + definicion.get("extra", [])))
+
+    @classmethod
+    def mapear(cls, nombre, fila):
+        """
+        Convertir una fila del proveedor en los campos de su tabla
+
+        Returns:
+            Diccionario listo para insertar (sin evaluacion_id)
+        """
+        definicion = cls.PROVEEDORES[nombre]
+        registro = dict(definicion.get("fijos", {}))
+        usadas = set()
+        for campo, (columna, conversion) in definicion["campos"].items():
+            valor = fila.get(columna)
+            usadas.add(columna)
+            if isinstance(conversion, dict):
+                registro[campo] = conversion.get(valor, valor) if valor is not None else None
+            else:
+                registro[campo] = cls._convertir(valor, conversion)
+        registro[definicion["columna_metadata"]] = {
+            columna: valor for columna, valor in fila.items() if columna not in usadas and valor is not None
+        }
+        return registro
+
+    @classmethod
+    def _convertir(cls, valor, conversion):
+        if valor is None or valor == "":
+            return None
+        try:
+            if conversion == "entero":
+                return int(valor)
+            if conversion == "booleano":
+                return valor.strip() not in ("0", "false")
+            if conversion == "fecha_ms":
+                return cls._fecha(int(valor) / 1000.0)
+            if conversion == "fecha_s":
+                return cls._fecha(int(valor))
+        except (ValueError, OverflowError, OSError):
+            return None
+        return valor
+
+    @classmethod
+    def _fecha(cls, epoch):
+        # Sin tz para la BD, igual que las llamadas
+        return datetime.fromtimestamp(epoch, tz=timezone.utc).astimezone(cls.ZONA_HORARIA).replace(tzinfo=None)
@@ -0,0 +1,88 @@
+import hashlib
+import os
+import shutil
+import uuid
+
+
+class AlmacenContenido:
+    """
+    Almacén de archivos direccionado por contenido.
+
+    Cada archivo se guarda una sola vez, con su SHA-256 como nombre, en
+    subcarpetas por los primeros caracteres del hash (ab/cd/abcd...), así
+    ninguna carpeta acumula cientos de miles de entradas. Un archivo idéntico
+    que llega de nuevo (otra evaluación, otro teléfono) se descarta en lugar
+    de escribirse otra vez. Los archivos se descargan primero a .entrantes/,
+    en el mismo disco, para que ingresarlos sea un rename y no una copia.
+    """
+
+    CARPETA_ENTRANTES = ".entrantes"
+
+    def __init__(self, carpeta):
+        self.carpeta = os.path.abspath(carpeta)
+
+    def ruta_blob(self, sha256):
+        sha256 = sha256.lower()
+        if len(sha256) != 64 or any(c not in "0123456789abcdef" for c in sha256):
+            raise ValueError(f"SHA-256 no válido: {sha256}")
+        return os.path.join(self.carpeta, sha256[:2], sha256[2:4], sha256)
+
+    def contiene(self, ruta):
+        """True si la ruta es un archivo del almacén"""
+        nombre = os.path.basename(ruta)
+        try:
+            return os.path.abspath(ruta) == self.ruta_blob(nombre)
+        except ValueError:
+            return False
+
+    def ruta_entrante(self):
+        """Ruta única donde descargar un archivo antes de ingresarlo"""
+        carpeta = os.path.join(self.carpeta, self.CARPETA_ENTRANTES)
+        os.makedirs(carpeta, exist_ok=True)
+        return os.path.join(carpeta, uuid.uuid4().hex)
+
+    def ingresar(self, ruta_archivo, sha256=None):
+        """
+        Mover un archivo al almacén
+
+        Args:
+            ruta_archivo: Archivo local (se mueve o, si ya estaba en el almacén, se elimina)
+            sha256: Hash ya calculado (None = se lee el archivo para calcularlo)
+
+        Returns:
+            Tupla (ruta del archivo en el almacén, True si era contenido nuevo)
+        """
+        if self.contiene(ruta_archivo):
+            return os.path.abspath(ruta_archivo), False
+        sha256 = sha256 or self.calcular_sha256(ruta_archivo)
+        destino = self.ruta_blob(sha256)
+        if os.path.exists(destino):
+            os.remove(ruta_archivo)
+            return destino, False
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        try:
+            # Reemplazo atómico: si otro hilo ingresó el mismo contenido, el resultado es igual
+            os.replace(ruta_archivo, destino)
+        except OSError:
+            # Otro disco: copiar a un temporal junto al destino y renombrar
+            temporal = f"{destino}.{uuid.uuid4().hex}.tmp"
+            shutil.copyfile(ruta_archivo, temporal)
+            os.replace(temporal, destino)
+            os.remove(ruta_archivo)
+        return destino, True
+
+    def eliminar(self, sha256):
+        """Eliminar un archivo del almacén (cuando ya no tiene referencias)"""
+        try:
+            os.remove(self.ruta_blob(sha256))
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def calcular_sha256(ruta_archivo, tamano_bloque=1024 * 1024):
+        digesto = hashlib.sha256()
+        with open(ruta_archivo, "rb") as f:
+            for bloque in iter(lambda: f.read(tamano_bloque), b""):
+                digesto.update(bloque)
+        return digesto.hexdigest()
@@ -0,0 +1,95 @@
+import json
+import os
+import re
+
+
+class ManifiestoDispositivo:
+    """
+    Manifiesto persistente de los archivos ya descargados de un dispositivo
+
+    Se guarda un archivo JSON Lines por serial con la ruta en el dispositivo,
+    el tamaño, el mtime y la ruta local de cada archivo descargado. Cada
+    descarga terminada se agrega en el momento, así el manifiesto sirve
+    también de punto de control: si la extracción se corta, la siguiente
+    retoma desde el último archivo registrado.
+    """
+
+    # Líneas reemplazadas toleradas antes de reescribir el archivo al cargarlo
+    MAX_LINEAS_OBSOLETAS = 10000
+
+    def __init__(self, carpeta, serial):
+        """
+        Args:
+            carpeta: Carpeta donde se guardan los manifiestos
+            serial: Serial del dispositivo
+        """
+        os.makedirs(carpeta, exist_ok=True)
+        nombre = re.sub(r"[^A-Za-z0-9._-]", "_", serial or "desconocido")
+        self.ruta = os.path.join(carpeta, f"{nombre}.jsonl")
+        self.entradas = {}
+        self._archivo = None
+        self._cargar()
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        lineas = 0
+        truncado = False
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                truncado = not linea.endswith("\n")
+                try:
+                    entrada = json.loads(linea)
+                except ValueError:
+                    # Última línea incompleta de una ejecución interrumpida
+                    continue
+                lineas += 1
+                self.entradas[entrada["ruta"]] = entrada
+        # Reescribir si quedó una línea a medias (lo siguiente se agregaría pegado a ella)
+        if truncado or lineas - len(self.entradas) > self.MAX_LINEAS_OBSOLETAS:
+            self.compactar()
+
+    def sin_cambios(self, ruta, tamano, mtime):
+        """
+        Ruta local de un archivo ya descargado que no cambió en el dispositivo
+
+        Returns:
+            La ruta local si el tamaño y el mtime coinciden con lo registrado y la
+            copia local sigue completa; None si hay que descargarlo. Sin mtime
+            conocido (0) no se puede asegurar que no cambió.
+        """
+        entrada = self.entradas.get(ruta)
+        if not entrada or not mtime:
+            return None
+        if entrada["tamano"] != tamano or entrada["mtime"] != mtime:
+            return None
+        ruta_local = entrada["ruta_local"]
+        try:
+            if os.path.getsize(ruta_local) != tamano:
+                return None
+        except OSError:
+            return None
+        return ruta_local
+
+    def registrar(self, ruta, tamano, mtime, ruta_local):
+        """Registrar un archivo descargado (se escribe de inmediato)"""
+        entrada = {"ruta": ruta, "tamano": tamano, "mtime": mtime, "ruta_local": os.path.abspath(ruta_local)}
+        self.entradas[ruta] = entrada
+        if self._archivo is None:
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        self._archivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        self._archivo.flush()
+
+    def compactar(self):
+        """Reescribir el manifiesto con una sola línea por archivo"""
+        self.cerrar()
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            for entrada in self.entradas.values():
+                f.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        os.replace(temporal, self.ruta)
+
+    def cerrar(self):
+        if self._archivo is not None:
+            self._archivo.close()
+            self._archivo = None
@@ -0,0 +1,72 @@
+import struct
+
+
+class MiniaturaExif:
+    """
+    Lectura de la miniatura JPEG que las cámaras incrustan en el bloque EXIF
+    (IFD1) de las fotos. Está al inicio del archivo, así basta con leer sus
+    primeros KB para obtener una vista previa sin descargar la foto completa.
+    """
+
+    # Etiquetas de IFD1 con el desplazamiento y el largo de la miniatura
+    _ETIQUETA_INICIO = 0x0201
+    _ETIQUETA_LARGO = 0x0202
+
+    @staticmethod
+    def extraer(datos):
+        """
+        Buscar la miniatura EXIF en los bytes iniciales de un JPEG
+
+        Args:
+            datos: Bytes iniciales del archivo (pueden estar truncados)
+
+        Returns:
+            Bytes de la miniatura JPEG o None si no tiene o no está completa en datos
+        """
+        if not datos or not datos.startswith(b"\xff\xd8"):
+            return None
+
+        posicion = 2
+        while posicion + 4 <= len(datos):
+            if datos[posicion] != 0xFF:
+                return None
+            marcador = datos[posicion + 1]
+            # Inicio de la imagen comprimida: ya no hay más segmentos de metadatos
+            if marcador == 0xDA:
+                return None
+            largo = struct.unpack(">H", datos[posicion + 2:posicion + 4])[0]
+            if marcador == 0xE1 and datos[posicion + 4:posicion + 10] == b"Exif\x00\x00":
+                return MiniaturaExif._desde_tiff(datos[posicion + 10:posicion + 2 + largo])
+            posicion += 2 + largo
+        return None
+
+    @staticmethod
+    def _desde_tiff(tiff):
+        if len(tiff) < 8 or tiff[:2] not in (b"II", b"MM"):
+            return None
+        orden = "<" if tiff[:2] == b"II" else ">"
+        try:
+            ifd0 = struct.unpack(orden + "I", tiff[4:8])[0]
+            entradas = struct.unpack(orden + "H", tiff[ifd0:ifd0 + 2])[0]
+            siguiente = ifd0 + 2 + entradas * 12
+            ifd1 = struct.unpack(orden + "I", tiff[siguiente:siguiente + 4])[0]
+            if not ifd1:
+                return None
+
+            valores = {}
+            entradas = struct.unpack(orden + "H", tiff[ifd1:ifd1 + 2])[0]
+            for i in range(entradas):
+                entrada = tiff[ifd1 + 2 + i * 12:ifd1 + 14 + i * 12]
+                etiqueta, tipo, _ = struct.unpack(orden + "HHI", entrada[:8])
+                # SHORT (3) o LONG (4), con el valor dentro de la entrada
+                formato = "H" if tipo == 3 else "I"
+                valores[etiqueta] = struct.unpack(orden + formato, entrada[8:8 + struct.calcsize(formato)])[0]
+        except struct.error:
+            return None
+
+        inicio = valores.get(MiniaturaExif._ETIQUETA_INICIO)
+        largo = valores.get(MiniaturaExif._ETIQUETA_LARGO)
+        if not inicio or not largo or inicio + largo > len(tiff):
+            return None
+        miniatura = tiff[inicio:inicio + largo]
+        return miniatura if miniatura.startswith(b"\xff\xd8") else None
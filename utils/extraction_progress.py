@@ -0,0 +1,111 @@
+import threading
+import time
+
+
+class ExtraccionCancelada(Exception):
+    """La extracción se detuvo porque se pidió cancelarla"""
+
+
+class ProgresoExtraccion:
+    """
+    Contadores de avance de una extracción, compartidos entre el hilo que la
+    ejecuta y quien la consulta (estado de un trabajo, stream de eventos).
+
+    También lleva el pedido de cancelación: el extractor lo revisa entre
+    archivos y deja de iniciar descargas; las que están en curso terminan.
+    """
+
+    CONTADORES = [
+        "archivos_escaneados", "archivos_planificados", "bytes_planificados",
+        "archivos_descargados", "bytes_descargados", "archivos_fallidos",
+        "metadatos_procesados", "backups_encontrados"
+    ]
+
+    # Últimos errores que se conservan para informar
+    MAX_ERRORES = 20
+
+    def __init__(self):
+        self._condicion = threading.Condition()
+        self._cancelado = threading.Event()
+        self.contadores = dict.fromkeys(self.CONTADORES, 0)
+        self.etapa = "pendiente"
+        self.errores = []
+        self.inicio_descarga = None
+        self.version = 0
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set()
+
+    def cancelar(self):
+        self._cancelado.set()
+        with self._condicion:
+            self.version += 1
+            self._condicion.notify_all()
+
+    def verificar_cancelacion(self):
+        """Lanzar ExtraccionCancelada si se pidió cancelar"""
+        if self.cancelado:
+            raise ExtraccionCancelada("Extracción cancelada")
+
+    def cambiar_etapa(self, etapa):
+        with self._condicion:
+            self.etapa = etapa
+            if etapa == "descarga" and self.inicio_descarga is None:
+                self.inicio_descarga = time.perf_counter()
+            self.version += 1
+            self._condicion.notify_all()
+
+    def sumar(self, **incrementos):
+        with self._condicion:
+            for clave, valor in incrementos.items():
+                self.contadores[clave] += valor
+            self.version += 1
+            self._condicion.notify_all()
+
+    def fijar(self, **valores):
+        with self._condicion:
+            self.contadores.update(valores)
+            self.version += 1
+            self._condicion.notify_all()
+
+    def registrar_error(self, ruta, error):
+        with self._condicion:
+            self.contadores["archivos_fallidos"] += 1
+            self.errores = (self.errores + [{"ruta": ruta, "error": error}])[-self.MAX_ERRORES:]
+            self.version += 1
+            self._condicion.notify_all()
+
+    def esperar_cambio(self, version, espera=None):
+        """
+        Esperar a que el progreso cambie respecto de la versión dada
+
+        Args:
+            version: Última versión conocida por quien espera
+            espera: Segundos máximos de espera (None = sin límite)
+
+        Returns:
+            Versión actual (igual a la recibida si venció la espera sin cambios)
+        """
+        with self._condicion:
+            self._condicion.wait_for(lambda: self.version != version, espera)
+            return self.version
+
+    def instantanea(self):
+        """Estado actual, con bytes/s de la descarga y tiempo restante estimado"""
+        with self._condicion:
+            datos = dict(self.contadores)
+            datos["etapa"] = self.etapa
+            datos["cancelado"] = self.cancelado
+            datos["errores"] = list(self.errores)
+            datos["version"] = self.version
+            inicio = self.inicio_descarga
+        datos["bytes_por_segundo"] = 0
+        datos["eta_segundos"] = None
+        if inicio is not None:
+            segundos = max(time.perf_counter() - inicio, 1e-6)
+            datos["bytes_por_segundo"] = round(datos["bytes_descargados"] / segundos)
+            restantes = max(datos["bytes_planificados"] - datos["bytes_descargados"], 0)
+            if datos["bytes_por_segundo"] > 0:
+                datos["eta_segundos"] = round(restantes / datos["bytes_por_segundo"])
+        return datos
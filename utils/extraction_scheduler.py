@@ -0,0 +1,163 @@
+import math
+import time
+from utils.file_classifier import ClasificadorArchivos
+
+
+class PlanificadorExtraccion:
+    """
+    Orden y presupuesto de la descarga de una extracción.
+
+    Los archivos se ordenan según una política de prioridad y se descargan
+    mientras alcance el presupuesto de bytes y de tiempo. Lo que no entra
+    queda marcado como diferido (item.diferido = motivo) para informarlo,
+    así una sesión acotada en tiempo captura primero lo más valioso.
+
+    El presupuesto de tiempo corre desde iniciar() y abarca también el
+    escaneo: quien escanea consulta agotado() entre archivos encontrados y
+    corta el listado (marcar_escaneo_interrumpido) si se venció.
+    """
+
+    # "listado": orden del escaneo; "categorias": por orden de categoría (y dentro
+    # de cada una, los más pequeños primero); "menor_primero"; "reciente_primero"
+    POLITICAS = ["listado", "categorias", "menor_primero", "reciente_primero"]
+
+    # Orden de categorías por defecto de la política "categorias"
+    ORDEN_CATEGORIAS = ["whatsapp_backup", "documentos", "imagenes", "audio", "videos", "otros"]
+
+    # Máximo de archivos diferidos que se listan en el resumen
+    MAX_DIFERIDOS_LISTADOS = 500
+
+    def __init__(self, politica="listado", orden_categorias=None, presupuesto_bytes=None, presupuesto_segundos=None,
+                 cancelado=None):
+        """
+        Args:
+            politica: Una de POLITICAS
+            orden_categorias: Orden de la política "categorias" (None = ORDEN_CATEGORIAS);
+                las categorías no nombradas van al final
+            presupuesto_bytes: Máximo de bytes a descargar (None = sin límite)
+            presupuesto_segundos: Tiempo máximo de la extracción desde iniciar() (None = sin límite)
+            cancelado: Función sin argumentos que devuelve True si se pidió cancelar;
+                desde ese momento no se entregan más archivos
+        """
+        self.validar(politica, presupuesto_bytes, presupuesto_segundos)
+        self.politica = politica
+        self.orden_categorias = list(orden_categorias or self.ORDEN_CATEGORIAS)
+        self.presupuesto_bytes = presupuesto_bytes
+        self.presupuesto_segundos = presupuesto_segundos
+        self.cancelado = cancelado or (lambda: False)
+        self.limite = None
+        self.bytes_planificados = 0
+        self.diferidos = []
+        self.escaneo_interrumpido = False
+
+    @classmethod
+    def validar(cls, politica="listado", presupuesto_bytes=None, presupuesto_segundos=None):
+        """
+        Verificar la política y los presupuestos (tal como llegan en la petición)
+
+        Raises:
+            ValueError: Si la política no existe o un presupuesto no es un número válido
+        """
+        if politica not in cls.POLITICAS:
+            raise ValueError(f"Política de prioridad no válida: {politica}")
+        for nombre, valor in (("presupuesto_bytes", presupuesto_bytes), ("presupuesto_segundos", presupuesto_segundos)):
+            if valor is None:
+                continue
+            if isinstance(valor, bool) or not isinstance(valor, (int, float)) or not math.isfinite(valor):
+                raise ValueError(f"{nombre} debe ser un número")
+        if presupuesto_bytes is not None and presupuesto_bytes < 0:
+            raise ValueError("presupuesto_bytes debe ser mayor o igual a 0")
+        if presupuesto_segundos is not None and presupuesto_segundos <= 0:
+            raise ValueError("presupuesto_segundos debe ser mayor a 0")
+
+    def iniciar(self):
+        """Empezar a contar el presupuesto de tiempo"""
+        if self.presupuesto_segundos is not None:
+            self.limite = time.monotonic() + self.presupuesto_segundos
+
+    def agotado(self):
+        """True si ya se consumió el presupuesto de tiempo"""
+        return self.limite is not None and time.monotonic() >= self.limite
+
+    def marcar_escaneo_interrumpido(self):
+        """Registrar que el escaneo se cortó al vencer el tiempo (hubo archivos sin listar)"""
+        self.escaneo_interrumpido = True
+
+    def debe_detenerse(self):
+        """True si no se deben iniciar más descargas (tiempo agotado o cancelación)"""
+        return self.cancelado() or self.agotado()
+
+    def ordenar(self, items):
+        """Ordenar los archivos según la política (orden estable)"""
+        if self.politica == "menor_primero":
+            return sorted(items, key=lambda item: item.tamano)
+        if self.politica == "reciente_primero":
+            return sorted(items, key=lambda item: item.mtime, reverse=True)
+        if self.politica == "categorias":
+            posicion = {categoria: i for i, categoria in enumerate(self.orden_categorias)}
+            return sorted(items, key=lambda item: (
+                posicion.get(ClasificadorArchivos.categoria(item.ruta), len(posicion)), item.tamano
+            ))
+        return list(items)
+
+    def seleccionar(self, items):
+        """
+        Ordenar y aplicar el presupuesto de bytes. Un archivo que no entra se
+        difiere, pero se siguen probando los siguientes (más pequeños pueden entrar).
+
+        Returns:
+            Lista de archivos a descargar, en orden de prioridad
+        """
+        seleccionados = []
+        for item in self.ordenar(items):
+            if self.presupuesto_bytes is not None and self.bytes_planificados + item.tamano > self.presupuesto_bytes:
+                self._diferir(item, "presupuesto_bytes")
+                continue
+            self.bytes_planificados += item.tamano
+            seleccionados.append(item)
+        return seleccionados
+
+    def mientras_haya_tiempo(self, items):
+        """
+        Entregar los archivos hasta que se agote el presupuesto de tiempo o se
+        cancele; los restantes se difieren. Las descargas ya iniciadas terminan
+        normalmente.
+        """
+        items = list(items)
+        for i, item in enumerate(items):
+            if self.debe_detenerse():
+                motivo = "cancelado" if self.cancelado() else "presupuesto_tiempo"
+                for restante in items[i:]:
+                    self._diferir(restante, motivo)
+                return
+            yield item
+
+    def _diferir(self, item, motivo):
+        item.diferido = motivo
+        self.diferidos.append(item)
+
+    def resumen(self):
+        """Resumen del plan y de lo diferido, para la respuesta de la extracción"""
+        por_motivo = {}
+        por_categoria = {}
+        for item in self.diferidos:
+            por_motivo[item.diferido] = por_motivo.get(item.diferido, 0) + 1
+            categoria = ClasificadorArchivos.categoria(item.ruta) or "otros"
+            por_categoria[categoria] = por_categoria.get(categoria, 0) + 1
+        return {
+            "politica": self.politica,
+            "presupuesto_bytes": self.presupuesto_bytes,
+            "presupuesto_segundos": self.presupuesto_segundos,
+            "tiempo_agotado": self.agotado(),
+            "escaneo_interrumpido": self.escaneo_interrumpido,
+            "diferidos": {
+                "total": len(self.diferidos),
+                "bytes": sum(item.tamano for item in self.diferidos),
+                "por_motivo": por_motivo,
+                "por_categoria": por_categoria,
+                "archivos": [
+                    {"ruta": item.ruta, "tamano": item.tamano, "motivo": item.diferido}
+                    for item in self.diferidos[:self.MAX_DIFERIDOS_LISTADOS]
+                ]
+            }
+        }
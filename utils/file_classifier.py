@@ -0,0 +1,187 @@
+import mimetypes
+
+
+class ClasificadorArchivos:
+    """
+    Registro único de clasificación de archivos (categoría y tipo MIME)
+
+    Lo usan el escaneo, el resumen por categoría, la detección de backups de
+    WhatsApp y MetadataExtractor. La búsqueda por extensión es un acceso a un
+    diccionario precompilado; opcionalmente se puede verificar el contenido
+    por sus bytes iniciales cuando la extensión no es confiable.
+    """
+
+    # Extensiones por categoría
+    EXTENSIONES = {
+        "imagenes": [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".webp", ".heic"],
+        "videos": [".mp4", ".avi", ".mkv", ".mov", ".wmv", ".flv", ".3gp"],
+        "audio": [".mp3", ".wav", ".flac", ".aac", ".ogg", ".m4a", ".wma"],
+        "documentos": [".pdf", ".doc", ".docx", ".txt", ".xls", ".xlsx", ".ppt", ".pptx"],
+        "otros": [".zip", ".rar", ".apk", ".json", ".xml"],
+        "whatsapp_backup": [".db", ".crypt12", ".crypt14", ".crypt15", ".key"]
+    }
+
+    # Tipos MIME de las extensiones registradas (el resto se resuelve con mimetypes)
+    MIME_POR_EXTENSION = {
+        ".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".gif": "image/gif",
+        ".bmp": "image/bmp", ".webp": "image/webp", ".heic": "image/heic",
+        ".mp4": "video/mp4", ".avi": "video/x-msvideo", ".mkv": "video/x-matroska",
+        ".mov": "video/quicktime", ".wmv": "video/x-ms-wmv", ".flv": "video/x-flv", ".3gp": "video/3gpp",
+        ".mp3": "audio/mpeg", ".wav": "audio/wav", ".flac": "audio/flac", ".aac": "audio/aac",
+        ".ogg": "audio/ogg", ".m4a": "audio/mp4", ".wma": "audio/x-ms-wma",
+        ".pdf": "application/pdf", ".doc": "application/msword",
+        ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        ".txt": "text/plain", ".xls": "application/vnd.ms-excel",
+        ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        ".ppt": "application/vnd.ms-powerpoint",
+        ".pptx": "application/vnd.openxmlformats-officedocument.presentationml.presentation",
+        ".zip": "application/zip", ".rar": "application/vnd.rar",
+        ".apk": "application/vnd.android.package-archive", ".json": "application/json",
+        ".xml": "application/xml", ".db": "application/vnd.sqlite3",
+        ".crypt12": "application/octet-stream", ".crypt14": "application/octet-stream",
+        ".crypt15": "application/octet-stream", ".key": "application/octet-stream"
+    }
+
+    # Índice precompilado extensión -> categoría
+    CATEGORIA_POR_EXTENSION = {ext: categoria for categoria, exts in EXTENSIONES.items() for ext in exts}
+
+    # Categoría de cada tipo MIME detectable por contenido
+    CATEGORIA_POR_MIME = {
+        mime: categoria for mime, categoria in zip(
+            MIME_POR_EXTENSION.values(), map(CATEGORIA_POR_EXTENSION.get, MIME_POR_EXTENSION)
+        )
+    }
+
+    # Bytes de cabecera necesarios para detectar el tipo por contenido
+    TAMANO_CABECERA = 32
+
+    @staticmethod
+    def extension(nombre):
+        """Extensión en minúsculas (con punto) del nombre o ruta, '' si no tiene"""
+        punto = nombre.rfind(".")
+        # Sin punto, o archivo oculto sin extensión (".nomedia")
+        if punto <= nombre.rfind("/") + 1:
+            return ""
+        return nombre[punto:].lower()
+
+    @classmethod
+    def categoria(cls, nombre):
+        """Categoría según la extensión (None si no pertenece a ninguna)"""
+        return cls.CATEGORIA_POR_EXTENSION.get(cls.extension(nombre))
+
+    @classmethod
+    def extensiones_de(cls, categorias=None):
+        """Extensiones de las categorías indicadas (None = todas)"""
+        if not categorias:
+            return list(cls.CATEGORIA_POR_EXTENSION)
+        return [ext for categoria in categorias for ext in cls.EXTENSIONES.get(categoria, [])]
+
+    @classmethod
+    def mime_type(cls, nombre):
+        """Tipo MIME según la extensión"""
+        mime = cls.MIME_POR_EXTENSION.get(cls.extension(nombre))
+        if mime is None:
+            mime, _ = mimetypes.guess_type(nombre)
+        return mime
+
+    @staticmethod
+    def detectar_contenido(cabecera):
+        """
+        Detectar el tipo por los bytes iniciales del archivo
+
+        Returns:
+            Tupla (mime_type, especifico) o (None, False) si no se reconoce.
+            especifico es False para contenedores genéricos (ZIP, OLE, SQLite,
+            Matroska, Ogg, ASF) que no permiten corregir una extensión conocida.
+        """
+        if not cabecera:
+            return None, False
+
+        if cabecera.startswith(b"\xff\xd8\xff"):
+            return "image/jpeg", True
+        if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "image/png", True
+        if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+            return "image/gif", True
+        if cabecera.startswith(b"BM") and cabecera[6:10] == b"\x00\x00\x00\x00":
+            return "image/bmp", True
+        if cabecera.startswith(b"RIFF") and len(cabecera) >= 12:
+            subtipo = cabecera[8:12]
+            if subtipo == b"WEBP":
+                return "image/webp", True
+            if subtipo == b"WAVE":
+                return "audio/wav", True
+            if subtipo == b"AVI ":
+                return "video/x-msvideo", True
+        if cabecera[4:8] == b"ftyp":
+            marca = cabecera[8:12]
+            if marca in (b"heic", b"heix", b"mif1", b"msf1", b"hevc"):
+                return "image/heic", True
+            if marca.startswith(b"3gp") or marca.startswith(b"3g2"):
+                return "video/3gpp", True
+            if marca == b"qt  ":
+                return "video/quicktime", True
+            if marca in (b"M4A ", b"M4B "):
+                return "audio/mp4", True
+            return "video/mp4", True
+        if cabecera.startswith(b"ID3"):
+            return "audio/mpeg", True
+        if len(cabecera) >= 2 and cabecera[0] == 0xFF:
+            if cabecera[1] & 0xF6 == 0xF0:
+                return "audio/aac", True
+            if cabecera[1] & 0xE6 == 0xE2:
+                return "audio/mpeg", True
+        if cabecera.startswith(b"fLaC"):
+            return "audio/flac", True
+        if cabecera.startswith(b"FLV"):
+            return "video/x-flv", True
+        if cabecera.startswith(b"%PDF"):
+            return "application/pdf", True
+        if cabecera.startswith(b"Rar!\x1a\x07"):
+            return "application/vnd.rar", True
+        if cabecera.startswith(b"OggS"):
+            return "audio/ogg", False
+        if cabecera.startswith(b"\x1a\x45\xdf\xa3"):
+            return "video/x-matroska", False
+        if cabecera.startswith(b"\x30\x26\xb2\x75\x8e\x66\xcf\x11"):
+            return "video/x-ms-wmv", False
+        if cabecera.startswith(b"PK\x03\x04"):
+            return "application/zip", False
+        if cabecera.startswith(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"):
+            return "application/msword", False
+        if cabecera.startswith(b"SQLite format 3\x00"):
+            return "application/vnd.sqlite3", False
+        return None, False
+
+    @classmethod
+    def clasificar(cls, nombre, cabecera=None):
+        """
+        Clasificar un archivo en una sola pasada
+
+        Args:
+            nombre: Nombre o ruta del archivo
+            cabecera: Bytes iniciales del archivo (opcional). Si se entregan y
+                el contenido contradice a la extensión, prevalece el contenido.
+
+        Returns:
+            Diccionario con extension, categoria, mime_type y detectado_por
+            ("extension" o "contenido")
+        """
+        extension = cls.extension(nombre)
+        categoria = cls.CATEGORIA_POR_EXTENSION.get(extension)
+        mime = cls.mime_type(nombre)
+        detectado_por = "extension"
+
+        if cabecera:
+            mime_contenido, especifico = cls.detectar_contenido(cabecera)
+            if mime_contenido and mime_contenido != mime and (categoria is None or especifico):
+                mime = mime_contenido
+                categoria = cls.CATEGORIA_POR_MIME.get(mime_contenido, categoria)
+                detectado_por = "contenido"
+
+        return {
+            "extension": extension,
+            "categoria": categoria,
+            "mime_type": mime,
+            "detectado_por": detectado_por
+        }
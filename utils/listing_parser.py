@@ -0,0 +1,214 @@
+import re
+from datetime import datetime
+
+
+class ListingParser:
+    """
+    Parseo de los listados de archivos generados en el dispositivo
+    """
+
+    # Formato de find -printf: tamaño, mtime (epoch), tipo y ruta separados por tab,
+    # cada registro terminado en NUL. La ruta va al final para que pueda contener tabs.
+    FORMATO_FIND = r"%s\t%T@\t%y\t%p\0"
+
+    # Línea de getprop: "[clave]: [valor]"
+    _PROPIEDAD_GETPROP = re.compile(r"^\[([^\]]+)\]: \[(.*)\]$")
+
+    # Inicio de cada par "columna=" en una fila de content query sin proyección
+    _COLUMNA_CONTENT = re.compile(r"(?:^|, )([A-Za-z_][A-Za-z0-9_]*)=")
+
+    @staticmethod
+    def iterar_registros(conexion, separador=b"\0", tamano_bloque=65536, omitir_vacios=True):
+        """
+        Lee un stream de adb por bloques y entrega cada registro a medida que llega,
+        sin acumular toda la salida en memoria.
+
+        Args:
+            conexion: AdbConnection devuelta por device.shell(cmd, stream=True)
+            separador: Bytes que delimitan cada registro
+            tamano_bloque: Cantidad de bytes a leer por llamada
+            omitir_vacios: Descartar los registros vacíos (False conserva las líneas
+                en blanco de un valor de varias líneas)
+        """
+        pendiente = b""
+        try:
+            while True:
+                bloque = conexion.recv(tamano_bloque)
+                if not bloque:
+                    break
+                pendiente += bloque
+                *completos, pendiente = pendiente.split(separador)
+                for registro in completos:
+                    if registro or not omitir_vacios:
+                        yield registro.decode("utf-8", errors="replace")
+            if pendiente.strip():
+                yield pendiente.decode("utf-8", errors="replace")
+        finally:
+            conexion.close()
+
+    @staticmethod
+    def parsear_registro_find(registro):
+        """
+        Parsea un registro generado con FORMATO_FIND
+
+        Returns:
+            Tupla (ruta, tamano, mtime, tipo) o None si el registro no es válido
+        """
+        partes = registro.split("\t", 3)
+        if len(partes) != 4:
+            return None
+
+        tamano, mtime, tipo, ruta = partes
+        try:
+            tamano = int(tamano)
+        except ValueError:
+            tamano = 0
+        try:
+            mtime = int(float(mtime))
+        except ValueError:
+            mtime = 0
+
+        # find puede duplicar la barra final de la ruta base (ej. "DCIM//foto.jpg")
+        ruta = ruta.replace("//", "/")
+        return ruta, tamano, mtime, tipo
+
+    @staticmethod
+    def formatear_fecha(mtime):
+        """Formatea un epoch con el mismo formato que muestra ls -l"""
+        if not mtime:
+            return ""
+        return datetime.fromtimestamp(mtime).strftime("%Y-%m-%d %H:%M")
+
+    @staticmethod
+    def fecha_a_epoch(fecha):
+        """Convierte la fecha de ls -l ("YYYY-MM-DD HH:MM") a epoch (0 si no se reconoce)"""
+        try:
+            return int(datetime.strptime(fecha, "%Y-%m-%d %H:%M").timestamp())
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def iterar_filas_content(conexion, columnas=None):
+        """
+        Entrega las filas de un `content query` en stream a medida que llegan.
+
+        Los valores con saltos de línea (por ejemplo el cuerpo de un SMS) ocupan
+        varias líneas; se unen a su fila hasta que empieza la siguiente.
+
+        Args:
+            conexion: AdbConnection devuelta por device.shell(cmd, stream=True)
+            columnas: Columnas proyectadas, en orden (None = sin proyección)
+
+        Raises:
+            RuntimeError: Si el proveedor respondió con un error en lugar de filas
+        """
+        actual = None
+        mensajes = []
+        for linea in ListingParser.iterar_registros(conexion, separador=b"\n", omitir_vacios=False):
+            if linea.startswith("Row:"):
+                if actual is not None:
+                    fila = ListingParser.parsear_fila_content(actual, columnas)
+                    if fila is not None:
+                        yield fila
+                actual = linea
+            elif actual is not None:
+                actual += "\n" + linea
+            elif linea.strip() and len(mensajes) < 10:
+                mensajes.append(linea.strip())
+
+        if actual is not None:
+            fila = ListingParser.parsear_fila_content(actual, columnas)
+            if fila is not None:
+                yield fila
+        elif mensajes and mensajes[0] != "No result found.":
+            raise RuntimeError("\n".join(mensajes))
+
+    @staticmethod
+    def parsear_fila_content(linea, columnas=None):
+        """
+        Parsea una fila de `content query` usando las columnas proyectadas como
+        delimitadores, de modo que los valores puedan contener comas y espacios.
+        Las columnas se ubican desde el final de la fila: un valor que contiene el
+        texto de la columna siguiente (un SMS con ", date=") no se corta.
+
+        Args:
+            linea: Línea de salida ("Row: N col1=valor, col2=valor")
+            columnas: Columnas en el mismo orden que se pasaron a --projection.
+                Sin columnas, cada ", nombre=" se toma como inicio de una columna.
+
+        Returns:
+            Diccionario columna -> valor (None para NULL) o None si la línea no es una fila
+        """
+        # Las líneas en blanco al final de un valor de varias líneas se conservan
+        linea = linea.lstrip().rstrip("\r")
+        if not linea.startswith("Row:"):
+            return None
+        if not columnas:
+            return ListingParser._parsear_fila_content_libre(linea)
+
+        fila = {}
+        fin = len(linea)
+        for i in range(len(columnas) - 1, -1, -1):
+            columna = columnas[i]
+            if i == 0:
+                inicio = linea.find(f" {columna}=", 0, fin)
+                inicio_valor = inicio + len(columna) + 2
+            else:
+                inicio = linea.rfind(f", {columna}=", 0, fin)
+                inicio_valor = inicio + len(columna) + 3
+            if inicio < 0:
+                return None
+            valor = linea[inicio_valor:fin]
+            fila[columna] = None if valor == "NULL" else valor
+            fin = inicio
+        return {columna: fila[columna] for columna in columnas}
+
+    @staticmethod
+    def _parsear_fila_content_libre(linea):
+        # Saltar "Row: N "
+        partes = linea.split(" ", 2)
+        if len(partes) < 3:
+            return None
+        cuerpo = partes[2]
+
+        inicios = list(ListingParser._COLUMNA_CONTENT.finditer(cuerpo))
+        if not inicios:
+            return None
+        fila = {}
+        for i, coincidencia in enumerate(inicios):
+            fin = inicios[i + 1].start() if i + 1 < len(inicios) else len(cuerpo)
+            valor = cuerpo[coincidencia.end():fin]
+            fila[coincidencia.group(1)] = None if valor == "NULL" else valor
+        return fila
+
+    @staticmethod
+    def parsear_getprop(salida):
+        """Parsea la salida completa de getprop a un diccionario propiedad -> valor"""
+        propiedades = {}
+        for linea in salida.splitlines():
+            coincidencia = ListingParser._PROPIEDAD_GETPROP.match(linea.strip())
+            if coincidencia:
+                propiedades[coincidencia.group(1)] = coincidencia.group(2)
+        return propiedades
+
+    @staticmethod
+    def parsear_df(salida):
+        """
+        Parsea la salida de `df -k`
+
+        Returns:
+            Lista de diccionarios con montaje, total_bytes, usado_bytes y disponible_bytes
+        """
+        volumenes = []
+        for linea in salida.splitlines():
+            partes = linea.split()
+            # Filesystem 1K-blocks Used Available Use% Mounted-on
+            if len(partes) < 6 or not partes[1].isdigit():
+                continue
+            volumenes.append({
+                "montaje": " ".join(partes[5:]),
+                "total_bytes": int(partes[1]) * 1024,
+                "usado_bytes": int(partes[2]) * 1024 if partes[2].isdigit() else 0,
+                "disponible_bytes": int(partes[3]) * 1024 if partes[3].isdigit() else 0
+            })
+        return volumenes
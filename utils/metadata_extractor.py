@@ -1,27 +1,46 @@
 import os
-import mimetypes
 import hashlib
 from datetime import datetime
 from PIL import Image
 from PIL.ExifTags import TAGS
 import mutagen
+from utils.file_classifier import ClasificadorArchivos
 
 class MetadataExtractor:
     @staticmethod
-    def get_file_metadata(file_path):
+    def get_file_metadata(file_path, huella=None, nombre=None):
         """
         Extrae todos los metadatos posibles de un archivo
+        
+        Args:
+            file_path: Ruta local del archivo
+            huella: Hashes y bytes iniciales ya calculados durante la descarga
+                (ver DigestoEnTransito); si se entregan el archivo no se relee para hashearlo
+            nombre: Nombre original del archivo, para la extensión y el tipo cuando
+                file_path no lo conserva (descarga temporal, almacén por contenido)
         """
+        nombre = nombre or file_path
         metadata = {
             "size_bytes": os.path.getsize(file_path),
-            "extension": os.path.splitext(file_path)[1].lower(),
+            "extension": os.path.splitext(nombre)[1].lower(),
             "created_at": datetime.fromtimestamp(os.path.getctime(file_path)).isoformat(),
-            "modified_at": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat(),
-            "hash_sha256": MetadataExtractor._calculate_hash(file_path)
+            "modified_at": datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
         }
         
-        mime_type, _ = mimetypes.guess_type(file_path)
+        if huella:
+            metadata.update({clave: valor for clave, valor in huella.items() if clave.startswith("hash_")})
+            cabecera = huella.get("cabecera", b"")
+        else:
+            metadata["hash_sha256"] = MetadataExtractor._calculate_hash(file_path)
+            cabecera = MetadataExtractor._read_header(file_path)
+        
+        # Clasificar por extensión, verificando con los bytes iniciales del archivo
+        clasificacion = ClasificadorArchivos.clasificar(nombre, cabecera)
+        mime_type = clasificacion["mime_type"]
         metadata["mime_type"] = mime_type
+        metadata["categoria"] = clasificacion["categoria"]
+        if clasificacion["detectado_por"] == "contenido":
+            metadata["mime_detectado_por"] = "contenido"
         
         if mime_type:
             if mime_type.startswith('image/'):
@@ -31,6 +50,15 @@ class MetadataExtractor:
                 
         return metadata
 
+    @staticmethod
+    def _read_header(file_path):
+        """Lee los primeros bytes del archivo para detectar su tipo real"""
+        try:
+            with open(file_path, 'rb') as f:
+                return f.read(ClasificadorArchivos.TAMANO_CABECERA)
+        except Exception:
+            return b""
+
     @staticmethod
     def _calculate_hash(file_path, block_size=65536):
         """Calcula el hash SHA-256 del archivo"""
@@ -0,0 +1,155 @@
+import math
+import shlex
+from datetime import datetime
+from fnmatch import fnmatchcase
+from utils.file_classifier import ClasificadorArchivos
+
+
+class FiltroEscaneo:
+    """
+    Filtros de escaneo (extensión, fecha de modificación, tamaño y rutas).
+
+    Los filtros se traducen a argumentos de find y a condiciones SQL de
+    MediaStore para que lo excluido no salga del dispositivo; acepta() repite
+    la verificación exacta en Python sobre lo que sí llega.
+    """
+
+    PARAMETROS = ["modificado_desde", "modificado_hasta", "tamano_min", "tamano_max",
+                  "incluir_rutas", "excluir_rutas"]
+
+    def __init__(self, extensiones=None, modificado_desde=None, modificado_hasta=None,
+                 tamano_min=None, tamano_max=None, incluir_rutas=None, excluir_rutas=None):
+        """
+        Args:
+            extensiones: Extensiones válidas (None = cualquiera)
+            modificado_desde / modificado_hasta: Epoch, o fecha ISO ("2024-01-31" o "2024-01-31T18:00")
+            tamano_min / tamano_max: Tamaño en bytes (inclusive)
+            incluir_rutas: Globs de ruta completa; el archivo debe cumplir al menos uno
+            excluir_rutas: Globs de ruta completa a descartar
+        """
+        self.extensiones = {ext.lower() for ext in extensiones} if extensiones else None
+        self.modificado_desde = self._a_epoch(modificado_desde)
+        self.modificado_hasta = self._a_epoch(modificado_hasta)
+        self.tamano_min = int(tamano_min) if tamano_min is not None else None
+        self.tamano_max = int(tamano_max) if tamano_max is not None else None
+        self.incluir_rutas = list(incluir_rutas or [])
+        self.excluir_rutas = list(excluir_rutas or [])
+        # Hora del dispositivo (epoch), necesaria para traducir fechas a -mmin
+        self.ahora_dispositivo = None
+
+    @classmethod
+    def desde_dict(cls, extensiones, filtros=None):
+        """Construir el filtro a partir de los parámetros recibidos en la petición"""
+        filtros = filtros or {}
+        desconocidos = set(filtros) - set(cls.PARAMETROS)
+        if desconocidos:
+            raise ValueError(f"Filtros no válidos: {', '.join(sorted(desconocidos))}")
+        return cls(extensiones, **filtros)
+
+    @staticmethod
+    def _a_epoch(valor):
+        if valor is None or valor == "":
+            return None
+        if isinstance(valor, (int, float)):
+            return int(valor)
+        return int(datetime.fromisoformat(str(valor)).timestamp())
+
+    @property
+    def tiene_fechas(self):
+        return self.modificado_desde is not None or self.modificado_hasta is not None
+
+    def acepta_nombre(self, nombre):
+        """Verificar solo la extensión del archivo"""
+        if self.extensiones is None:
+            return True
+        return ClasificadorArchivos.extension(nombre) in self.extensiones
+
+    def acepta(self, ruta, tamano, mtime=0):
+        """
+        Verificación exacta de todos los filtros.
+
+        Los archivos sin fecha conocida (mtime = 0) no se descartan por fecha,
+        ni los de tamaño desconocido (tamano = None) por tamaño.
+        """
+        if not self.acepta_nombre(ruta.rsplit("/", 1)[-1]):
+            return False
+        if tamano is not None:
+            if self.tamano_min is not None and tamano < self.tamano_min:
+                return False
+            if self.tamano_max is not None and tamano > self.tamano_max:
+                return False
+        if mtime:
+            if self.modificado_desde is not None and mtime < self.modificado_desde:
+                return False
+            if self.modificado_hasta is not None and mtime > self.modificado_hasta:
+                return False
+        if self.incluir_rutas and not any(fnmatchcase(ruta, glob) for glob in self.incluir_rutas):
+            return False
+        if any(fnmatchcase(ruta, glob) for glob in self.excluir_rutas):
+            return False
+        return True
+
+    def argumentos_find(self):
+        """
+        Traducir los filtros a argumentos de find (toybox).
+
+        Las fechas se expresan con -mmin relativo a ahora_dispositivo y se
+        redondean hacia afuera; acepta() ajusta el límite exacto.
+        """
+        argumentos = []
+
+        if self.extensiones is not None:
+            nombres = " -o ".join(f"-iname {shlex.quote('*' + ext)}" for ext in sorted(self.extensiones))
+            argumentos.append(f"\\( {nombres} \\)")
+
+        if self.tamano_min is not None and self.tamano_min > 0:
+            argumentos.append(f"-size +{self.tamano_min - 1}c")
+        if self.tamano_max is not None:
+            argumentos.append(f"-size -{self.tamano_max + 1}c")
+
+        if self.tiene_fechas and self.ahora_dispositivo:
+            if self.modificado_desde is not None:
+                minutos = math.ceil((self.ahora_dispositivo - self.modificado_desde) / 60) + 1
+                if minutos > 0:
+                    argumentos.append(f"-mmin -{minutos}")
+            if self.modificado_hasta is not None:
+                minutos = math.floor((self.ahora_dispositivo - self.modificado_hasta) / 60) - 1
+                if minutos > 0:
+                    argumentos.append(f"-mmin +{minutos}")
+
+        if self.incluir_rutas:
+            rutas = " -o ".join(f"-path {shlex.quote(glob)}" for glob in self.incluir_rutas)
+            argumentos.append(f"\\( {rutas} \\)")
+        for glob in self.excluir_rutas:
+            argumentos.append(f"! -path {shlex.quote(glob)}")
+
+        return " ".join(argumentos)
+
+    def condicion_sql(self):
+        """Traducir los filtros a una condición WHERE sobre la tabla files de MediaStore"""
+        condiciones = []
+
+        if self.extensiones is not None:
+            condiciones.append("(" + " OR ".join(
+                f"_data LIKE {self._literal_sql('%' + ext)}" for ext in sorted(self.extensiones)
+            ) + ")")
+        if self.tamano_min is not None:
+            condiciones.append(f"_size >= {self.tamano_min}")
+        if self.tamano_max is not None:
+            condiciones.append(f"_size <= {self.tamano_max}")
+        if self.modificado_desde is not None:
+            condiciones.append(f"date_modified >= {self.modificado_desde}")
+        if self.modificado_hasta is not None:
+            condiciones.append(f"date_modified <= {self.modificado_hasta}")
+        if self.incluir_rutas:
+            condiciones.append("(" + " OR ".join(
+                f"_data GLOB {self._literal_sql(glob)}" for glob in self.incluir_rutas
+            ) + ")")
+        for glob in self.excluir_rutas:
+            condiciones.append(f"NOT _data GLOB {self._literal_sql(glob)}")
+
+        return " AND ".join(condiciones)
+
+    @staticmethod
+    def _literal_sql(valor):
+        return "'{}'".format(valor.replace("'", "''"))
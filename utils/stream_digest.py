@@ -0,0 +1,43 @@
+import hashlib
+from utils.file_classifier import ClasificadorArchivos
+
+
+class DigestoEnTransito:
+    """
+    Calcula los hashes de un archivo y guarda sus bytes iniciales mientras
+    los bloques pasan hacia el disco, para no tener que releerlo después.
+    """
+
+    # Algoritmos aceptados; SHA-256 se calcula siempre
+    ALGORITMOS = ["sha256", "md5", "sha1"]
+
+    def __init__(self, adicionales=None):
+        """
+        Args:
+            adicionales: Algoritmos además de SHA-256 ("md5", "sha1")
+        """
+        algoritmos = ["sha256"] + [a for a in (adicionales or []) if a != "sha256"]
+        no_validos = set(algoritmos) - set(self.ALGORITMOS)
+        if no_validos:
+            raise ValueError(f"Algoritmos de hash no válidos: {', '.join(sorted(no_validos))}")
+        self._hashes = {algoritmo: hashlib.new(algoritmo) for algoritmo in dict.fromkeys(algoritmos)}
+        self._cabecera = b""
+        self.bytes = 0
+
+    def actualizar(self, bloque):
+        for h in self._hashes.values():
+            h.update(bloque)
+        if len(self._cabecera) < ClasificadorArchivos.TAMANO_CABECERA:
+            self._cabecera += bloque[:ClasificadorArchivos.TAMANO_CABECERA - len(self._cabecera)]
+        self.bytes += len(bloque)
+
+    def resultado(self):
+        """
+        Returns:
+            Diccionario con hash_<algoritmo> de cada algoritmo, los bytes
+            iniciales (cabecera) y el total de bytes vistos
+        """
+        huella = {f"hash_{algoritmo}": h.hexdigest() for algoritmo, h in self._hashes.items()}
+        huella["cabecera"] = self._cabecera
+        huella["bytes"] = self.bytes
+        return huella